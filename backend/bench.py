@@ -0,0 +1,252 @@
+"""
+퍼즐 생성/최적해 벤치마크
+
+create_puzzle이 쓰는 모드별 실제 파라미터(puzzle_pool.PUZZLE_MODES)로 시드 고정 작업을 돌려서
+지연 시간 p50/p95/p99, 확장 노드 수, 생성 시도 횟수, fallback(warning) 비율을 잰다.
+
+    python bench.py                       # 실행 + bench_baseline.json과 비교 (탐색량 회귀 시 종료 코드 1)
+    python bench.py --update-baseline     # 현재 결과를 기준선으로 저장
+    python bench.py --only hard,ranked    # 일부 작업만
+
+결과는 --output(기본 bench_results.json)에 JSON으로 저장된다.
+노드/시도 수, fallback, 실패 수는 시드가 같으면 결정적이라 이것만 회귀 판정(종료 코드)에 쓴다.
+지연 시간은 같은 기계에서도 실행마다 흔들려서(반복 20~50회면 p95가 사실상 최댓값) 참고용으로만
+출력하고, 중앙값(p50)이 기준선보다 크게 느려졌을 때만 경고한다.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from distance_db import get_table as get_distance_table
+from puzzle import (
+    SEARCH_STATS,
+    calculate_optimal_moves,
+    calculate_optimal_moves_hard,
+)
+from puzzle_pool import PUZZLE_MODES, generate_for_mode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "bench_baseline.json")
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "bench_results.json")
+
+# 작업별 기본 반복 횟수 (큰 보드는 한 번이 수십 ms라 줄임)
+DEFAULT_ITERATIONS = 50
+LARGE_ITERATIONS = 20
+
+# 회귀 판정 허용치 (결정적인 값만)
+COUNT_TOLERANCE = 0.1        # 노드/시도 평균 +10%까지 허용
+FALLBACK_SLACK = 0.05        # fallback 비율 +5%p까지 허용
+
+# 지연 시간 경고 기준 (참고용, 종료 코드에 영향 없음)
+LATENCY_WARN_RATIO = 2.0     # p50이 기준선의 2배를 넘으면 경고
+LATENCY_SLACK_MS = 1.0       # sub-ms 작업의 측정 잡음 흡수용 절대 여유
+
+
+# ══════════════════════════════════════════════
+#  통계
+# ══════════════════════════════════════════════
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """nearest-rank 백분위수 (sorted_values는 정렬된 값)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(s["ms"] for s in samples)
+    n = len(samples)
+    return {
+        "iterations": n,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "mean_nodes": round(sum(s["nodes"] for s in samples) / n, 1) if n else 0.0,
+        "mean_attempts": round(sum(s["attempts"] for s in samples) / n, 2) if n else 0.0,
+        "fallback_rate": round(sum(s["fallback"] for s in samples) / n, 4) if n else 0.0,
+        "failures": sum(s["failure"] for s in samples),
+    }
+
+
+# ══════════════════════════════════════════════
+#  작업
+# ══════════════════════════════════════════════
+
+def _timed(call: Callable[[], Any]) -> Dict[str, Any]:
+    """call 한 번 실행: 지연 시간 + SEARCH_STATS 차이"""
+    before = dict(SEARCH_STATS)
+    started = time.perf_counter()
+    try:
+        call()
+    except RuntimeError:
+        pass
+    ms = (time.perf_counter() - started) * 1000
+    return {
+        "ms": ms,
+        "nodes": SEARCH_STATS["nodes"] - before["nodes"],
+        "attempts": SEARCH_STATS["attempts"] - before["attempts"],
+        "fallback": SEARCH_STATS["fallbacks"] - before["fallbacks"],
+        "failure": SEARCH_STATS["failures"] - before["failures"],
+    }
+
+
+def _iterations_for(mode: str, override: Optional[int]) -> int:
+    if override:
+        return override
+    return LARGE_ITERATIONS if PUZZLE_MODES[mode].get("size", 3) > 3 else DEFAULT_ITERATIONS
+
+
+def bench_generate(mode: str, iterations: int, seed: int) -> Dict[str, Any]:
+    """generate:<mode> - create_puzzle과 같은 파라미터로 퍼즐 생성"""
+    random.seed(seed)
+    samples = [_timed(lambda: generate_for_mode(mode)) for _ in range(iterations)]
+    return summarize(samples)
+
+
+def bench_solve(mode: str, iterations: int, seed: int) -> Dict[str, Any]:
+    """solve:<mode> - 생성된 퍼즐의 최적해 재계산 (퍼즐 생성은 측정에서 제외)"""
+    random.seed(seed)
+    puzzles = [generate_for_mode(mode) for _ in range(iterations)]
+    solve = calculate_optimal_moves_hard if mode == "hard" else calculate_optimal_moves
+
+    samples = []
+    for puzzle in puzzles:
+        sample = _timed(lambda: solve(puzzle["initial_state"], puzzle["target_roles"]))
+        # 최적해 계산에는 생성 시도/fallback 개념이 없음
+        sample["attempts"] = sample["fallback"] = sample["failure"] = 0
+        samples.append(sample)
+    return summarize(samples)
+
+
+def workloads(only: Optional[List[str]]) -> List[str]:
+    names = [f"generate:{mode}" for mode in PUZZLE_MODES]
+    names += [f"solve:{mode}" for mode in ("ranked", "hard", "ranked_4x4")]
+    if only:
+        names = [n for n in names if n in only or n.split(":", 1)[1] in only]
+    return names
+
+
+def run(only: Optional[List[str]], iterations: Optional[int], seed: int) -> Dict[str, Any]:
+    # 거리 테이블 빌드/mmap은 측정에서 제외
+    get_distance_table()
+
+    results = {}
+    for name in workloads(only):
+        kind, mode = name.split(":", 1)
+        n = _iterations_for(mode, iterations)
+        started = time.perf_counter()
+        if kind == "generate":
+            results[name] = bench_generate(mode, n, seed)
+        else:
+            results[name] = bench_solve(mode, n, seed)
+        r = results[name]
+        print(
+            f"{name:22s} n={r['iterations']:<4d} p50={r['p50_ms']:9.3f}ms "
+            f"p95={r['p95_ms']:9.3f}ms p99={r['p99_ms']:9.3f}ms "
+            f"nodes={r['mean_nodes']:<10} attempts={r['mean_attempts']:<6} "
+            f"fallback={r['fallback_rate']:.2%} ({time.perf_counter() - started:.1f}s)"
+        )
+
+    return {
+        "seed": seed,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "workloads": results,
+    }
+
+
+# ══════════════════════════════════════════════
+#  기준선 비교
+# ══════════════════════════════════════════════
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """기준선 대비 탐색량 회귀 항목 목록 (노드/시도/fallback/실패, 비어 있으면 통과)"""
+    regressions = []
+    for name, cur in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        for key in ("mean_nodes", "mean_attempts"):
+            limit = base[key] * (1 + COUNT_TOLERANCE)
+            if cur[key] > limit and cur[key] - base[key] > 1:
+                regressions.append(f"{name} {key}: {cur[key]} > {limit:.1f} (baseline {base[key]})")
+        if cur["fallback_rate"] > base["fallback_rate"] + FALLBACK_SLACK:
+            regressions.append(
+                f"{name} fallback_rate: {cur['fallback_rate']} (baseline {base['fallback_rate']})"
+            )
+        if cur["failures"] > base["failures"]:
+            regressions.append(f"{name} failures: {cur['failures']} (baseline {base['failures']})")
+    return regressions
+
+
+def latency_warnings(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """기준선보다 중앙값이 크게 느려진 작업 (참고용)"""
+    warnings = []
+    for name, cur in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        limit = base["p50_ms"] * LATENCY_WARN_RATIO + LATENCY_SLACK_MS
+        if cur["p50_ms"] > limit:
+            warnings.append(f"{name} p50_ms: {cur['p50_ms']} > {limit:.3f} (baseline {base['p50_ms']})")
+    return warnings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="퍼즐 생성/최적해 벤치마크")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("-n", "--iterations", type=int, default=None, help="작업별 반복 횟수 (기본: 3x3 50, 큰 보드 20)")
+    parser.add_argument("--only", default="", help="쉼표로 구분한 작업/모드 이름 (예: hard,generate:ranked)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="결과를 기준선으로 저장")
+    args = parser.parse_args(argv)
+
+    only = [x.strip() for x in args.only.split(",") if x.strip()] or None
+    result = run(only, args.iterations, args.seed)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"기준선 갱신: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("기준선 없음 (--update-baseline으로 생성)")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    warnings = latency_warnings(result, baseline)
+    if warnings:
+        print("\n지연 시간 경고 (참고용, 같은 기계의 기준선인지 확인):")
+        for line in warnings:
+            print(f"  - {line}")
+
+    regressions = compare(result, baseline)
+    if regressions:
+        print("\n회귀 감지:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("기준선 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+일일 도전 퍼즐
+
+날짜(UTC)에서 만든 시드로 random.Random을 만들어 generate_puzzle에 넘기므로, 같은 날짜면
+어느 프로세스/서버에서 만들어도 같은 보드가 나온다. 날짜별로 한 번만 만들어 캐시해 두고
+(기본으로 오늘부터 DAILY_DAYS_AHEAD일 뒤까지 미리), 요청은 캐시된 퍼즐을 그대로 내준다.
+
+플레이어마다 세션(puzzle_id)은 따로 발급하고 보드만 공유한다. 랭킹은 rankings_daily 테이블에
+날짜별로 따로 쌓인다 (database.daily_mode_key).
+
+설정 (환경변수):
+- DAILY_DAYS_AHEAD:  오늘 외에 미리 만들어 둘 날짜 수 (기본 1)
+- DAILY_SEED_SECRET: 시드에 섞는 비밀값 (기본 빈 값). 설정하면 날짜만 알아서는 보드를 미리 계산할 수 없음.
+                     여러 서버가 같은 보드를 내려면 같은 값을 써야 함
+"""
+import hashlib
+import os
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from puzzle import generate_puzzle
+from puzzle_pool import PUZZLE_MODES
+
+DAILY_DAYS_AHEAD = int(os.environ.get("DAILY_DAYS_AHEAD", "1"))
+DAILY_SEED_SECRET = os.environ.get("DAILY_SEED_SECRET", "")
+
+# 일일 도전 난이도: 경쟁전과 같은 파라미터 (3x3은 시드만 같으면 결과가 기계와 무관하게 같음)
+DAILY_PARAMS = PUZZLE_MODES["ranked"]
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def parse_date(value: str) -> date:
+    """YYYY-MM-DD → date (형식이 틀리면 ValueError)"""
+    return date.fromisoformat(value)
+
+
+def daily_seed(day: date) -> int:
+    """날짜 → 64비트 시드"""
+    digest = hashlib.blake2b(
+        f"{DAILY_SEED_SECRET}:daily:{day.isoformat()}".encode("utf-8"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def generate_daily(day: date) -> Dict[str, Any]:
+    """날짜의 일일 도전 퍼즐 생성 (전역 random 상태를 건드리지 않음)"""
+    rng = random.Random(daily_seed(day))
+    puzzle = generate_puzzle(**DAILY_PARAMS, rng=rng)
+    # uuid4는 시드와 무관하므로 날짜로 고정
+    puzzle["puzzle_id"] = f"daily-{day.isoformat()}"
+    puzzle["date"] = day.isoformat()
+    return puzzle
+
+
+class DailyChallenge:
+    """날짜별 일일 도전 퍼즐 캐시 (날짜마다 프로세스당 한 번만 생성)"""
+
+    def __init__(self, days_ahead: int = DAILY_DAYS_AHEAD):
+        self.days_ahead = max(days_ahead, 0)
+        self._puzzles: Dict[date, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._current: Optional[date] = None
+        self.generated = 0
+
+    def get(self, day: Optional[date] = None) -> Dict[str, Any]:
+        """날짜의 퍼즐 (캐시에 없으면 그때 한 번 생성), 기본은 오늘"""
+        if day is None:
+            day = today()
+            if day != self._current:
+                # 날짜가 바뀌면 다음 날짜들을 미리 만들고 지난 날짜는 버림
+                self.prefetch()
+        puzzle = self._puzzles.get(day)
+        if puzzle is not None:
+            return puzzle
+
+        with self._lock:
+            puzzle = self._puzzles.get(day)
+            if puzzle is None:
+                puzzle = generate_daily(day)
+                self._puzzles[day] = puzzle
+                self.generated += 1
+        return puzzle
+
+    def prefetch(self) -> None:
+        """오늘부터 days_ahead일 뒤까지 미리 생성하고, 지난 날짜는 버림"""
+        start = today()
+        self._current = start
+        for offset in range(self.days_ahead + 1):
+            self.get(start + timedelta(days=offset))
+        with self._lock:
+            for day in [d for d in self._puzzles if d < start]:
+                del self._puzzles[day]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_dates": sorted(d.isoformat() for d in self._puzzles),
+            "generated": self.generated,
+            "days_ahead": self.days_ahead,
+        }
@@ -4,26 +4,127 @@ SQLite 데이터베이스 모듈 - 랭킹 시스템
 테이블:
 - rankings: 기본 모드(경쟁전) 랭킹
 - rankings_hard: 하드 모드 랭킹
+- rankings_4x4, rankings_5x5: 큰 보드 경쟁전 랭킹 (모드 키 "ranked_4x4", "ranked_5x5", 3x3과 따로 순위)
+- rankings_daily: 일일 도전 랭킹 (challenge_date 날짜별로 따로 순위, 모드 키는 "daily:YYYY-MM-DD")
+
+기간 랭킹 (일일 도전 외 모든 테이블):
+- window 키 "day:YYYY-MM-DD" (UTC 하루), "week:YYYY-MM-DD" (그 주 월요일부터 7일, UTC)
+- 이번/지난 일·주 기간만 메모리 순위 인덱스를 고정으로 들고 있고, add_ranking 때 이번 기간 인덱스에도
+  바로 넣는다. 그래서 이번/지난 기간 랭킹 조회는 전체 랭킹과 같은 메모리 상위 목록 읽기다
+- 기간 키가 바뀌면(자정, 월요일) 이번 기간 인덱스는 지난 기간으로 그대로 넘어가고, 새 기간 인덱스는
+  created_at 범위(인덱스)로 그 기간 기록만 읽어서 한 번 적재한다. 두 기간 전 인덱스는 내린다
+- 그보다 오래된 기간은 공유 인덱스에 올리지 않고 요청마다 DB에서 바로 읽는다
+  (과거 날짜 조회가 이번 기간 인덱스를 밀어내지 않음)
+
+일일 도전도 같은 방식으로 오늘/어제 날짜만 메모리 인덱스를 고정으로 들고 있다
+(어제 받은 퍼즐이 자정 뒤에 제출될 수 있으므로 어제도 포함).
+
+연결:
+- 스레드마다 연결 1개를 만들어 계속 재사용 (요청마다 connect/close 하지 않음)
+- WAL 저널: 쓰기 중에도 읽기가 막히지 않음
+- synchronous=NORMAL (WAL에서는 커밋 단위 내구성 유지, fsync는 체크포인트 때만)
+- SQL 문자열을 테이블별 상수로 고정해서 연결의 prepared statement 캐시를 그대로 재사용
+
+순위/기록 수/상위 랭킹/시간 분포는 leaderboard.Leaderboard(메모리 정렬 배열)에서 바로 답하고,
+DB는 기록 보관(재시작 시 적재)에만 쓴다.
+
+쓰기 (write-behind):
+- add_ranking은 id를 미리 배정하고 메모리 인덱스에 넣은 뒤 바로 순위를 반환
+- INSERT는 전용 writer 스레드가 큐에서 모아 DB_WRITE_WINDOW_MS 안에 들어온 것끼리
+  executemany + commit 한 번으로 처리 (등록 몰릴 때 커밋/fsync 횟수가 배치 수로 줄어듦)
+- 배치가 실패하면(무결성 오류, 재시도 소진) 한 행씩 다시 써서 실패한 행만 버림
+- 서버 종료(close_all)와 프로세스 종료(atexit) 때 큐를 끝까지 비움
+  (프로세스가 비정상 종료되면 마지막 창 안의 기록은 유실될 수 있음)
+
+설정 (환경변수):
+- DATABASE_PATH:       DB 파일 경로 (기본 ranking.db)
+- DB_CACHE_SIZE_KB:    연결당 페이지 캐시 크기 KB (기본 8192)
+- DB_WRITE_WINDOW_MS:  writer가 배치를 모으는 최대 시간 ms (기본 20)
+- DB_WRITE_MAX_BATCH:  배치 하나의 최대 행 수 (기본 256)
+
+공개 함수와 writer 배치의 지연은 db_call_seconds{function} 히스토그램으로 기록된다 (GET /metrics).
 """
+import atexit
+import itertools
+import logging
+import os
+import queue
 import sqlite3
-from datetime import datetime
-from typing import List, Optional
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from contextlib import contextmanager
 
-DATABASE_PATH = "ranking.db"
+import metrics
+from leaderboard import TOP_KEEP, Leaderboard
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "ranking.db")
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "8192"))
+DB_WRITE_WINDOW_MS = float(os.environ.get("DB_WRITE_WINDOW_MS", "20"))
+DB_WRITE_MAX_BATCH = int(os.environ.get("DB_WRITE_MAX_BATCH", "256"))
+
+logger = logging.getLogger(__name__)
+
+# 연결당 prepared statement 캐시 크기
+_STATEMENT_CACHE = 64
+
+# 함수별 호출 지연 (GET /metrics)
+DB_CALL_SECONDS = metrics.histogram(
+    "db_call_seconds", "Latency of database.py functions", ("function",)
+)
+
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=5.0,
+        cached_statements=_STATEMENT_CACHE,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
 
 
 @contextmanager
 def get_db():
-    """데이터베이스 연결 컨텍스트 매니저"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """데이터베이스 연결 컨텍스트 매니저 (현재 스레드의 연결 재사용)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
     try:
         yield conn
-    finally:
-        conn.close()
-
-
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def close_all():
+    """대기 중인 쓰기를 모두 반영하고 열려 있는 모든 스레드 연결 닫기 (서버 종료 시)"""
+    _writer.stop()
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # 다른 스레드에서 만든 연결 (해당 스레드 종료 시 정리됨)
+            pass
+    _local.__dict__.pop("conn", None)
+
+
+@DB_CALL_SECONDS.time("init_db")
 def init_db():
     """데이터베이스 초기화 - 테이블 생성"""
     with get_db() as conn:
@@ -42,6 +143,9 @@ def init_db():
         conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_time_ms ON rankings(time_ms ASC)
         """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_created_at ON rankings(created_at)
+        """)
 
         # 하드 모드 랭킹
         conn.execute("""
@@ -58,15 +162,524 @@ def init_db():
         conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_hard_time_ms ON rankings_hard(time_ms ASC)
         """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_hard_created_at ON rankings_hard(created_at)
+        """)
+
+        # 큰 보드 경쟁전 랭킹 (보드 크기별, 스키마는 rankings와 같음)
+        for table in LARGE_BOARD_TABLES.values():
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nickname TEXT NOT NULL,
+                    time_ms INTEGER NOT NULL,
+                    moves INTEGER NOT NULL,
+                    optimal_moves INTEGER NOT NULL,
+                    puzzle_id TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{table}_time_ms ON {table}(time_ms ASC)
+            """)
+            conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)
+            """)
+
+        # 일일 도전 랭킹 (날짜별)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rankings_daily (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                challenge_date TEXT NOT NULL,
+                nickname TEXT NOT NULL,
+                time_ms INTEGER NOT NULL,
+                moves INTEGER NOT NULL,
+                optimal_moves INTEGER NOT NULL,
+                puzzle_id TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daily_date_time_ms ON rankings_daily(challenge_date, time_ms ASC)
+        """)
 
         conn.commit()
 
+    _load_leaderboards()
+    _load_next_ids()
+
+
+DAILY_MODE = "daily"
+DAILY_TABLE = "rankings_daily"
+
+# 큰 보드 경쟁전 모드 키 → 테이블 (3x3 rankings와 섞이지 않도록 보드 크기마다 따로)
+LARGE_BOARD_TABLES = {
+    "ranked_4x4": "rankings_4x4",
+    "ranked_5x5": "rankings_5x5",
+}
+
+
+def daily_mode_key(challenge_date: str) -> str:
+    """일일 도전 랭킹 모드 키 ("daily:YYYY-MM-DD")"""
+    return f"{DAILY_MODE}:{challenge_date}"
+
+
+def today_utc() -> str:
+    """일일 도전 날짜 (UTC 기준 YYYY-MM-DD)"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+# 기간 랭킹 종류
+WINDOWS = ("day", "week")
+
+
+def window_key(window: str, day: Optional[date] = None) -> str:
+    """기간 종류 + 날짜(기본 오늘, UTC) → 그 날짜가 속한 기간 키"""
+    if day is None:
+        day = datetime.now(timezone.utc).date()
+    if window == "week":
+        day -= timedelta(days=day.weekday())
+    elif window != "day":
+        raise ValueError(f"unknown window {window!r}")
+    return f"{window}:{day.isoformat()}"
+
+
+def _pinned_window_keys(window: str) -> Tuple[str, str]:
+    """메모리 인덱스를 고정으로 들고 있는 (이번, 지난) 기간 키"""
+    today = datetime.now(timezone.utc).date()
+    previous = today - timedelta(days=7 if window == "week" else 1)
+    return window_key(window, today), window_key(window, previous)
+
+
+def _pinned_daily_dates() -> Tuple[str, str]:
+    """메모리 인덱스를 고정으로 들고 있는 일일 도전 날짜 (오늘, 어제)"""
+    today = datetime.now(timezone.utc).date()
+    return today.isoformat(), (today - timedelta(days=1)).isoformat()
+
+
+def _window_range(key: str) -> Tuple[str, str]:
+    """기간 키 → created_at 범위 [시작, 끝)"""
+    window, _, start = key.partition(":")
+    begin = date.fromisoformat(start)
+    end = begin + timedelta(days=7 if window == "week" else 1)
+    return f"{begin.isoformat()} 00:00:00", f"{end.isoformat()} 00:00:00"
+
 
 def _get_table(mode: str) -> str:
     """모드에 따른 테이블명 반환"""
+    if mode == DAILY_MODE or mode.startswith(DAILY_MODE + ":"):
+        return DAILY_TABLE
+    if mode in LARGE_BOARD_TABLES:
+        return LARGE_BOARD_TABLES[mode]
     return "rankings_hard" if mode == "hard" else "rankings"
 
 
+def _challenge_date(mode: str) -> str:
+    """일일 도전 모드 키의 날짜 ("daily"만 있으면 오늘)"""
+    _, _, challenge_date = mode.partition(":")
+    return challenge_date or today_utc()
+
+
+def _table_sql(table: str) -> Dict[str, str]:
+    return {
+        "insert": f"""
+            INSERT INTO {table} (id, nickname, time_ms, moves, optimal_moves, puzzle_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        "max_id": f"""
+            SELECT MAX(
+                COALESCE((SELECT MAX(id) FROM {table}), 0),
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0)
+            ) as max_id
+        """,
+        "times": f"SELECT time_ms FROM {table} ORDER BY time_ms ASC",
+        "window_times": f"""
+            SELECT time_ms FROM {table}
+            WHERE created_at >= ? AND created_at < ?
+            ORDER BY time_ms ASC
+        """,
+        "window_top": f"""
+            SELECT id, nickname, time_ms, moves, optimal_moves, puzzle_id, created_at
+            FROM {table}
+            WHERE created_at >= ? AND created_at < ?
+            ORDER BY time_ms ASC, id ASC
+            LIMIT ?
+        """,
+        "top": f"""
+            SELECT 
+                id,
+                nickname,
+                time_ms,
+                moves,
+                optimal_moves,
+                puzzle_id,
+                created_at
+            FROM {table}
+            ORDER BY time_ms ASC, id ASC
+            LIMIT ?
+        """,
+    }
+
+
+def _daily_sql() -> Dict[str, str]:
+    """일일 도전 테이블 SQL (times/top은 challenge_date를 첫 번째 인자로 받음)"""
+    sql = _table_sql(DAILY_TABLE)
+    sql["insert"] = f"""
+        INSERT INTO {DAILY_TABLE} (id, nickname, time_ms, moves, optimal_moves, puzzle_id, created_at, challenge_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    sql["times"] = f"SELECT time_ms FROM {DAILY_TABLE} WHERE challenge_date = ? ORDER BY time_ms ASC"
+    sql["top"] = f"""
+        SELECT
+            id,
+            nickname,
+            time_ms,
+            moves,
+            optimal_moves,
+            puzzle_id,
+            created_at
+        FROM {DAILY_TABLE}
+        WHERE challenge_date = ?
+        ORDER BY time_ms ASC, id ASC
+        LIMIT ?
+    """
+    return sql
+
+
+_TABLES = ("rankings", "rankings_hard", *LARGE_BOARD_TABLES.values(), DAILY_TABLE)
+
+# 테이블별 SQL (문자열이 매번 같아야 statement 캐시가 적중)
+_SQL = {table: _table_sql(table) for table in _TABLES}
+_SQL[DAILY_TABLE] = _daily_sql()
+
+# 테이블별 메모리 순위 인덱스 (일일 도전은 날짜별로 _daily_boards에)
+_boards = {table: Leaderboard() for table in _TABLES if table != DAILY_TABLE}
+
+# 오늘/어제 일일 도전 인덱스 (날짜 → 인덱스)
+_daily_boards: Dict[str, Leaderboard] = {}
+_daily_boards_lock = threading.Lock()
+
+# 이번/지난 기간 인덱스 ((테이블, 기간 키) → 인덱스)
+_window_boards: Dict[Tuple[str, str], Leaderboard] = {}
+_window_boards_lock = threading.Lock()
+
+# 날짜/기간 인덱스를 새로 적재하면 version이 이전 값과 겹치지 않도록 세대마다 큰 간격을 둠
+_board_generations = itertools.count(1)
+
+
+def _load_leaderboards():
+    """DB 기록으로 메모리 순위 인덱스 적재 (일일 도전은 날짜별로 처음 쓸 때)"""
+    with get_db() as conn:
+        for table, board in _boards.items():
+            sql = _SQL[table]
+            times = (row[0] for row in conn.execute(sql["times"]))
+            top_rows = [dict(row) for row in conn.execute(sql["top"], (TOP_KEEP,))]
+            board.load(times, top_rows)
+    with _daily_boards_lock:
+        _daily_boards.clear()
+    with _window_boards_lock:
+        _window_boards.clear()
+
+
+def _load_daily_board(challenge_date: str) -> Leaderboard:
+    """일일 도전 날짜 하나의 인덱스를 DB에서 적재"""
+    # writer 큐에 남은 기록까지 보이도록 먼저 비움
+    _writer.flush()
+    board = Leaderboard()
+    board.version = next(_board_generations) << 32
+    sql = _SQL[DAILY_TABLE]
+    with get_db() as conn:
+        times = (row[0] for row in conn.execute(sql["times"], (challenge_date,)))
+        top_rows = [dict(row) for row in conn.execute(sql["top"], (challenge_date, TOP_KEEP))]
+        board.load(times, top_rows)
+    return board
+
+
+def _daily_board(challenge_date: str) -> Leaderboard:
+    """오늘/어제는 고정 인덱스, 그 외 날짜는 공유하지 않는 일회용 인덱스 (DB에서 바로 적재)"""
+    board = _daily_boards.get(challenge_date)
+    if board is not None:
+        return board
+
+    pinned = _pinned_daily_dates()
+    if challenge_date not in pinned:
+        return _load_daily_board(challenge_date)
+
+    with _daily_boards_lock:
+        board = _daily_boards.get(challenge_date)
+        if board is None:
+            board = _daily_boards[challenge_date] = _load_daily_board(challenge_date)
+            for stale in [d for d in _daily_boards if d not in pinned]:
+                del _daily_boards[stale]
+    return board
+
+
+def _load_window_board(table: str, key: str) -> Leaderboard:
+    """기간 하나의 인덱스를 created_at 범위로 DB에서 적재"""
+    # _load_daily_board와 같은 이유로 먼저 비움
+    _writer.flush()
+    board = Leaderboard()
+    board.version = next(_board_generations) << 32
+    sql = _SQL[table]
+    begin, end = _window_range(key)
+    with get_db() as conn:
+        times = (row[0] for row in conn.execute(sql["window_times"], (begin, end)))
+        top_rows = [dict(row) for row in conn.execute(sql["window_top"], (begin, end, TOP_KEEP))]
+        board.load(times, top_rows)
+    return board
+
+
+def _window_board(table: str, key: str) -> Leaderboard:
+    """이번/지난 기간은 고정 인덱스, 그보다 오래된 기간은 공유하지 않는 일회용 인덱스"""
+    board = _window_boards.get((table, key))
+    if board is not None:
+        return board
+
+    window = key.partition(":")[0]
+    pinned = _pinned_window_keys(window)
+    if key not in pinned:
+        return _load_window_board(table, key)
+
+    with _window_boards_lock:
+        board = _window_boards.get((table, key))
+        if board is None:
+            board = _window_boards[(table, key)] = _load_window_board(table, key)
+            for stale in [k for k in _window_boards if k[1].startswith(window + ":") and k[1] not in pinned]:
+                del _window_boards[stale]
+    return board
+
+
+def _board(mode: str, window: Optional[str] = None) -> Leaderboard:
+    """모드(와 기간 키)의 메모리 순위 인덱스 (일일 도전은 기간 없음)"""
+    table = _get_table(mode)
+    if table == DAILY_TABLE:
+        return _daily_board(_challenge_date(mode))
+    if window is not None:
+        return _window_board(table, window)
+    return _boards[table]
+
+
+# 테이블별 다음 기록 id (write-behind라 INSERT 전에 미리 배정)
+_next_ids: Dict[str, int] = {}
+_next_ids_lock = threading.Lock()
+
+
+def _load_next_ids():
+    with get_db() as conn:
+        for table in _TABLES:
+            _next_ids[table] = conn.execute(_SQL[table]["max_id"]).fetchone()["max_id"] + 1
+
+
+def _allocate_id(table: str) -> int:
+    with _next_ids_lock:
+        record_id = _next_ids[table]
+        _next_ids[table] = record_id + 1
+    return record_id
+
+
+# ══════════════════════════════════════════════
+#  write-behind writer
+# ══════════════════════════════════════════════
+
+_STOP = object()
+
+
+class _RankingWriter:
+    """랭킹 INSERT를 모아서 커밋하는 전용 스레드"""
+
+    def __init__(self, window_ms: float, max_batch: int, retries: int = 3):
+        self.window = max(window_ms, 0.0) / 1000
+        self.max_batch = max(max_batch, 1)
+        self.retries = retries
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "max_queue_depth": 0,
+            "errors": 0,
+            "dropped": 0,
+        }
+        self._last_batch_ms = 0.0
+
+    # ── 요청 경로 ──
+
+    def submit(self, table: str, params: tuple) -> None:
+        self._ensure_started()
+        self._queue.put((table, params))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._counters["enqueued"] += 1
+            if depth > self._counters["max_queue_depth"]:
+                self._counters["max_queue_depth"] = depth
+
+    def flush(self) -> None:
+        """지금까지 넣은 기록이 모두 커밋될 때까지 대기"""
+        self._queue.join()
+
+    # ── 수명 주기 ──
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="ranking-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self) -> None:
+        """큐를 끝까지 비우고 스레드 종료"""
+        with self._start_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join()
+
+    # ── writer 스레드 ──
+
+    def _run(self) -> None:
+        conn = _connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(conn, batch)
+            for _ in batch:
+                self._queue.task_done()
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: list) -> None:
+        started = time.perf_counter()
+        if self._write_batch(conn, batch):
+            written = len(batch)
+        else:
+            # 배치 전체를 버리지 않고 한 행씩 다시 써서 실패한 행만 버림
+            written = self._write_rows(conn, batch)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _WRITE_BATCH_SECONDS.observe(elapsed_ms / 1000)
+        with self._stats_lock:
+            self._counters["written"] += written
+            self._counters["batches"] += 1
+            if len(batch) > self._counters["max_batch_size"]:
+                self._counters["max_batch_size"] = len(batch)
+            self._last_batch_ms = elapsed_ms
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> bool:
+        """배치를 executemany + commit 한 번으로 (잠김 등은 재시도, 무결성 오류는 바로 포기)"""
+        by_table: Dict[str, list] = {}
+        for table, params in batch:
+            by_table.setdefault(table, []).append(params)
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                for table, rows in by_table.items():
+                    conn.executemany(_SQL[table]["insert"], rows)
+                conn.commit()
+                return True
+            except sqlite3.Error as exc:
+                if conn.in_transaction:
+                    conn.rollback()
+                with self._stats_lock:
+                    self._counters["errors"] += 1
+                if isinstance(exc, sqlite3.IntegrityError) or attempt == self.retries:
+                    logger.warning("ranking batch write failed (%s), retrying %d rows one at a time", exc, len(batch))
+                    return False
+                time.sleep(0.1 * attempt)
+        return False
+
+    def _write_rows(self, conn: sqlite3.Connection, batch: list) -> int:
+        """한 행씩 INSERT + commit, 실패한 행만 로그 남기고 버림 (쓴 행 수 반환)"""
+        written = 0
+        for table, params in batch:
+            try:
+                conn.execute(_SQL[table]["insert"], params)
+                conn.commit()
+                written += 1
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.exception("ranking write failed, row dropped (table=%s, id=%s)", table, params[0])
+                with self._stats_lock:
+                    self._counters["errors"] += 1
+                    self._counters["dropped"] += 1
+        return written
+
+    # ── 메트릭 ──
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            c = dict(self._counters)
+            last_batch_ms = self._last_batch_ms
+        return {
+            "queue_depth": self._queue.qsize(),
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            **c,
+            "avg_batch_size": round(c["written"] / c["batches"], 2) if c["batches"] else 0.0,
+            "last_batch_ms": round(last_batch_ms, 3),
+        }
+
+
+_WRITE_BATCH_SECONDS = DB_CALL_SECONDS.labels("write_batch")
+_writer = _RankingWriter(DB_WRITE_WINDOW_MS, DB_WRITE_MAX_BATCH)
+
+
+def flush_writes():
+    """대기 중인 랭킹 쓰기가 모두 커밋될 때까지 대기"""
+    _writer.flush()
+
+
+def get_writer_stats() -> dict:
+    """write-behind 큐 깊이/배치 크기 지표"""
+    return _writer.stats()
+
+
+def _format_ranking(rank: int, row) -> dict:
+    return {
+        "rank": rank,
+        "id": row["id"],
+        "nickname": row["nickname"],
+        "time_ms": row["time_ms"],
+        "time_display": format_time(row["time_ms"]),
+        "moves": row["moves"],
+        "optimal_moves": row["optimal_moves"],
+        "move_diff": row["moves"] - row["optimal_moves"],
+        "created_at": row["created_at"],
+    }
+
+
+@DB_CALL_SECONDS.time("add_ranking")
 def add_ranking(
     nickname: str,
     time_ms: int,
@@ -78,96 +691,112 @@ def add_ranking(
     """
     새 랭킹 기록 추가
 
+    메모리 인덱스(전체, 이번 일/주 기간)에 바로 반영하고 전체 순위를 반환,
+    DB INSERT는 writer 스레드가 배치로 처리
+
     Returns:
         {"id": int, "rank": int}
     """
     table = _get_table(mode)
+    # DB 기본값(CURRENT_TIMESTAMP)과 같은 형식, 메모리 인덱스에도 같은 값을 넣기 위해 직접 지정
+    now = datetime.now(timezone.utc)
+    created_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    record_id = _allocate_id(table)
+
+    row = {
+        "id": record_id,
+        "nickname": nickname,
+        "time_ms": time_ms,
+        "moves": moves,
+        "optimal_moves": optimal_moves,
+        "puzzle_id": puzzle_id,
+        "created_at": created_at,
+    }
+    rank = _board(mode).add(row)
+    if table != DAILY_TABLE:
+        # 이번 기간 인덱스도 INSERT 큐에 넣기 전에 갱신 (적재 중인 기간과 중복/누락 없음).
+        # 이번 기간 인덱스는 고정이라 더하는 도중에 내려가서 다시 적재되는 일이 없다
+        for window in WINDOWS:
+            key = window_key(window, now.date())
+            if key in _pinned_window_keys(window):
+                _window_board(table, key).add(row)
+    params = (record_id, nickname, time_ms, moves, optimal_moves, puzzle_id, created_at)
+    if table == DAILY_TABLE:
+        params += (_challenge_date(mode),)
+    _writer.submit(table, params)
+
+    return {"id": record_id, "rank": rank}
+
+
+@DB_CALL_SECONDS.time("get_top_rankings")
+def get_top_rankings(limit: int = 10, mode: str = "ranked", window: Optional[str] = None) -> List[dict]:
+    """상위 랭킹 조회 (TOP_KEEP 이하는 메모리에서), window는 기간 키 (None이면 전체 기간)"""
+    table = _get_table(mode)
 
-    with get_db() as conn:
-        cursor = conn.execute(f"""
-            INSERT INTO {table} (nickname, time_ms, moves, optimal_moves, puzzle_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (nickname, time_ms, moves, optimal_moves, puzzle_id))
+    if limit <= TOP_KEEP:
+        rows = _board(mode, window).top(limit)
+    else:
+        query, params = "top", (limit,)
+        if table == DAILY_TABLE:
+            params = (_challenge_date(mode), limit)
+        elif window is not None:
+            query, params = "window_top", (*_window_range(window), limit)
+        # 아직 커밋 안 된 기록까지 보이도록 먼저 비움
+        _writer.flush()
+        with get_db() as conn:
+            rows = conn.execute(_SQL[table][query], params).fetchall()
 
-        record_id = cursor.lastrowid
-        conn.commit()
+    return [_format_ranking(idx + 1, row) for idx, row in enumerate(rows)]
 
-        rank = conn.execute(f"""
-            SELECT COUNT(*) + 1 as rank
-            FROM {table}
-            WHERE time_ms < ?
-        """, (time_ms,)).fetchone()["rank"]
 
-        return {"id": record_id, "rank": rank}
+@DB_CALL_SECONDS.time("get_rank_for_time")
+def get_rank_for_time(time_ms: int, mode: str = "ranked") -> int:
+    """특정 시간에 대한 예상 순위 반환"""
+    return _board(mode).rank_for_time(time_ms)
+
 
+@DB_CALL_SECONDS.time("get_total_records")
+def get_total_records(mode: str = "ranked", window: Optional[str] = None) -> int:
+    """전체(또는 기간) 기록 수 반환"""
+    return len(_board(mode, window))
 
-def get_top_rankings(limit: int = 10, mode: str = "ranked") -> List[dict]:
-    """상위 랭킹 조회"""
-    table = _get_table(mode)
 
-    with get_db() as conn:
-        rows = conn.execute(f"""
-            SELECT 
-                id,
-                nickname,
-                time_ms,
-                moves,
-                optimal_moves,
-                puzzle_id,
-                created_at
-            FROM {table}
-            ORDER BY time_ms ASC
-            LIMIT ?
-        """, (limit,)).fetchall()
-
-        return [
-            {
-                "rank": idx + 1,
-                "id": row["id"],
-                "nickname": row["nickname"],
-                "time_ms": row["time_ms"],
-                "time_display": format_time(row["time_ms"]),
-                "moves": row["moves"],
-                "optimal_moves": row["optimal_moves"],
-                "move_diff": row["moves"] - row["optimal_moves"],
-                "created_at": row["created_at"],
-            }
-            for idx, row in enumerate(rows)
-        ]
+@DB_CALL_SECONDS.time("get_beats_percent")
+def get_beats_percent(time_ms: int, mode: str = "ranked") -> Optional[float]:
+    """이 시간보다 느린 기존 기록의 비율 % (기록이 없으면 None)"""
+    return _board(mode).beats_percent(time_ms)
 
 
-def get_rank_for_time(time_ms: int, mode: str = "ranked") -> int:
-    """특정 시간에 대한 예상 순위 반환"""
-    table = _get_table(mode)
+@DB_CALL_SECONDS.time("get_time_stats")
+def get_time_stats(mode: str = "ranked", window: Optional[str] = None) -> dict:
+    """기록 시간 분포 (기록 수, 백분위수, 로그 버킷 히스토그램)"""
+    return _board(mode, window).time_stats()
 
-    with get_db() as conn:
-        result = conn.execute(f"""
-            SELECT COUNT(*) + 1 as rank
-            FROM {table}
-            WHERE time_ms < ?
-        """, (time_ms,)).fetchone()
 
-        return result["rank"]
+def get_leaderboard_version(mode: str = "ranked", window: Optional[str] = None) -> int:
+    """랭킹이 바뀔 때마다 증가하는 버전 (응답 캐시 키)"""
+    return _board(mode, window).version
 
 
-def get_total_records(mode: str = "ranked") -> int:
-    """전체 기록 수 반환"""
-    table = _get_table(mode)
+@DB_CALL_SECONDS.time("get_rank_info")
+def get_rank_info(time_ms: int, top_n: int = 10, mode: str = "ranked") -> dict:
+    """
+    랭킹권 여부와 예상 순위를 한 번에 계산 (메모리 이진 탐색)
 
-    with get_db() as conn:
-        result = conn.execute(f"SELECT COUNT(*) as count FROM {table}").fetchone()
-        return result["count"]
+    순위는 (더 빠른 기록 수 + 1)이라 전체 기록이 top_n개 미만이면 항상 랭킹권이다.
+
+    Returns:
+        {"rank_worthy": bool, "rank": int | None (랭킹권 밖이면 None)}
+    """
+    rank = get_rank_for_time(time_ms, mode)
+    if rank <= top_n:
+        return {"rank_worthy": True, "rank": rank}
+    return {"rank_worthy": False, "rank": None}
 
 
 def is_rank_worthy(time_ms: int, top_n: int = 10, mode: str = "ranked") -> bool:
     """해당 시간이 상위 N위 안에 드는지 확인"""
-    total = get_total_records(mode)
-
-    if total < top_n:
-        return True
-
-    rank = get_rank_for_time(time_ms, mode)
-    return rank <= top_n
+    return get_rank_info(time_ms, top_n, mode)["rank_worthy"]
 
 
 def format_time(ms: int) -> str:
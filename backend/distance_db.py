@@ -0,0 +1,453 @@
+"""
+역할 퍼즐 최단거리 테이블 (quick/ranked 모드)
+
+기본 모드 퍼즐은 역할(tank/dps/support)로 추상화하면 상태 공간이 매우 작다.
+- 시작 상태: 역할 개수 (3, 3, 2) + 빈칸 → 9! / (3!·3!·2!·1!) = 5040가지
+- 목표 배치: 역할 개수 (3, 3, 3)        → 9! / (3!·3!·3!)    = 1680가지
+
+2명인 역할(reduced role)을 항상 support로 바꿔 부르는 역할 재명명(relabel)으로
+정규화하면, 모든 (시작, 목표) 쌍의 정확한 최단거리를 1680 × 5040 바이트(약 8.5MB)
+테이블 하나에 담을 수 있다.
+
+빌드:
+    python distance_db.py          # role_distances.bin 생성
+
+서버는 시작 시 파일을 mmap으로 열고, 최단거리 조회는 배열 읽기 1회가 된다.
+파일이 없으면 시작 시 한 번 빌드해서 저장한다.
+
+퍼즐 생성은 목표 배치별 "거리 버킷"(거리순으로 정렬한 상태 인덱스 + 거리별 시작
+오프셋)을 이용해 [min, max] 구간에서 상태 하나를 균등하게 바로 뽑는다.
+"""
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DISTANCE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "role_distances.bin")
+
+ROLE_CODES = {"tank": 0, "dps": 1, "support": 2}
+ROLE_NAMES = ("tank", "dps", "support")
+BLANK = 3
+
+# 2명인 역할을 이 코드로 재명명해서 저장 (정규화 기준)
+CANONICAL_REDUCED = 2
+
+UNREACHABLE = 255
+
+_MAGIC = b"OWRD"
+_VERSION = 3
+_HEADER = struct.Struct("<4sIIII")  # magic, version, n_targets, n_states, 본문 crc32
+
+
+# ══════════════════════════════════════════════
+#  상태/목표 열거
+# ══════════════════════════════════════════════
+
+def _multiset_permutations(counts: Sequence[int]) -> List[Tuple[int, ...]]:
+    """코드별 개수(counts)로 만들 수 있는 모든 배열을 사전순으로 열거"""
+    remaining = list(counts)
+    size = sum(counts)
+    current: List[int] = []
+    result: List[Tuple[int, ...]] = []
+
+    def backtrack() -> None:
+        if len(current) == size:
+            result.append(tuple(current))
+            return
+        for code, left in enumerate(remaining):
+            if left == 0:
+                continue
+            remaining[code] -= 1
+            current.append(code)
+            backtrack()
+            current.pop()
+            remaining[code] += 1
+
+    backtrack()
+    return result
+
+
+# 정규화된 시작 상태: tank 3, dps 3, support 2, 빈칸 1
+STATES: List[Tuple[int, ...]] = _multiset_permutations((3, 3, 2, 1))
+STATE_INDEX: Dict[Tuple[int, ...], int] = {s: i for i, s in enumerate(STATES)}
+
+# 목표 배치: tank 3, dps 3, support 3
+TARGETS: List[Tuple[int, ...]] = _multiset_permutations((3, 3, 3))
+TARGET_INDEX: Dict[Tuple[int, ...], int] = {t: i for i, t in enumerate(TARGETS)}
+
+N_STATES = len(STATES)
+N_TARGETS = len(TARGETS)
+
+
+def _grid_adjacency() -> List[Tuple[int, ...]]:
+    adjacency = []
+    for index in range(9):
+        row, col = index // 3, index % 3
+        adj = []
+        if row > 0:
+            adj.append(index - 3)
+        if row < 2:
+            adj.append(index + 3)
+        if col > 0:
+            adj.append(index - 1)
+        if col < 2:
+            adj.append(index + 1)
+        adjacency.append(tuple(adj))
+    return adjacency
+
+
+def _build_state_graph() -> List[Tuple[int, ...]]:
+    """상태 인덱스 → 이웃 상태 인덱스 (빈칸 이동 1회)"""
+    adjacency = _grid_adjacency()
+    graph = []
+    for state in STATES:
+        empty_idx = state.index(BLANK)
+        neighbors = []
+        for adj_idx in adjacency[empty_idx]:
+            state_list = list(state)
+            state_list[empty_idx], state_list[adj_idx] = state_list[adj_idx], state_list[empty_idx]
+            neighbors.append(STATE_INDEX[tuple(state_list)])
+        graph.append(tuple(neighbors))
+    return graph
+
+
+_state_graph: Optional[List[Tuple[int, ...]]] = None
+
+
+def _get_state_graph() -> List[Tuple[int, ...]]:
+    global _state_graph
+    if _state_graph is None:
+        _state_graph = _build_state_graph()
+    return _state_graph
+
+
+def _goal_states(target: Tuple[int, ...]) -> List[int]:
+    """목표 배치에서 빈칸이 support(정규화된 2명 역할) 칸 중 하나에 있는 정답 상태들"""
+    goals = []
+    for idx, code in enumerate(target):
+        if code != CANONICAL_REDUCED:
+            continue
+        state = list(target)
+        state[idx] = BLANK
+        goals.append(STATE_INDEX[tuple(state)])
+    return goals
+
+
+def compute_row(target_idx: int) -> bytes:
+    """목표 배치 하나에 대해 모든 시작 상태의 최단거리 (다중 시작점 역방향 BFS)"""
+    graph = _get_state_graph()
+    dist = bytearray([UNREACHABLE]) * N_STATES
+
+    queue = deque()
+    for goal in _goal_states(TARGETS[target_idx]):
+        dist[goal] = 0
+        queue.append(goal)
+
+    while queue:
+        node = queue.popleft()
+        next_dist = dist[node] + 1
+        for neighbor in graph[node]:
+            if dist[neighbor] == UNREACHABLE:
+                dist[neighbor] = next_dist
+                queue.append(neighbor)
+
+    return bytes(dist)
+
+
+# ══════════════════════════════════════════════
+#  정규화 (역할 재명명)
+# ══════════════════════════════════════════════
+
+def canonicalize(
+    role_state: Sequence[Optional[str]],
+    target_roles: Sequence[str],
+) -> Optional[Tuple[int, int, Tuple[int, ...]]]:
+    """
+    (역할 상태, 목표 배치) → (목표 인덱스, 상태 인덱스, 재명명 순열)
+
+    재명명 순열 perm[원래 코드] = 정규화 코드. 테이블 형태가 아니면 None.
+    """
+    if len(role_state) != 9 or len(target_roles) != 9:
+        return None
+
+    counts = [0, 0, 0]
+    codes = []
+    for role in role_state:
+        if role is None:
+            codes.append(BLANK)
+            continue
+        code = ROLE_CODES.get(role)
+        if code is None:
+            return None
+        counts[code] += 1
+        codes.append(code)
+
+    if sorted(counts) != [2, 3, 3]:
+        return None
+
+    reduced = counts.index(2)
+    perm = [0, 1, 2]
+    perm[reduced], perm[CANONICAL_REDUCED] = CANONICAL_REDUCED, reduced
+
+    try:
+        target = tuple(perm[ROLE_CODES[role]] for role in target_roles)
+    except KeyError:
+        return None
+
+    target_idx = TARGET_INDEX.get(target)
+    if target_idx is None:
+        return None
+
+    state = tuple(perm[c] if c != BLANK else BLANK for c in codes)
+    return target_idx, STATE_INDEX[state], tuple(perm)
+
+
+# ══════════════════════════════════════════════
+#  테이블 (mmap)
+# ══════════════════════════════════════════════
+
+def build_bytes() -> bytes:
+    """파일 내용 전체: 헤더 + 목표별 최대 거리(N_TARGETS) + 거리 행(N_TARGETS × N_STATES)"""
+    rows = [compute_row(target_idx) for target_idx in range(N_TARGETS)]
+    maxima = bytes(max(d for d in row if d != UNREACHABLE) for row in rows)
+    body = maxima + b"".join(rows)
+    return _HEADER.pack(_MAGIC, _VERSION, N_TARGETS, N_STATES, zlib.crc32(body)) + body
+
+
+def build(path: str = DISTANCE_DB_PATH) -> bytes:
+    """
+    전체 테이블을 계산해서 파일로 저장
+
+    프로세스마다 고유한 임시 파일에 쓰고 os.replace로 바꿔치기해서, 여러 워커가 동시에
+    빌드해도 서로의 쓰기가 섞이지 않는다 (마지막으로 끝난 쪽의 완전한 파일이 남음).
+    """
+    data = build_bytes()
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return data
+
+
+class DistanceTable:
+    """(목표, 시작 상태) → 최단거리 조회 테이블"""
+
+    _ROWS_OFFSET = _HEADER.size + N_TARGETS
+
+    def __init__(self, path: str = DISTANCE_DB_PATH):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._data = self._open()
+        self.max_distance = max(self._data[_HEADER.size:self._ROWS_OFFSET])
+
+    def _open(self):
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._is_valid(mm):
+                self._mm = mm
+                return mm
+            mm.close()
+
+        # 파일이 없거나 형식이 다르면 새로 빌드 (저장 실패 시 메모리에서만 사용)
+        try:
+            return build(self.path)
+        except OSError:
+            return build_bytes()
+
+    @staticmethod
+    def _is_valid(data) -> bool:
+        if len(data) < _HEADER.size:
+            return False
+        magic, version, n_targets, n_states, checksum = _HEADER.unpack_from(data, 0)
+        return (
+            magic == _MAGIC
+            and version == _VERSION
+            and n_targets == N_TARGETS
+            and n_states == N_STATES
+            and len(data) == _HEADER.size + n_targets + n_targets * n_states
+            # 시작할 때 한 번 (8.5MB crc32, 수 ms)
+            and zlib.crc32(memoryview(data)[_HEADER.size:]) == checksum
+        )
+
+    @property
+    def is_mapped(self) -> bool:
+        return self._mm is not None
+
+    def row(self, target_idx: int) -> memoryview:
+        """목표 배치 하나의 거리 행 (N_STATES 바이트)"""
+        offset = self._ROWS_OFFSET + target_idx * N_STATES
+        return memoryview(self._data)[offset:offset + N_STATES]
+
+    def target_max(self, target_idx: int) -> int:
+        """목표 배치에서 가능한 최대 거리"""
+        return self._data[_HEADER.size + target_idx]
+
+    def distance(self, target_idx: int, state_idx: int) -> Optional[int]:
+        d = self._data[self._ROWS_OFFSET + target_idx * N_STATES + state_idx]
+        return None if d == UNREACHABLE else d
+
+    def lookup(
+        self,
+        role_state: Sequence[Optional[str]],
+        target_roles: Sequence[str],
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        역할 상태의 최단거리 조회
+
+        Returns:
+            (테이블 적용 여부, 최단거리 또는 None)
+        """
+        key = canonicalize(role_state, target_roles)
+        if key is None:
+            return False, None
+        target_idx, state_idx, _ = key
+        return True, self.distance(target_idx, state_idx)
+
+
+# ══════════════════════════════════════════════
+#  거리 버킷 (난이도 구간 샘플링)
+# ══════════════════════════════════════════════
+
+@lru_cache(maxsize=256)
+def get_buckets(target_idx: int) -> Tuple[array, Tuple[int, ...]]:
+    """
+    목표 배치의 거리 버킷
+
+    Returns:
+        (order, offsets)
+        order: 거리 오름차순으로 정렬된 상태 인덱스
+        offsets[d]: order에서 거리 d 상태가 시작하는 위치 (offsets[-1] == len(order))
+    """
+    row = get_table().row(target_idx)
+
+    counts = [0] * UNREACHABLE
+    for d in row:
+        counts[d] += 1
+    max_dist = max(d for d in range(UNREACHABLE) if counts[d])
+
+    offsets = [0] * (max_dist + 2)
+    for d in range(max_dist + 1):
+        offsets[d + 1] = offsets[d] + counts[d]
+
+    order = array("H", bytes(2 * offsets[-1]))
+    cursor = offsets[:-1]
+    for state_idx, d in enumerate(row):
+        if d == UNREACHABLE:
+            continue
+        order[cursor[d]] = state_idx
+        cursor[d] += 1
+
+    return order, tuple(offsets)
+
+
+def sample_state(
+    target_idx: int,
+    min_dist: int,
+    max_dist: int,
+    rng: random.Random = random,
+) -> Optional[Tuple[int, int]]:
+    """
+    거리가 [min_dist, max_dist]인 상태를 균등하게 하나 선택
+
+    Returns:
+        (상태 인덱스, 거리) 또는 구간이 비어 있으면 None
+    """
+    order, offsets = get_buckets(target_idx)
+    top = len(offsets) - 2
+    lo = max(min_dist, 0)
+    hi = min(max_dist, top)
+    if lo > hi:
+        return None
+
+    start, end = offsets[lo], offsets[hi + 1]
+    if start == end:
+        return None
+
+    pos = rng.randrange(start, end)
+    # pos가 속한 거리 찾기 (거리 종류가 많지 않아 선형 탐색으로 충분)
+    d = lo
+    while offsets[d + 1] <= pos:
+        d += 1
+    return order[pos], d
+
+
+def nearest_distance(target_idx: int, min_dist: int, max_dist: int) -> Optional[int]:
+    """구간이 비어 있을 때 쓸 가장 가까운 거리 (구간 아래쪽에서는 가장 어려운 거리 우선)"""
+    _, offsets = get_buckets(target_idx)
+    top = len(offsets) - 2
+    present = [d for d in range(1, top + 1) if offsets[d + 1] > offsets[d]]
+    if not present:
+        return None
+    below = [d for d in present if d < min_dist]
+    if below:
+        return below[-1]
+    above = [d for d in present if d > max_dist]
+    return above[0] if above else None
+
+
+def decode_state(state_idx: int, perm: Sequence[int]) -> List[Optional[str]]:
+    """정규화 상태 인덱스 → 실제 역할 배열 (perm은 자기 자신이 역순열인 교환)"""
+    return [
+        None if code == BLANK else ROLE_NAMES[perm[code]]
+        for code in STATES[state_idx]
+    ]
+
+
+def canonical_target(target_roles: Sequence[str], reduced_role: str) -> Tuple[int, Tuple[int, ...]]:
+    """목표 배치 + 2명인 역할 → (정규화 목표 인덱스, 재명명 순열)"""
+    reduced = ROLE_CODES[reduced_role]
+    perm = [0, 1, 2]
+    perm[reduced], perm[CANONICAL_REDUCED] = CANONICAL_REDUCED, reduced
+    target = tuple(perm[ROLE_CODES[role]] for role in target_roles)
+    return TARGET_INDEX[target], tuple(perm)
+
+
+_table: Optional[DistanceTable] = None
+_table_lock = threading.Lock()
+
+
+def get_table() -> DistanceTable:
+    """프로세스 공용 테이블 (최초 호출 시 mmap)"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = DistanceTable()
+    return _table
+
+
+if __name__ == "__main__":
+    import time
+
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+
+    table = DistanceTable()
+    max_dist = table.max_distance
+    histogram = array("L", [0] * (max_dist + 1))
+    for t in range(N_TARGETS):
+        for d in table.row(t):
+            if d != UNREACHABLE:
+                histogram[d] += 1
+
+    print(f"{DISTANCE_DB_PATH} 생성 완료 ({elapsed:.1f}s)")
+    print(f"목표 {N_TARGETS} × 상태 {N_STATES}, 최대 거리 {max_dist}수")
+    for d in range(max_dist + 1):
+        print(f"  {d:2d}수: {histogram[d]}")
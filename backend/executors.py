@@ -0,0 +1,181 @@
+"""
+요청 처리용 전용 스레드 풀 (CPU / DB)
+
+엔드포인트는 async def이고, 막힐 수 있는 작업만 용도별 풀에 넘긴다:
+- cpu: 풀이 비었을 때의 퍼즐 동기 생성, 배치 생성 대기, 힌트/풀이 탐색, 일일 도전 첫 생성
+- db:  결과 제출/랭킹 등록/랭킹 조회 (대부분 메모리 인덱스지만 날짜·기간 인덱스 적재와
+       limit > 100 조회는 SQLite를 읽음)
+
+풀마다 동시 실행 수와 대기열 길이 상한이 따로 있어서, 생성 요청이 몰려 cpu 풀이 꽉 차도
+랭킹 조회는 db 풀에서 바로 실행된다. 대기열이 꽉 차면 기다리지 않고 Overloaded를 던진다
+(엔드포인트에서 503 + Retry-After). 풀에 준비된 퍼즐 꺼내기, 캐시된 정적 응답처럼
+막히지 않는 처리는 이벤트 루프에서 바로 한다.
+
+생성이 스레드에서 돌면 GIL을 나눠 쓰므로 cpu 풀 크기는 코어 수 정도로 둔다
+(무거운 생성은 대부분 puzzle_pool의 워커 프로세스에서 돌고, 여기서는 그 결과를 기다림).
+
+작업은 호출한 쪽의 contextvars를 복사해서 실행한다 (profiling의 요청 표시가 스레드로 넘어감).
+
+메트릭 (GET /metrics):
+- executor_queue_depth{executor}, executor_active{executor}: 대기 중 / 실행 중 작업 수
+- executor_wait_seconds{executor}: 대기열에서 기다린 시간
+- executor_run_seconds{executor}:  실행 시간
+- executor_rejected_total{executor}: 대기열이 꽉 차서 거절한 수
+
+설정 (환경변수):
+- CPU_EXECUTOR_WORKERS: cpu 풀 스레드 수 (기본 CPU 코어 수)
+- CPU_EXECUTOR_QUEUE:   cpu 풀 대기열 상한 (기본 64)
+- DB_EXECUTOR_WORKERS:  db 풀 스레드 수 (기본 4)
+- DB_EXECUTOR_QUEUE:    db 풀 대기열 상한 (기본 256)
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+CPU_EXECUTOR_WORKERS = int(os.environ.get("CPU_EXECUTOR_WORKERS", str(os.cpu_count() or 1)))
+CPU_EXECUTOR_QUEUE = int(os.environ.get("CPU_EXECUTOR_QUEUE", "64"))
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "4"))
+DB_EXECUTOR_QUEUE = int(os.environ.get("DB_EXECUTOR_QUEUE", "256"))
+
+EXECUTOR_WAIT_SECONDS = metrics.histogram(
+    "executor_wait_seconds", "Time a task waited in the executor queue", ("executor",)
+)
+EXECUTOR_RUN_SECONDS = metrics.histogram(
+    "executor_run_seconds", "Task run time on the executor", ("executor",)
+)
+EXECUTOR_REJECTED = metrics.counter(
+    "executor_rejected_total", "Tasks rejected because the executor queue was full", ("executor",)
+)
+
+
+class Overloaded(Exception):
+    """실행기 대기열이 꽉 참"""
+
+
+class BoundedExecutor:
+    """동시 실행 수(스레드 수)와 대기열 길이가 제한된 스레드 풀"""
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = max(workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._counters = {"completed": 0, "rejected": 0, "cancelled": 0}
+        self._wait = EXECUTOR_WAIT_SECONDS.labels(name)
+        self._run = EXECUTOR_RUN_SECONDS.labels(name)
+        self._rejected = EXECUTOR_REJECTED.labels(name)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """func(*args)를 풀에서 실행하고 결과를 기다림 (대기열이 꽉 찼으면 Overloaded)"""
+        with self._lock:
+            # 실행 중 + 대기 중이 스레드 수 + 대기열 상한을 넘으면 거절
+            if self._queued + self._active >= self.workers + self.max_queue:
+                self._counters["rejected"] += 1
+                self._rejected.inc()
+                raise Overloaded(self.name)
+            self._queued += 1
+
+        submitted = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            self._wait.observe(started - submitted)
+            try:
+                return context.run(func, *args)
+            finally:
+                self._run.observe(time.perf_counter() - started)
+                with self._lock:
+                    self._active -= 1
+                    self._counters["completed"] += 1
+
+        def cancelled(future) -> None:
+            # 실행 전에 취소된 작업(종료 시 cancel_futures, 요청 쪽 취소)은 task가 돌지 않으므로 여기서 뺌.
+            # 실행을 시작한 future는 취소될 수 없어서 두 경로가 겹치지 않는다
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._counters["cancelled"] += 1
+
+        try:
+            future = self._executor().submit(task)
+        except RuntimeError:
+            # 종료 중이라 제출 자체가 실패
+            with self._lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        """스레드 풀 (처음 쓸 때, 그리고 shutdown 뒤 다시 쓸 때 만듦)"""
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix=f"{self.name}-executor"
+                    )
+                pool = self._pool
+        return pool
+
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def active(self) -> int:
+        return self._active
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "active": self._active,
+                **self._counters,
+            }
+
+
+cpu = BoundedExecutor("cpu", CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_QUEUE)
+db = BoundedExecutor("db", DB_EXECUTOR_WORKERS, DB_EXECUTOR_QUEUE)
+EXECUTORS = (cpu, db)
+
+metrics.gauge(
+    "executor_queue_depth",
+    "Tasks waiting for an executor thread",
+    lambda: {(e.name,): e.queue_depth() for e in EXECUTORS},
+    ("executor",),
+)
+metrics.gauge(
+    "executor_active",
+    "Tasks running on an executor",
+    lambda: {(e.name,): e.active() for e in EXECUTORS},
+    ("executor",),
+)
+
+
+def shutdown() -> None:
+    for executor in EXECUTORS:
+        executor.shutdown()
+
+
+def stats() -> Dict[str, Any]:
+    return {executor.name: executor.stats() for executor in EXECUTORS}
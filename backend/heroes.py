@@ -1,3 +1,6 @@
+import random
+from types import MappingProxyType
+
 # 오버워치2 영웅 데이터 (2025년 기준)
 # 역할: tank(돌격), dps(공격), support(지원)
 # 세부역할: initiator(개시자), bruiser(투사), stalwart(강건한자),
@@ -104,72 +107,110 @@ SUB_ROLES = {
 }
 
 
-# ═══ 역할별 영웅 ID 리스트 ═══
+# ═══ 역할별 영웅 인덱스 (import 시 한 번 생성, 불변) ═══
+
+BASIC_ROLES = ("tank", "dps", "support")
+
+
+def _build_index(key: str) -> MappingProxyType:
+    index = {}
+    for hero, data in HEROES.items():
+        index.setdefault(data[key], []).append(hero)
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+
+HEROES_BY_ROLE = _build_index("role")
+HEROES_BY_SUB_ROLE = _build_index("sub_role")
+
+# 영웅 ID → 역할/세부역할 (HEROES[h]["role"] 두 단계 조회 대신)
+HERO_ROLE = MappingProxyType({h: data["role"] for h, data in HEROES.items()})
+HERO_SUB_ROLE = MappingProxyType({h: data["sub_role"] for h, data in HEROES.items()})
+
+# 역할별 샘플링 풀 (random.sample은 tuple보다 list가 빠름, 수정하지 말 것)
+TANKS = list(HEROES_BY_ROLE["tank"])
+DPS = list(HEROES_BY_ROLE["dps"])
+SUPPORTS = list(HEROES_BY_ROLE["support"])
+_ROLE_POOLS = {"tank": TANKS, "dps": DPS, "support": SUPPORTS}
+
+# 8명 뽑을 때 (탱커, 딜러, 힐러) 인원 (한 역할만 2명)
+_COUNTS_8 = ((2, 3, 3), (3, 2, 3), (3, 3, 2))
+
+# 하드 모드 세부역할 구성 (탱커/힐러는 전부, 딜러는 4개 중 3개)
+_TANK_SUB_ROLES = tuple(k for k, v in SUB_ROLES.items() if v["parent_role"] == "tank")
+_DPS_SUB_ROLES = tuple(k for k, v in SUB_ROLES.items() if v["parent_role"] == "dps")
+_SUPPORT_SUB_ROLES = tuple(k for k, v in SUB_ROLES.items() if v["parent_role"] == "support")
+
+
+# ═══ 정수 코드 (세션 저장 등 압축 표현용) ═══
+
+HERO_IDS = tuple(HEROES)
+HERO_CODE = {h: i for i, h in enumerate(HERO_IDS)}
 
-TANKS = [h for h, data in HEROES.items() if data["role"] == "tank"]
-DPS = [h for h, data in HEROES.items() if data["role"] == "dps"]
-SUPPORTS = [h for h, data in HEROES.items() if data["role"] == "support"]
+# 목표 칸 이름 (기본역할 + 세부역할)
+ROLE_IDS = ("tank", "dps", "support") + tuple(SUB_ROLES)
+ROLE_CODE = {r: i for i, r in enumerate(ROLE_IDS)}
 
 
 def get_heroes_by_role(role: str) -> list:
     """역할별 영웅 ID 리스트 반환"""
-    return [h for h, data in HEROES.items() if data["role"] == role]
+    return list(HEROES_BY_ROLE.get(role, ()))
 
 
 def get_heroes_by_sub_role(sub_role: str) -> list:
     """세부역할별 영웅 ID 리스트 반환"""
-    return [h for h, data in HEROES.items() if data["sub_role"] == sub_role]
+    return list(HEROES_BY_SUB_ROLE.get(sub_role, ()))
 
 
 def get_hero_role(hero_id: str) -> str:
     """영웅 ID로 역할 반환"""
-    return HEROES.get(hero_id, {}).get("role", None)
+    return HERO_ROLE.get(hero_id)
 
 
 def get_hero_sub_role(hero_id: str) -> str:
     """영웅 ID로 세부역할 반환"""
-    return HEROES.get(hero_id, {}).get("sub_role", None)
+    return HERO_SUB_ROLE.get(hero_id)
 
 
-def get_random_heroes(count: int = 8) -> list:
+def get_random_heroes(count: int = 8, rng: random.Random = random) -> list:
     """
     퍼즐용 랜덤 영웅 선택
     
     count=8: 슬라이딩 퍼즐용 (3+3+2 또는 3+2+3 또는 2+3+3)
     count=9: 전체 채움용 (3+3+3)
+
+    rng: 난수 생성기 (기본은 random 모듈, 재현이 필요하면 시드를 고정한 random.Random)
     """
-    import random
-    
     if count == 9:
-        tanks = random.sample(TANKS, 3)
-        dps = random.sample(DPS, 3)
-        supports = random.sample(SUPPORTS, 3)
+        tanks = rng.sample(TANKS, 3)
+        dps = rng.sample(DPS, 3)
+        supports = rng.sample(SUPPORTS, 3)
         return tanks + dps + supports
     
     elif count == 8:
-        reduced_role = random.choice(['tank', 'dps', 'support'])
-        
-        if reduced_role == 'tank':
-            tanks = random.sample(TANKS, 2)
-            dps = random.sample(DPS, 3)
-            supports = random.sample(SUPPORTS, 3)
-        elif reduced_role == 'dps':
-            tanks = random.sample(TANKS, 3)
-            dps = random.sample(DPS, 2)
-            supports = random.sample(SUPPORTS, 3)
-        else:
-            tanks = random.sample(TANKS, 3)
-            dps = random.sample(DPS, 3)
-            supports = random.sample(SUPPORTS, 2)
-        
-        return tanks + dps + supports
+        n_tank, n_dps, n_support = _COUNTS_8[rng.randrange(3)]
+        return (
+            rng.sample(TANKS, n_tank)
+            + rng.sample(DPS, n_dps)
+            + rng.sample(SUPPORTS, n_support)
+        )
     
     else:
-        all_heroes = list(HEROES.keys())
-        return random.sample(all_heroes, min(count, len(all_heroes)))
+        return rng.sample(HERO_IDS, min(count, len(HERO_IDS)))
 
 
-def get_random_heroes_for_hard() -> dict:
+def get_random_heroes_by_counts(counts: dict, rng: random.Random = random) -> list:
+    """
+    역할별 인원수대로 랜덤 영웅 선택 (4x4, 5x5 보드용)
+
+    counts: {"tank": 5, "dps": 6, "support": 4} 형태
+    """
+    heroes = []
+    for role, count in counts.items():
+        heroes.extend(rng.sample(_ROLE_POOLS[role], count))
+    return heroes
+
+
+def get_random_heroes_for_hard(rng: random.Random = random) -> dict:
     """
     하드모드용 영웅 선택
 
@@ -185,42 +226,47 @@ def get_random_heroes_for_hard() -> dict:
             "solved_state": list[9],      # 정답 상태 (역방향 셔플용)
         }
     """
-    import random
-
     # 1) 세부역할 9개 선택
-    tank_subs = ["initiator", "bruiser", "stalwart"]  # 3개 전부
-    dps_subs = random.sample(["specialist", "recon", "flanker", "sharpshooter"], 3)  # 4개 중 3개
-    support_subs = ["tactician", "medic", "survivor"]  # 3개 전부
-
-    selected_sub_roles = tank_subs + dps_subs + support_subs  # 9개
+    selected_sub_roles = (
+        list(_TANK_SUB_ROLES)                    # 3개 전부
+        + rng.sample(_DPS_SUB_ROLES, 3)           # 4개 중 3개
+        + list(_SUPPORT_SUB_ROLES)               # 3개 전부
+    )
 
     # 2) 9개 중 1개를 상위 기본역할로 변환
-    upgrade_idx = random.randint(0, 8)
+    upgrade_idx = rng.randint(0, 8)
     original_sub = selected_sub_roles[upgrade_idx]
     parent_role = SUB_ROLES[original_sub]["parent_role"]  # tank, dps, support
     selected_sub_roles[upgrade_idx] = parent_role
 
-    random.shuffle(selected_sub_roles)
+    rng.shuffle(selected_sub_roles)
 
     # 3) 각 역할에서 영웅 1명씩 = 9명 (중복 없이!)
+    #    세부역할끼리는 영웅이 겹치지 않으므로 세부역할 칸은 인덱스에서 바로 뽑고,
+    #    겹칠 수 있는 건 기본역할 칸 하나뿐 (같은 역할 세부역할 칸 2개에서 뽑힌 영웅만 피하면 됨)
     heroes_9 = []
-    used_heroes = set()
-
-    for sr in selected_sub_roles:
-        if sr in ("tank", "dps", "support"):
-            candidates = [h for h in get_heroes_by_role(sr) if h not in used_heroes]
+    basic_idx = 0
+    for i, sr in enumerate(selected_sub_roles):
+        if sr == parent_role:
+            basic_idx = i
+            heroes_9.append(None)
         else:
-            candidates = [h for h in get_heroes_by_sub_role(sr) if h not in used_heroes]
-        hero = random.choice(candidates)
-        heroes_9.append(hero)
-        used_heroes.add(hero)
+            heroes_9.append(rng.choice(HEROES_BY_SUB_ROLE[sr]))
+
+    used_heroes = set(heroes_9)
+    candidates = _ROLE_POOLS[parent_role]
+    hero = rng.choice(candidates)
+    while hero in used_heroes:
+        hero = rng.choice(candidates)
+    heroes_9[basic_idx] = hero
 
     # 4) 9명 중 1명 블라인드 → 8명
     #    (기본역할 칸이 아닌 세부역할 칸에서만 블라인드)
-    blind_candidates = [i for i in range(9) if selected_sub_roles[i] not in ("tank", "dps", "support")]
-    blind_idx = random.choice(blind_candidates)
+    blind_idx = rng.randrange(8)
+    if blind_idx >= basic_idx:
+        blind_idx += 1
 
-    heroes_8 = [h for i, h in enumerate(heroes_9) if i != blind_idx]
+    heroes_8 = heroes_9[:blind_idx] + heroes_9[blind_idx + 1:]
 
     # 정답 상태 (역방향 셔플용)
     solved_state = list(heroes_9)
@@ -0,0 +1,76 @@
+"""
+힌트/풀이 (최단 경로)
+
+힌트는 플레이어의 현재 보드에서 빈칸이 갈 다음 칸 하나, 풀이는 초기 상태부터의 전체 최단 경로.
+경로를 한 번 구하면 세션(PuzzleSession.hint_path)에 (시작 상태, 경로 칸) bytes로 저장한다. 그래서
+힌트를 따라 움직이는 동안의 다음 요청과 같은 상태에서의 반복 요청은 풀이기를 다시 돌리지 않고
+저장된 경로를 따라가며 비교하는 것(최대 경로 길이만큼)으로 끝난다. 경로를 벗어난 상태에서 요청하면
+그 상태에서 새로 풀고 저장된 경로를 바꾼다. 세션마다 경로 하나(수십 바이트)만 들고 있어서
+세션 수 상한(SESSION_MAX_ENTRIES)만으로 힌트 캐시 메모리도 묶인다.
+
+풀이기는 모드에 맞는 것을 쓴다:
+- 3x3 기본 모드: 거리 테이블을 따라 한 수씩 내려감 (puzzle.solve_optimal_path)
+- 4x4/5x5: IDA* (노드 예산을 넘으면 실패)
+- 하드 모드: 양방향 BFS + 경로 복원 (puzzle.solve_optimal_path_hard)
+"""
+from typing import List, Optional, Tuple
+
+from puzzle import solve_optimal_path, solve_optimal_path_hard
+from sessions import PuzzleSession, encode_state
+
+
+def _solve(session: PuzzleSession, state: List[Optional[str]]) -> Optional[List[int]]:
+    solve = solve_optimal_path_hard if session.mode == "hard" else solve_optimal_path
+    return solve(state, session.target_roles)
+
+
+def _remember(session: PuzzleSession, state: List[Optional[str]], path: List[int]) -> None:
+    """풀린 경로 하나만 저장 (이전 경로는 버림)"""
+    session.hint_path = (encode_state(state), state.index(None), bytes(path))
+
+
+def _remaining_path(session: PuzzleSession, state: List[Optional[str]]) -> Optional[bytes]:
+    """state가 저장된 경로 위에 있으면 거기서부터 남은 경로 (없으면 None)"""
+    cached = session.hint_path
+    if cached is None:
+        return None
+    start, empty, path = cached
+    key = encode_state(state)
+    board = bytearray(start)
+    for i, tile in enumerate(path):
+        if board == key:
+            return path[i:]
+        board[empty], board[tile] = board[tile], board[empty]
+        empty = tile
+    return b"" if board == key else None
+
+
+def next_move(session: PuzzleSession, state: List[Optional[str]]) -> Optional[Tuple[Optional[int], int]]:
+    """
+    현재 보드에서의 (빈칸이 갈 다음 칸, 남은 최소 이동 수)
+
+    이미 완성된 보드면 (None, 0), 풀 수 없거나 풀이기가 포기하면 None
+    """
+    remaining = _remaining_path(session, state)
+    if remaining is not None:
+        return (remaining[0] if remaining else None), len(remaining)
+
+    path = _solve(session, state)
+    if path is None:
+        return None
+    _remember(session, state, path)
+    return (path[0] if path else None), len(path)
+
+
+def solution(session: PuzzleSession) -> Optional[List[int]]:
+    """초기 상태부터의 전체 최단 경로 (저장된 경로 위에 초기 상태가 있으면 그 뒷부분, 아니면 새로 풂)"""
+    board = session.initial_state
+    remaining = _remaining_path(session, board)
+    if remaining is not None:
+        return list(remaining)
+
+    path = _solve(session, board)
+    if path is None:
+        return None
+    _remember(session, board, path)
+    return path
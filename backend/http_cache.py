@@ -0,0 +1,191 @@
+"""
+HTTP 응답 캐시 도우미
+
+- 응답 본문을 미리 JSON bytes로 직렬화해 두고, 본문 해시로 ETag를 붙인다
+- If-None-Match가 맞으면 본문 없이 304
+- VersionedCache: 데이터 버전(예: 랭킹 등록 횟수)이 같으면 만들어 둔 bytes를 그대로 재사용
+  (키 수 상한 + LRU, 날짜/기간이 들어간 키가 기간이 바뀔 때마다 쌓이지 않도록)
+- StaticAsset: 실행 중 안 바뀌는 데이터를 미리 직렬화 + 압축(gzip, brotli는 설치돼 있으면)
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def encode_json(content: Any) -> bytes:
+    """FastAPI 기본 JSONResponse와 같은 형식으로 직렬화"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def make_etag(body: bytes, suffix: str = "") -> str:
+    """본문 해시 기반 strong ETag"""
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}{suffix}"'
+
+
+def json_body(content: Any) -> CachedBody:
+    body = encode_json(content)
+    return CachedBody(body, make_etag(body))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더(쉼표 목록, W/ 접두어, *)에 etag가 있는지"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def cached_response(
+    request: Request,
+    cached: CachedBody,
+    *,
+    media_type: str = "application/json",
+    cache_control: str = "no-cache",
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """ETag/Cache-Control을 붙인 응답 (조건부 요청이 맞으면 304)"""
+    response_headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if headers:
+        response_headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=cached.body, media_type=media_type, headers=response_headers)
+
+
+class VersionedCache:
+    """키별로 (버전, 직렬화된 본문)을 들고 있다가 버전이 바뀌면 다시 만드는 캐시 (최대 max_entries개, LRU)"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, CachedBody]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, key: Hashable, version: Any, build: Callable[[], CachedBody]) -> CachedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        cached = build()
+        with self._lock:
+            self.misses += 1
+            current = self._entries.get(key)
+            # 그 사이 다른 스레드가 더 새 버전을 넣었으면 덮어쓰지 않음
+            if current is None or current[0] <= version:
+                self._entries[key] = (version, cached)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+        return cached
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding 헤더 → {인코딩: q값}"""
+    accepted: Dict[str, float] = {}
+    if not accept_encoding:
+        return accepted
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+class StaticAsset:
+    """
+    미리 인코딩해 둔 불변 응답
+
+    원본/gzip/br 본문을 한 번만 만들어 두고, 요청의 Accept-Encoding에 맞는 것을 골라 보낸다.
+    ETag는 원본 본문 해시 (압축본은 접미사를 붙여 표현마다 다르게).
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        *,
+        media_type: str = "application/json",
+        cache_control: str = "public, max-age=86400",
+    ):
+        self.media_type = media_type
+        self.cache_control = cache_control
+
+        body = encode_json(content)
+        # (인코딩, 본문, ETag), 선호 순서대로
+        self.variants: List[Tuple[str, CachedBody]] = []
+        if brotli is not None:
+            self.variants.append(
+                ("br", CachedBody(brotli.compress(body, quality=11), make_etag(body, "-br")))
+            )
+        self.variants.append(
+            ("gzip", CachedBody(gzip.compress(body, compresslevel=9, mtime=0), make_etag(body, "-gzip")))
+        )
+        self.identity = CachedBody(body, make_etag(body))
+
+    def response(self, request: Request) -> Response:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+        encoding, cached = None, self.identity
+        for name, variant in self.variants:
+            if accepted.get(name, 0.0) > 0:
+                encoding, cached = name, variant
+                break
+
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return cached_response(
+            request,
+            cached,
+            media_type=self.media_type,
+            cache_control=self.cache_control,
+            headers=headers,
+        )
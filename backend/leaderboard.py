@@ -0,0 +1,119 @@
+"""
+메모리 순위 인덱스
+
+랭킹 테이블별로 기록 시간을 정렬된 배열로 들고 있어서, 순위 계산
+(SELECT COUNT(*) ... WHERE time_ms < ?, O(순위))을 이진 탐색 O(log n)으로 바꾼다.
+상위 TOP_KEEP개 기록은 행 전체를 들고 있어서 랭킹 조회도 DB를 거치지 않는다.
+
+- 서버 시작 시 DB에서 한 번 적재, 이후 add_ranking 때마다 갱신
+- version: 내용이 바뀔 때마다 1씩 증가 (응답 캐시 무효화용)
+- DB는 내구성(재시작 시 복구) 용도로만 쓰임
+- 프로세스 하나 기준 (워커 프로세스가 여럿이면 각자 따로 적재되고 서로의 등록은 모름)
+
+삽입은 array.insert의 memmove라 O(n)이지만, 기록 수십만 건까지는 μs 단위라
+Fenwick 트리 등 별도 구조 없이 정렬 배열로 충분하다.
+
+기록 시간 분포(GET /api/ranking/stats)는 로그 간격 고정 버킷 히스토그램으로 따로 들고 있다
+(add 때 버킷 하나 +1). "상위 몇 %"와 백분위수는 정렬 배열에서 정확히 구한다
+(이진 탐색/인덱스 한 번, 버킷 근사 불필요).
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 메모리에 행 전체를 들고 있을 상위 기록 수 (랭킹 조회 limit 최대값)
+TOP_KEEP = 100
+
+# 시간 히스토그램 버킷 상한(ms): 1초부터 10배마다 10개씩 로그 간격 (~53분까지, 그 위는 마지막 버킷)
+HISTOGRAM_BOUNDS = tuple(int(round(10 ** (3 + i / 10))) for i in range(36))
+
+# 통계 응답에 넣는 백분위수
+STATS_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _histogram(times: Iterable[int]) -> array:
+    counts = array("q", bytes(8 * (len(HISTOGRAM_BOUNDS) + 1)))
+    for time_ms in times:
+        counts[bisect_left(HISTOGRAM_BOUNDS, time_ms)] += 1
+    return counts
+
+
+class Leaderboard:
+    """랭킹 테이블 하나의 순위 인덱스"""
+
+    def __init__(self, top_keep: int = TOP_KEEP):
+        self.top_keep = top_keep
+        self._times = array("q")
+        self._histogram = _histogram(())
+        # (time_ms, id, 행) 정렬 리스트: 같은 시간이면 먼저 등록된 기록이 앞
+        self._top: List[Tuple[int, int, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def load(self, times: Iterable[int], top_rows: Iterable[Dict[str, Any]]) -> None:
+        """DB에서 읽은 전체 시간(정렬 순)과 상위 행으로 초기화"""
+        sorted_times = array("q", times)
+        histogram = _histogram(sorted_times)
+        top = sorted((row["time_ms"], row["id"], row) for row in top_rows)
+        with self._lock:
+            self._times = sorted_times
+            self._histogram = histogram
+            self._top = top[: self.top_keep]
+            self.version += 1
+
+    def add(self, row: Dict[str, Any]) -> int:
+        """기록 추가, 추가된 기록의 순위 반환"""
+        time_ms = row["time_ms"]
+        with self._lock:
+            rank = bisect_left(self._times, time_ms) + 1
+            self._times.insert(bisect_right(self._times, time_ms), time_ms)
+            self._histogram[bisect_left(HISTOGRAM_BOUNDS, time_ms)] += 1
+
+            top = self._top
+            if len(top) < self.top_keep or time_ms < top[-1][0]:
+                insort(top, (time_ms, row["id"], row))
+                del top[self.top_keep:]
+            self.version += 1
+        return rank
+
+    def rank_for_time(self, time_ms: int) -> int:
+        """해당 시간의 예상 순위 (더 빠른 기록 수 + 1)"""
+        return bisect_left(self._times, time_ms) + 1
+
+    def beats_percent(self, time_ms: int) -> Optional[float]:
+        """이 시간보다 느린 기록의 비율 % (기록이 없으면 None)"""
+        times = self._times
+        if not times:
+            return None
+        slower = len(times) - bisect_right(times, time_ms)
+        return round(slower * 100 / len(times), 1)
+
+    def time_stats(self) -> Dict[str, Any]:
+        """기록 수, 백분위수(정확값), 로그 버킷 히스토그램"""
+        with self._lock:
+            times = self._times
+            count = len(times)
+            percentiles = {
+                # nearest-rank: 정렬 순서 ceil(q% × n)번째
+                f"p{q}": times[max(-(-q * count // 100), 1) - 1] if count else None
+                for q in STATS_PERCENTILES
+            }
+            fastest = times[0] if count else None
+            counts = self._histogram.tolist()
+        bounds = HISTOGRAM_BOUNDS + (None,)
+        return {
+            "count": count,
+            "fastest_ms": fastest,
+            "percentiles_ms": percentiles,
+            # le_ms: 버킷 상한 (이 시간 이하, 마지막 버킷은 None = 그 이상 전부)
+            "histogram": [{"le_ms": le, "count": c} for le, c in zip(bounds, counts)],
+        }
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """상위 limit개 행 (limit <= top_keep)"""
+        with self._lock:
+            return [row for _, _, row in self._top[:limit]]
@@ -0,0 +1,335 @@
+"""
+부하 테스트
+
+실제 사용자 흐름을 여러 스레드로 반복한다:
+    GET /api/puzzle/new → (풀이) → POST /api/puzzle/submit → (랭킹권이면) POST /api/ranking/submit
+    + 일정 비율로 GET /api/ranking 폴링 (ETag 재사용)
+
+    python loadtest.py                                   # 앱을 프로세스 안에서 띄워서 (TestClient)
+    python loadtest.py --url http://127.0.0.1:8000       # 떠 있는 uvicorn 대상
+    python loadtest.py -c 8 -d 60 --mix quick=6,ranked=3,hard=1 --output load.json
+
+보고: 처리량(요청/초, 흐름/초), 엔드포인트별 지연 p50/p95/p99, 오류율, 서버 RSS 증가량.
+(--url 모드의 RSS는 --server-pid를 줘야 /proc에서 읽음, Linux 전용)
+
+풀이: 서버의 최단 경로 풀이기(puzzle.solve_optimal_path/_hard)로 이동 기록을 만들어 제출한다.
+
+프로세스 안 모드는 랭킹 기록이 실제 DB에 쌓이지 않도록 기본으로 임시 DB를 쓴다 (--database로 지정 가능).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench import percentile
+
+
+# ══════════════════════════════════════════════
+#  클라이언트
+# ══════════════════════════════════════════════
+
+class _Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """떠 있는 서버용 (urllib)"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, *, body: Any = None, headers: Optional[Dict[str, str]] = None) -> _Response:
+        data = None
+        req_headers = dict(headers or {})
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            req_headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=req_headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return _Response(resp.status, {k.lower(): v for k, v in resp.headers.items()}, resp.read())
+        except urllib.error.HTTPError as e:
+            return _Response(e.code, {k.lower(): v for k, v in e.headers.items()}, e.read())
+
+
+class InProcessClient:
+    """프로세스 안 앱용 (TestClient, 스레드마다 하나)"""
+
+    def __init__(self, app):
+        from fastapi.testclient import TestClient
+        self._client = TestClient(app)
+
+    def request(self, method: str, path: str, *, body: Any = None, headers: Optional[Dict[str, str]] = None) -> _Response:
+        resp = self._client.request(method, path, json=body, headers=headers)
+        return _Response(resp.status_code, {k.lower(): v for k, v in resp.headers.items()}, resp.content)
+
+
+# ══════════════════════════════════════════════
+#  풀이 (이동 기록 만들기)
+# ══════════════════════════════════════════════
+
+def plan_moves(puzzle: Dict[str, Any]) -> Optional[str]:
+    """퍼즐의 최단 이동 기록 (서버와 같은 풀이기 사용, 못 찾으면 None)"""
+    from puzzle import solve_optimal_path, solve_optimal_path_hard
+    from replay import encode_path
+
+    state = puzzle["initial_state"]
+    solve = solve_optimal_path_hard if puzzle.get("mode") == "hard" else solve_optimal_path
+    path = solve(state, puzzle["target_roles"])
+    if path is None:
+        return None
+    return encode_path(state.index(None), path, int(round(len(state) ** 0.5)))
+
+
+# ══════════════════════════════════════════════
+#  부하 실행
+# ══════════════════════════════════════════════
+
+def read_rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    """/proc/<pid>/status의 VmRSS (KB), 못 읽으면 None"""
+    path = f"/proc/{pid or 'self'}/status"
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def parse_mix(text: str) -> List[Tuple[str, int, float]]:
+    """"quick=6,ranked=3,ranked_4x4=1" → [(mode, size, 가중치)]"""
+    mix = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        key, _, weight = part.partition("=")
+        key = key.strip()
+        mode, size = key, 3
+        if "_" in key and key.rsplit("_", 1)[1].count("x") == 1:
+            mode, board = key.rsplit("_", 1)
+            size = int(board.split("x")[0])
+        mix.append((mode, size, float(weight or 1)))
+    return mix
+
+
+class LoadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.flows = 0
+
+    def record(self, endpoint: str, ms: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def flow_done(self) -> None:
+        with self._lock:
+            self.flows += 1
+
+
+def _call(stats: LoadStats, client, endpoint: str, method: str, path: str, **kwargs) -> Optional[_Response]:
+    started = time.perf_counter()
+    try:
+        resp = client.request(method, path, **kwargs)
+    except Exception:
+        stats.record(endpoint, (time.perf_counter() - started) * 1000, False)
+        return None
+    ok = resp.status < 400
+    stats.record(endpoint, (time.perf_counter() - started) * 1000, ok)
+    return resp if ok else None
+
+
+def run_user(client, stats: LoadStats, mix, poll_ratio: float, stop_at: float, flows_left, rng: random.Random) -> None:
+    modes = [(m, s) for m, s, _ in mix]
+    weights = [w for _, _, w in mix]
+    etags: Dict[str, str] = {}
+
+    while time.monotonic() < stop_at:
+        if flows_left is not None:
+            with flows_left["lock"]:
+                if flows_left["n"] <= 0:
+                    return
+                flows_left["n"] -= 1
+
+        mode, size = rng.choices(modes, weights)[0]
+        resp = _call(stats, client, "puzzle_new", "GET", f"/api/puzzle/new?mode={mode}&size={size}")
+        if resp is None:
+            continue
+        puzzle = resp.json()
+
+        sequence = plan_moves(puzzle)
+        moves = len(sequence) if sequence is not None else 30
+        time_ms = moves * 60 + rng.randint(1000, 60000)
+
+        submit = {"puzzle_id": puzzle["puzzle_id"], "time_ms": time_ms, "moves": moves}
+        if sequence is not None:
+            submit["move_sequence"] = sequence
+        resp = _call(stats, client, "puzzle_submit", "POST", "/api/puzzle/submit", body=submit)
+
+        if resp is not None and resp.json().get("needs_nickname"):
+            _call(stats, client, "ranking_submit", "POST", "/api/ranking/submit",
+                  body=dict(submit, nickname=f"load{rng.randint(0, 9999)}"))
+
+        if rng.random() < poll_ratio:
+            ranking_mode = "hard" if mode == "hard" else "ranked"
+            headers = {"If-None-Match": etags[ranking_mode]} if ranking_mode in etags else None
+            resp = _call(stats, client, "ranking_get", "GET", f"/api/ranking?mode={ranking_mode}", headers=headers)
+            if resp is not None and "etag" in resp.headers:
+                etags[ranking_mode] = resp.headers["etag"]
+
+        stats.flow_done()
+
+
+def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    app = None
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+        rss_pid = args.server_pid
+    else:
+        if args.database:
+            os.environ["DATABASE_PATH"] = args.database
+        elif "DATABASE_PATH" not in os.environ:
+            os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="owsp-load-"), "ranking.db")
+        import main
+        app = main.app
+        make_client = lambda: InProcessClient(app)
+        rss_pid = None
+
+    def body() -> Dict[str, Any]:
+        stats = LoadStats()
+        rss_samples: List[int] = []
+        rss_start = read_rss_kb(rss_pid) if (args.url is None or rss_pid) else None
+
+        stop_at = time.monotonic() + args.duration
+        flows_left = {"n": args.flows, "lock": threading.Lock()} if args.flows else None
+        seed_rng = random.Random(args.seed)
+        threads = [
+            threading.Thread(
+                target=run_user,
+                args=(make_client(), stats, mix, args.poll_ratio, stop_at, flows_left,
+                      random.Random(seed_rng.random())),
+                daemon=True,
+            )
+            for _ in range(args.concurrency)
+        ]
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            rss = read_rss_kb(rss_pid) if (args.url is None or rss_pid) else None
+            if rss is not None:
+                rss_samples.append(rss)
+            for t in threads:
+                t.join(timeout=1.0 / max(len(threads), 1))
+        elapsed = time.perf_counter() - started
+
+        return _report(args, stats, elapsed, rss_start, rss_samples)
+
+    if app is not None:
+        # startup/shutdown 훅(거리 테이블, 퍼즐 풀, DB writer)을 한 번만 실행
+        from fastapi.testclient import TestClient
+        with TestClient(app):
+            return body()
+    return body()
+
+
+def _report(args, stats: LoadStats, elapsed: float, rss_start: Optional[int], rss_samples: List[int]) -> Dict[str, Any]:
+    endpoints = {}
+    total_requests = total_errors = 0
+    for endpoint, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        errors = stats.errors.get(endpoint, 0)
+        total_requests += len(values)
+        total_errors += errors
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3),
+            "error_rate": round(errors / len(values), 4),
+        }
+
+    rss = None
+    if rss_samples:
+        first = rss_start if rss_start is not None else rss_samples[0]
+        rss = {
+            "start_kb": first,
+            "end_kb": rss_samples[-1],
+            "max_kb": max(rss_samples),
+            "growth_kb": rss_samples[-1] - first,
+        }
+
+    return {
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "elapsed_sec": round(elapsed, 2),
+        "flows": stats.flows,
+        "flows_per_sec": round(stats.flows / elapsed, 2),
+        "requests": total_requests,
+        "rps": round(total_requests / elapsed, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "endpoints": endpoints,
+        "rss": rss,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="퍼즐 API 부하 테스트")
+    parser.add_argument("--url", default=None, help="대상 서버 (없으면 프로세스 안에서 앱 실행)")
+    parser.add_argument("--server-pid", type=int, default=None, help="--url 모드에서 RSS를 읽을 서버 PID")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="최대 실행 시간(초)")
+    parser.add_argument("-n", "--flows", type=int, default=0, help="흐름(퍼즐 1판) 수 제한 (0이면 duration까지)")
+    parser.add_argument("--mix", default="quick=6,ranked=3,hard=1", help="모드별 가중치 (예: quick=5,ranked_4x4=1)")
+    parser.add_argument("--poll-ratio", type=float, default=0.5, help="흐름당 랭킹 폴링 확률")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database", default=None, help="프로세스 안 모드의 DB 경로 (기본: 임시 파일)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+
+    print(f"대상: {report['target']}  동시성: {report['concurrency']}  시간: {report['elapsed_sec']}s")
+    print(f"흐름: {report['flows']} ({report['flows_per_sec']}/s)  요청: {report['requests']} "
+          f"({report['rps']}/s)  오류율: {report['error_rate']:.2%}")
+    for name, e in report["endpoints"].items():
+        print(f"  {name:15s} n={e['requests']:<6d} p50={e['p50_ms']:8.2f}ms p95={e['p95_ms']:8.2f}ms "
+              f"p99={e['p99_ms']:8.2f}ms err={e['error_rate']:.2%}")
+    if report["rss"]:
+        r = report["rss"]
+        print(f"RSS: {r['start_kb']}KB → {r['end_kb']}KB (최대 {r['max_kb']}KB, 증가 {r['growth_kb']}KB)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,26 +2,64 @@
 오버워치 슬라이딩 퍼즐 - FastAPI 백엔드
 
 API 엔드포인트:
-- GET  /api/puzzle/new       새 퍼즐 생성 (quick/ranked/hard)
+- GET  /api/puzzle/new       새 퍼즐 생성 (quick/ranked/hard/daily)
+- GET  /api/puzzle/batch     퍼즐 여러 개 한 번에 생성 (멀티코어 병렬)
 - POST /api/puzzle/submit    결과 제출
+- POST /api/puzzle/{id}/hint      현재 보드에서 다음 최적 이동
+- GET  /api/puzzle/{id}/solution  전체 최단 풀이 (완성 후)
 - POST /api/ranking/submit   랭킹 등록
 - GET  /api/ranking          상위 랭킹 조회
+- GET  /api/ranking/stats    기록 시간 분포 (백분위수, 히스토그램)
 - GET  /api/heroes           전체 영웅 목록
+- GET  /api/stats            서버 내부 지표
+- GET  /metrics              Prometheus 메트릭
+- GET  /api/debug/profiles   요청 프로파일 목록/다운로드 (관리자, PROFILE_TOKEN 설정 시)
+
+엔드포인트는 async def이고, 막힐 수 있는 작업(동기 생성/힌트 탐색은 executors.cpu,
+제출/랭킹 조회는 executors.db)만 전용 스레드 풀에 넘긴다. 대기열이 꽉 차면 503 + Retry-After.
 """
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from datetime import timedelta
 from typing import Optional
+import uuid
 
-from puzzle import generate_puzzle, generate_puzzle_hard, calculate_move_difference
+from puzzle import BOARD_SIZES, calculate_move_difference
+from puzzle_pool import BASE_MODES, BATCH_MAX, PUZZLE_MODES, PuzzlePool, puzzle_mode_key
+from daily import DailyChallenge, parse_date, today as daily_today
 from database import (
     add_ranking,
+    close_all as close_db,
+    daily_mode_key,
     get_top_rankings,
-    is_rank_worthy,
-    get_rank_for_time,
+    get_beats_percent,
+    get_rank_info,
+    get_leaderboard_version,
+    get_time_stats,
     get_total_records,
+    get_writer_stats,
+    window_key,
+    WINDOWS,
+)
+from http_cache import StaticAsset, VersionedCache, cached_response, json_body
+from heroes import BASIC_ROLES, HEROES, HEROES_BY_ROLE, SUB_ROLES
+from sessions import PuzzleSession, SessionStore
+from replay import (
+    MAX_SEQUENCE_LENGTH,
+    ReplayError,
+    apply_moves,
+    check_time,
+    direction_of,
+    encode_path,
+    replay_moves,
 )
-from heroes import HEROES, SUB_ROLES
+import hints
+from distance_db import get_table as get_distance_table
+import executors
+import metrics
+import profiling
 
 app = FastAPI(
     title="오버워치 슬라이딩 퍼즐",
@@ -38,8 +76,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 진행 중인 퍼즐 저장 (메모리)
-active_puzzles = {}
+# 엔드포인트별 요청 지연 (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 요청 프로파일링 (PROFILE_TOKEN/PROFILE_SAMPLE_RATE가 있을 때만)
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# 진행 중인 퍼즐 세션 (TTL + LRU, 메모리)
+sessions = SessionStore()
+
+
+# 모드별 사전 생성 퍼즐 풀
+puzzle_pool = PuzzlePool()
+
+# 날짜별 일일 도전 퍼즐 (모든 플레이어가 같은 보드)
+daily = DailyChallenge()
+
+# (mode, 기간, limit)별 랭킹 응답 캐시 (랭킹 버전이 바뀔 때만 다시 직렬화).
+# 키에 날짜/기간이 들어가므로 LRU로 상한을 둬서 지난 기간 항목은 밀려나게 함
+ranking_cache = VersionedCache(max_entries=1024)
+RANKING_CACHE_MODES = {"ranked", "hard", *PUZZLE_MODES}
+
+# 스크레이프 시점에 읽는 게이지
+metrics.gauge("active_puzzles", "Puzzle sessions waiting for submission", lambda: len(sessions))
+metrics.gauge(
+    "puzzle_pool_size",
+    "Pre-generated puzzles ready per mode",
+    lambda: {(mode,): m["size"] for mode, m in puzzle_pool.stats()["modes"].items()},
+    ("mode",),
+)
+metrics.gauge("db_write_queue_depth", "Ranking rows waiting for the writer thread", lambda: get_writer_stats()["queue_depth"])
+
+
+@app.on_event("startup")
+def load_distance_table():
+    """역할 퍼즐 최단거리 테이블 mmap (없으면 빌드)"""
+    get_distance_table()
+
+
+@app.on_event("startup")
+def start_puzzle_pool():
+    puzzle_pool.start()
+
+
+@app.on_event("startup")
+def prefetch_daily():
+    daily.prefetch()
+
+
+@app.on_event("shutdown")
+def stop_puzzle_pool():
+    puzzle_pool.stop()
+
+
+@app.on_event("shutdown")
+def stop_executors():
+    executors.shutdown()
+
+
+@app.on_event("shutdown")
+def close_database():
+    close_db()
+
+
+@app.exception_handler(executors.Overloaded)
+async def executor_overloaded(request: Request, exc: executors.Overloaded):
+    """실행기 대기열이 꽉 차면 기다리게 하지 않고 바로 503"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "서버가 혼잡합니다. 잠시 후 다시 시도해주세요"},
+        headers={"Retry-After": "1"},
+    )
 
 
 # === Request/Response 모델 ===
@@ -49,6 +157,8 @@ class SubmitRequest(BaseModel):
     puzzle_id: str
     time_ms: int
     moves: int
+    # 빈칸 이동 방향 기록 ("UDLR..."), 있으면 서버에서 재생해서 이동 수를 다시 계산
+    move_sequence: Optional[str] = Field(None, max_length=MAX_SEQUENCE_LENGTH)
     nickname: Optional[str] = None
 
 
@@ -64,27 +174,69 @@ class SubmitResponse(BaseModel):
     current_rank: Optional[int] = None
     needs_nickname: bool
     mode: str = "ranked"
+    # 이 기록보다 느린 기존 랭킹 기록 비율 % (랭킹 모드만, 기록이 없으면 None)
+    beats_percent: Optional[float] = None
 
 
 class RankingSubmitRequest(BaseModel):
     puzzle_id: str
     time_ms: int
     moves: int
+    move_sequence: Optional[str] = Field(None, max_length=MAX_SEQUENCE_LENGTH)
     nickname: str
 
 
+class HintRequest(BaseModel):
+    # 지금까지의 빈칸 이동 기록 (초기 상태부터), 비어 있으면 초기 상태 기준
+    move_sequence: str = Field("", max_length=MAX_SEQUENCE_LENGTH)
+
+
+# 랭킹 등록이 있는 모드 (일일 도전은 날짜별 키 "daily:YYYY-MM-DD", 큰 보드는 크기별 테이블)
+RANKED_MODES = ("ranked", "hard", "ranked_4x4", "ranked_5x5")
+
+
+def _is_ranked_mode(mode: str) -> bool:
+    """세션 모드(서버가 정한 값)가 랭킹 대상인지 ("daily:" 세션은 _create_daily_puzzle에서만 생김)"""
+    return mode in RANKED_MODES or mode.startswith("daily:")
+
+
+def _check_assist_allowed(session: PuzzleSession) -> None:
+    """
+    일일 도전은 힌트/풀이 불가
+
+    모든 플레이어가 같은 보드라, 한 세션에서 본 최단 경로를 같은 날 새 세션에서 재생하면
+    assisted 표시 없이 랭킹에 오를 수 있기 때문
+    """
+    if session.mode.startswith("daily:"):
+        raise HTTPException(status_code=403, detail="일일 도전은 힌트와 풀이를 제공하지 않습니다")
+
+
+def _verify_moves(session: PuzzleSession, time_ms: int, move_sequence: str) -> int:
+    """이동 기록을 초기 상태에 재생해서 검증, 서버가 센 이동 수 반환"""
+    try:
+        result = replay_moves(session.initial_state, session.target_roles, move_sequence)
+        check_time(time_ms, result.moves)
+    except ReplayError:
+        raise HTTPException(status_code=400, detail="유효하지 않은 이동 기록입니다")
+    return result.moves
+
+
 # === API 엔드포인트 ===
 
 
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "오버워치 슬라이딩 퍼즐 API",
         "endpoints": {
-            "새 퍼즐": "GET /api/puzzle/new?mode=quick|ranked|hard",
+            "새 퍼즐": "GET /api/puzzle/new?mode=quick|ranked|hard|daily&size=3|4|5",
+            "퍼즐 배치": "GET /api/puzzle/batch?mode=quick|ranked|hard&size=3|4|5&n=10",
             "결과 제출": "POST /api/puzzle/submit",
+            "힌트": "POST /api/puzzle/{puzzle_id}/hint",
+            "풀이": "GET /api/puzzle/{puzzle_id}/solution",
             "랭킹 등록": "POST /api/ranking/submit",
-            "랭킹 조회": "GET /api/ranking?mode=ranked|hard",
+            "랭킹 조회": "GET /api/ranking?mode=ranked|hard|daily|ranked_4x4|ranked_5x5&window=all|day|week",
+            "기록 분포": "GET /api/ranking/stats?mode=ranked|hard|daily|ranked_4x4|ranked_5x5",
             "영웅 목록": "GET /api/heroes",
             "세부역할 목록": "GET /api/sub-roles",
         },
@@ -92,29 +244,95 @@ def root():
 
 
 @app.get("/api/puzzle/new")
-def create_puzzle(mode: str = Query("quick", description="quick, ranked, 또는 hard")):
+async def create_puzzle(
+    mode: str = Query("quick", description="quick, ranked, hard, 또는 daily"),
+    size: int = Query(3, description="보드 크기 3, 4, 5 (hard, daily는 3만)"),
+):
     """
     새 퍼즐 생성
 
     Query params:
-        - mode: "quick" (일반전) / "ranked" (경쟁전) / "hard" (하드모드)
+        - mode: "quick" (일반전) / "ranked" (경쟁전) / "hard" (하드모드) / "daily" (일일 도전)
+        - size: 보드 크기 (3=3x3, 4=4x4, 5=5x5)
+
+    풀에 준비된 퍼즐은 이벤트 루프에서 바로 꺼내고, 비어 있을 때만 cpu 실행기에서 생성
     """
-    if mode == "hard":
-        puzzle = generate_puzzle_hard(min_optimal=20, max_optimal=30, shuffle_moves=200)
-    elif mode == "ranked":
-        puzzle = generate_puzzle(min_optimal=20, max_optimal=25, layout="random")
-    else:
-        puzzle = generate_puzzle(min_optimal=5, max_optimal=18, layout="random")
+    if mode == "daily":
+        if size != 3:
+            raise HTTPException(status_code=400, detail="일일 도전은 3x3만 지원합니다")
+        return await executors.cpu.run(_create_daily_puzzle)
+
+    # 사전 생성 풀에서 O(1)로 꺼냄 (비어 있으면 동기 생성)
+    pool_key = _pool_key(mode, size)
+    puzzle = puzzle_pool.try_pop(pool_key)
+    if puzzle is None:
+        puzzle = await executors.cpu.run(_generate_puzzle, pool_key)
+
+    # 세션 모드는 요청 문자열이 아니라 서버가 검증한 풀 키로 저장
+    # (큰 보드는 3x3 랭킹과 섞이지 않도록 quick_4x4 등, ranked_NxN은 크기별 랭킹).
+    # "daily:<날짜>" 세션은 _create_daily_puzzle만 만든다
+    mode = pool_key
 
     # 퍼즐 정보 저장 (검증용)
-    active_puzzles[puzzle["puzzle_id"]] = {
-        "optimal_moves": puzzle["optimal_moves"],
-        "initial_state": puzzle["initial_state"],
-        "target_roles": puzzle["target_roles"],
-        "empty_index": puzzle["empty_index"],
+    sessions.put(puzzle["puzzle_id"], puzzle, mode)
+
+    return _puzzle_response(puzzle, mode, size)
+
+
+@profiling.profiled("create_puzzle")
+def _generate_puzzle(pool_key: str):
+    """풀이 비었을 때 요청 대신 생성 (cpu 실행기에서)"""
+    return puzzle_pool.generate(pool_key)
+
+
+@app.get("/api/puzzle/batch")
+async def create_puzzle_batch(
+    mode: str = Query("quick", description="quick, ranked, 또는 hard"),
+    size: int = Query(3, description="보드 크기 3, 4, 5 (hard는 3만)"),
+    n: int = Query(10, description=f"퍼즐 수 (1~{BATCH_MAX})"),
+):
+    """
+    새 퍼즐 여러 개를 한 번에 생성 (클라이언트 미리 받기, 대회용)
+
+    풀에 준비된 퍼즐을 먼저 쓰고, 모자란 만큼은 모든 코어에 나눠 병렬 생성한다.
+    세션도 한 번에 등록되고, 각 퍼즐은 /api/puzzle/new로 받은 것과 똑같이 제출한다.
+    """
+    if mode == "daily":
+        raise HTTPException(status_code=400, detail="일일 도전은 배치로 받을 수 없습니다")
+    if not 1 <= n <= BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"퍼즐 수는 1~{BATCH_MAX}개입니다")
+
+    mode = pool_key = _pool_key(mode, size)
+    puzzles = await executors.cpu.run(_create_batch, pool_key, n, mode)
+
+    return {
         "mode": mode,
+        "size": size,
+        "count": len(puzzles),
+        "puzzles": [_puzzle_response(puzzle, mode, size) for puzzle in puzzles],
     }
 
+
+def _create_batch(pool_key: str, n: int, mode: str):
+    """배치 생성(프로세스 풀 대기) + 세션 일괄 등록 (cpu 실행기에서)"""
+    puzzles = puzzle_pool.pop_many(pool_key, n)
+    sessions.put_many(puzzles, mode)
+    return puzzles
+
+
+def _pool_key(mode: str, size: int) -> str:
+    """요청의 (기본 모드, 보드 크기) → 풀/세션 모드 키 (quick_4x4 같은 접미사 모드나 없는 조합은 400)"""
+    if size not in BOARD_SIZES:
+        raise HTTPException(status_code=400, detail="지원하지 않는 보드 크기입니다")
+    if mode not in BASE_MODES:
+        raise HTTPException(status_code=400, detail="지원하지 않는 모드입니다")
+    try:
+        return puzzle_mode_key(mode, size)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="하드 모드는 3x3만 지원합니다")
+
+
+def _puzzle_response(puzzle, mode: str, size: int):
     return {
         "puzzle_id": puzzle["puzzle_id"],
         "initial_state": puzzle["initial_state"],
@@ -122,34 +340,53 @@ def create_puzzle(mode: str = Query("quick", description="quick, ranked, 또는
         "empty_index": puzzle["empty_index"],
         "heroes": puzzle["heroes"],
         "mode": mode,
+        "size": size,
     }
 
 
 @app.post("/api/puzzle/submit", response_model=SubmitResponse)
-def submit_result(request: SubmitRequest):
+async def submit_result(request: SubmitRequest):
     """
     퍼즐 결과 제출 (닉네임 없이)
 
     랭킹권이면 needs_nickname=True 반환
     """
-    if request.puzzle_id not in active_puzzles:
+    return await executors.db.run(_submit_result, request)
+
+
+@profiling.profiled("submit_result")
+def _submit_result(request: SubmitRequest) -> SubmitResponse:
+    session = sessions.get(request.puzzle_id)
+    if session is None or session.claimed:
         raise HTTPException(status_code=404, detail="퍼즐을 찾을 수 없습니다")
 
-    puzzle_info = active_puzzles[request.puzzle_id]
-    optimal_moves = puzzle_info["optimal_moves"]
-    mode = puzzle_info["mode"]
+    if request.time_ms <= 0:
+        raise HTTPException(status_code=400, detail="기록 시간이 올바르지 않습니다")
+
+    optimal_moves = session.optimal_moves
+    mode = session.mode
+
+    # 이동 기록이 있으면 재생해서 검증 (이동 수는 서버 계산값 사용)
+    verified = request.move_sequence is not None
+    moves = request.moves
+    if verified:
+        moves = _verify_moves(session, request.time_ms, request.move_sequence)
+        session.finished = True
 
     # 이동 횟수 차이 계산
-    diff_info = calculate_move_difference(request.moves, optimal_moves)
+    diff_info = calculate_move_difference(moves, optimal_moves)
 
-    # 랭킹권 확인 (ranked, hard만)
+    # 랭킹권 확인 (ranked, hard, daily만, 힌트/풀이 없이 검증된 기록만)
     rank_worthy = False
     current_rank = None
+    beats_percent = None
 
-    if mode in ("ranked", "hard"):
-        rank_worthy = is_rank_worthy(request.time_ms, top_n=10, mode=mode)
-        if rank_worthy:
-            current_rank = get_rank_for_time(request.time_ms, mode=mode)
+    if _is_ranked_mode(mode):
+        beats_percent = get_beats_percent(request.time_ms, mode=mode)
+        if verified and not session.assisted:
+            rank_info = get_rank_info(request.time_ms, top_n=10, mode=mode)
+            rank_worthy = rank_info["rank_worthy"]
+            current_rank = rank_info["rank"]
 
     # 시간 포맷
     total_seconds = request.time_ms // 1000
@@ -162,7 +399,7 @@ def submit_result(request: SubmitRequest):
         success=True,
         time_ms=request.time_ms,
         time_display=time_display,
-        moves=request.moves,
+        moves=moves,
         optimal_moves=optimal_moves,
         move_difference=diff_info["difference"],
         grade=diff_info["grade"],
@@ -170,18 +407,32 @@ def submit_result(request: SubmitRequest):
         current_rank=current_rank,
         needs_nickname=rank_worthy,
         mode=mode,
+        beats_percent=beats_percent,
     )
 
 
 @app.post("/api/ranking/submit")
-def submit_ranking(request: RankingSubmitRequest):
+async def submit_ranking(request: RankingSubmitRequest):
     """랭킹 등록 (닉네임 포함)"""
-    if request.puzzle_id not in active_puzzles:
+    return await executors.db.run(_submit_ranking, request)
+
+
+@profiling.profiled("submit_ranking")
+def _submit_ranking(request: RankingSubmitRequest):
+    session = sessions.get(request.puzzle_id)
+    if session is None or session.claimed:
         raise HTTPException(status_code=404, detail="퍼즐을 찾을 수 없습니다")
+    if session.assisted:
+        raise HTTPException(status_code=400, detail="힌트나 풀이를 본 기록은 랭킹에 등록할 수 없습니다")
+
+    optimal_moves = session.optimal_moves
+    mode = session.mode
 
-    puzzle_info = active_puzzles[request.puzzle_id]
-    optimal_moves = puzzle_info["optimal_moves"]
-    mode = puzzle_info["mode"]
+    # 랭킹이 없는 모드(quick, quick_NxN)는 등록 불가
+    if not _is_ranked_mode(mode):
+        raise HTTPException(status_code=400, detail="랭킹이 없는 모드입니다")
+    if request.time_ms <= 0:
+        raise HTTPException(status_code=400, detail="기록 시간이 올바르지 않습니다")
 
     # 닉네임 검증
     if not request.nickname or len(request.nickname.strip()) == 0:
@@ -189,19 +440,25 @@ def submit_ranking(request: RankingSubmitRequest):
     if len(request.nickname) > 20:
         raise HTTPException(status_code=400, detail="닉네임은 20자 이하로 입력해주세요")
 
+    # 이동 기록 재생 검증 (필수)
+    if request.move_sequence is None:
+        raise HTTPException(status_code=400, detail="이동 기록이 필요합니다")
+    moves = _verify_moves(session, request.time_ms, request.move_sequence)
+
+    # 세션을 원자적으로 claim (동시 요청 중 하나만 등록, 재사용 방지)
+    if sessions.claim(request.puzzle_id) is None:
+        raise HTTPException(status_code=404, detail="퍼즐을 찾을 수 없습니다")
+
     # 랭킹 등록 (모드에 따라 다른 테이블)
     result = add_ranking(
         nickname=request.nickname.strip(),
         time_ms=request.time_ms,
-        moves=request.moves,
+        moves=moves,
         optimal_moves=optimal_moves,
         puzzle_id=request.puzzle_id,
         mode=mode,
     )
 
-    # 퍼즐 정보 삭제 (재사용 방지)
-    del active_puzzles[request.puzzle_id]
-
     return {
         "success": True,
         "rank": result["rank"],
@@ -209,63 +466,298 @@ def submit_ranking(request: RankingSubmitRequest):
     }
 
 
+@app.post("/api/puzzle/{puzzle_id}/hint")
+async def get_hint(puzzle_id: str, request: HintRequest):
+    """
+    힌트: 현재 보드에서 빈칸의 다음 최적 이동
+
+    move_sequence로 현재 보드를 재구성해서 그 상태 기준으로 계산한다.
+    힌트를 본 퍼즐은 랭킹에 등록할 수 없다.
+    """
+    return await executors.cpu.run(_hint, puzzle_id, request)
+
+
+def _hint(puzzle_id: str, request: HintRequest):
+    session = sessions.get(puzzle_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="퍼즐을 찾을 수 없습니다")
+    _check_assist_allowed(session)
+
+    try:
+        state = apply_moves(session.initial_state, request.move_sequence)
+    except ReplayError:
+        raise HTTPException(status_code=400, detail="유효하지 않은 이동 기록입니다")
+
+    hint = hints.next_move(session, state)
+    if hint is None:
+        raise HTTPException(status_code=503, detail="풀이를 계산하지 못했습니다")
+    tile, remaining = hint
+    if tile is None:
+        raise HTTPException(status_code=400, detail="이미 완성된 퍼즐입니다")
+
+    session.assisted = True
+    size = int(round(len(state) ** 0.5))
+    return {
+        "direction": direction_of(state.index(None), tile, size),
+        "tile_index": tile,
+        "remaining_moves": remaining,
+    }
+
+
+@app.get("/api/puzzle/{puzzle_id}/solution")
+async def get_solution(puzzle_id: str):
+    """전체 최단 풀이 (검증된 결과를 제출한 뒤에만, 랭킹 등록 후에도 조회 가능)"""
+    return await executors.cpu.run(_solution, puzzle_id)
+
+
+def _solution(puzzle_id: str):
+    session = sessions.get(puzzle_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="퍼즐을 찾을 수 없습니다")
+    _check_assist_allowed(session)
+    if not session.finished:
+        raise HTTPException(status_code=403, detail="퍼즐을 완성한 뒤에 볼 수 있습니다")
+
+    path = hints.solution(session)
+    if path is None:
+        raise HTTPException(status_code=503, detail="풀이를 계산하지 못했습니다")
+
+    session.assisted = True
+    state = session.initial_state
+    return {
+        "optimal_moves": len(path),
+        "move_sequence": encode_path(state.index(None), path, int(round(len(state) ** 0.5))),
+        "path": path,
+    }
+
+
+def _create_daily_puzzle():
+    """오늘의 일일 도전 (캐시된 보드 공유, 세션은 플레이어마다 새로)"""
+    puzzle = daily.get()
+    puzzle_id = str(uuid.uuid4())
+    sessions.put(puzzle_id, puzzle, daily_mode_key(puzzle["date"]))
+
+    return {
+        "puzzle_id": puzzle_id,
+        "initial_state": puzzle["initial_state"],
+        "target_roles": puzzle["target_roles"],
+        "empty_index": puzzle["empty_index"],
+        "heroes": puzzle["heroes"],
+        "mode": "daily",
+        "size": 3,
+        "date": puzzle["date"],
+    }
+
+
+def _build_ranking_body(limit: int, mode: str, window: Optional[str]):
+    body = {
+        "total_records": get_total_records(mode=mode, window=window),
+        "rankings": get_top_rankings(limit, mode=mode, window=window),
+        "mode": mode,
+    }
+    if window is not None:
+        body["window"] = window
+    return json_body(body)
+
+
 @app.get("/api/ranking")
-def get_ranking(
+async def get_ranking(
+    request: Request,
     limit: int = 10,
-    mode: str = Query("ranked", description="ranked 또는 hard"),
+    mode: str = Query("ranked", description="ranked, hard, 또는 daily"),
+    date: Optional[str] = Query(None, description="daily/기간 랭킹 날짜 YYYY-MM-DD (기본 오늘, UTC)"),
+    window: str = Query("all", description="all (전체), day (하루), week (월요일부터 한 주), UTC 기준"),
 ):
     """
     상위 랭킹 조회
 
     Query params:
         - limit: 조회할 순위 수 (기본 10)
-        - mode: "ranked" (경쟁전 랭킹) 또는 "hard" (하드 모드 랭킹)
+        - mode: "ranked" (경쟁전 랭킹) / "hard" (하드 모드 랭킹) / "daily" (일일 도전 랭킹)
+        - date: daily 랭킹 날짜, 또는 day/week 기간에 포함된 날짜 (기본 오늘)
+        - window: ranked/hard의 기간 랭킹 (기본 all)
+
+    랭킹이 바뀌지 않았으면 직렬화해 둔 응답을 그대로 보내고,
+    If-None-Match가 ETag와 같으면 304를 반환
     """
     if limit < 1 or limit > 100:
         limit = 10
 
-    rankings = get_top_rankings(limit, mode=mode)
-    total = get_total_records(mode=mode)
+    mode, period, cacheable = _ranking_mode(mode, date, window)
+    cached = await executors.db.run(_ranking_body, mode, period, limit, cacheable)
+    return cached_response(request, cached)
 
-    return {
-        "total_records": total,
-        "rankings": rankings,
-        "mode": mode,
-    }
+
+def _ranking_body(mode: str, period: Optional[str], limit: int, cacheable: bool):
+    """랭킹 응답 본문 (캐시 적중이면 버전 비교만, db 실행기에서)"""
+    if not cacheable:
+        return _build_ranking_body(limit, mode, period)
+    return ranking_cache.get(
+        (mode, period, limit),
+        get_leaderboard_version(mode, period),
+        lambda: _build_ranking_body(limit, mode, period),
+    )
+
+
+@app.get("/api/ranking/stats")
+async def get_ranking_stats(
+    request: Request,
+    mode: str = Query("ranked", description="ranked, hard, 또는 daily"),
+    date: Optional[str] = Query(None, description="daily/기간 랭킹 날짜 YYYY-MM-DD (기본 오늘, UTC)"),
+    window: str = Query("all", description="all, day, week"),
+):
+    """
+    랭킹 기록 시간 분포
+
+    기록 수, 백분위수(p10~p90, 정확값), 로그 간격 버킷 히스토그램.
+    메모리 인덱스에서 바로 만들고 랭킹 조회와 같은 버전으로 캐시/ETag 처리.
+    """
+    mode, period, cacheable = _ranking_mode(mode, date, window)
+    cached = await executors.db.run(_stats_body, mode, period, cacheable)
+    return cached_response(request, cached)
+
+
+def _stats_body(mode: str, period: Optional[str], cacheable: bool):
+    if not cacheable:
+        return _build_stats_body(mode, period)
+    return ranking_cache.get(
+        (mode, period, "stats"),
+        get_leaderboard_version(mode, period),
+        lambda: _build_stats_body(mode, period),
+    )
+
+
+def _build_stats_body(mode: str, window: Optional[str]):
+    body = {"mode": mode, **get_time_stats(mode, window)}
+    if window is not None:
+        body["window"] = window
+    return json_body(body)
+
+
+def _ranking_mode(mode: str, date: Optional[str], window: str = "all"):
+    """
+    랭킹 조회 파라미터 → (DB 모드 키, 기간 키 또는 None, 응답 캐시 여부)
+
+    daily는 날짜 키로, day/week는 date가 속한 기간 키로 바꾼다.
+    캐시 키가 날짜 수만큼 늘어나지 않도록 이번/지난 날짜·기간만 캐시.
+    """
+    if window != "all" and window not in WINDOWS:
+        raise HTTPException(status_code=400, detail="지원하지 않는 기간입니다 (all, day, week)")
+    if mode != "daily" and window == "all":
+        return mode, None, mode in RANKING_CACHE_MODES
+    if mode == "daily" and window != "all":
+        raise HTTPException(status_code=400, detail="일일 도전은 기간 랭킹을 지원하지 않습니다")
+
+    today = daily_today()
+    try:
+        day = parse_date(date) if date else today
+    except ValueError:
+        raise HTTPException(status_code=400, detail="날짜 형식이 올바르지 않습니다 (YYYY-MM-DD)")
+
+    if mode == "daily":
+        return daily_mode_key(day.isoformat()), None, (today - day).days in (0, 1)
+
+    key = window_key(window, day)
+    previous = today - timedelta(days=7 if window == "week" else 1)
+    recent = key in (window_key(window, today), window_key(window, previous))
+    return mode, key, recent and mode in RANKING_CACHE_MODES
+
+
+# 영웅/세부역할 목록: 실행 중 안 바뀌므로 시작할 때 한 번 직렬화 + 압축
+HEROES_CATALOG = StaticAsset({
+    "total": len(HEROES),
+    "heroes": HEROES,
+    "by_role": {role: list(HEROES_BY_ROLE[role]) for role in BASIC_ROLES},
+})
+
+SUB_ROLES_CATALOG = StaticAsset({
+    "sub_roles": SUB_ROLES,
+    "by_parent": {
+        "tank": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "tank"},
+        "dps": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "dps"},
+        "support": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "support"},
+    },
+})
 
 
 @app.get("/api/heroes")
-def get_heroes():
+async def get_heroes(request: Request):
     """전체 영웅 목록 반환"""
-    return {
-        "total": len(HEROES),
-        "heroes": HEROES,
-        "by_role": {
-            "tank": [h for h, d in HEROES.items() if d["role"] == "tank"],
-            "dps": [h for h, d in HEROES.items() if d["role"] == "dps"],
-            "support": [h for h, d in HEROES.items() if d["role"] == "support"],
-        },
-    }
+    return HEROES_CATALOG.response(request)
 
 
 @app.get("/api/sub-roles")
-def get_sub_roles():
+async def get_sub_roles(request: Request):
     """세부 역할군 목록 반환 (하드 모드 프론트엔드용)"""
-    return {
-        "sub_roles": SUB_ROLES,
-        "by_parent": {
-            "tank": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "tank"},
-            "dps": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "dps"},
-            "support": {k: v for k, v in SUB_ROLES.items() if v["parent_role"] == "support"},
-        },
-    }
+    return SUB_ROLES_CATALOG.response(request)
 
 
 @app.get("/healthz")
-def healthz():
+async def healthz():
     return {"ok": True}
 
 
+@app.get("/api/stats")
+async def get_stats():
+    """서버 내부 지표 (퍼즐 풀 적중률/보충 속도, 세션 수, DB 쓰기 큐, 실행기 대기열 등)"""
+    return {
+        "executors": executors.stats(),
+        "puzzle_pool": puzzle_pool.stats(),
+        "sessions": sessions.stats(),
+        "db_writer": get_writer_stats(),
+        "ranking_cache": ranking_cache.stats(),
+        "daily": daily.stats(),
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 텍스트 형식 메트릭 (생성 지연/시도/탐색 노드, DB 함수 지연, 엔드포인트 지연 등)"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _require_profile_admin(token: Optional[str]) -> None:
+    if not profiling.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="프로파일링이 비활성화되어 있습니다")
+    if not profiling.check_token(token):
+        raise HTTPException(status_code=403, detail="권한이 없습니다")
+
+
+@app.get("/api/debug/profiles")
+def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """최근 요청 프로파일 목록 (관리자 전용, 최신순)"""
+    _require_profile_admin(x_profile_token)
+    return {"profiles": profiling.store.list()}
+
+
+@app.get("/api/debug/profiles/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: str = Query("pstats", description="pstats (파일 다운로드) 또는 text (누적 시간 상위 함수)"),
+    x_profile_token: Optional[str] = Header(None),
+):
+    """
+    프로파일 하나 다운로드 (관리자 전용)
+
+    pstats 파일은 `python -m pstats profile-<id>.prof`나 snakeviz로 열 수 있다.
+    """
+    _require_profile_admin(x_profile_token)
+    if format == "text":
+        summary = profiling.store.summary(profile_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다")
+        return Response(content=summary, media_type="text/plain")
+
+    data = profiling.store.data(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
+
+
 # === 서버 실행 ===
 if __name__ == "__main__":
     import uvicorn
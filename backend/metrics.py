@@ -0,0 +1,370 @@
+"""
+Prometheus 텍스트 형식 메트릭 (GET /metrics)
+
+운영에서 켜 둬도 될 만큼 가볍게:
+- 카운터/히스토그램 값은 스레드별 조각(shard)에 쌓는다. 조각은 그 스레드만 쓰므로
+  기록할 때 락이 없고, 스크레이프할 때만 모든 조각을 합친다.
+- 조각은 스레드가 처음 기록할 때 한 번 만들어지고 이후 재사용 (기록마다 할당 없음)
+- 라벨 조합별 자식(labels(...))은 모듈 상수로 미리 잡아 두면 조회 비용도 없음
+- 게이지는 스크레이프 시점에 콜백으로 읽음 (세션 수, 큐 깊이 등)
+
+BFS/IDA* 루프 안에서는 여기를 부르지 않는다. 탐색량은 puzzle.SEARCH_STATS에 층 단위로
+더해지고, 생성 결과의 "search" 항목(시도/노드/시간)을 퍼즐 풀에서 한 번에 기록한다.
+(생성은 워커 프로세스에서 돌기 때문에 부모 프로세스로 돌아온 값만 집계 가능)
+"""
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# 지연 시간(초) 버킷
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 개수(시도/노드) 버킷
+ATTEMPT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+NODE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# ══════════════════════════════════════════════
+#  스레드별 조각
+# ══════════════════════════════════════════════
+
+class _Sharded:
+    """스레드마다 길이 width짜리 리스트 하나를 주고, 읽을 때 합친다"""
+
+    __slots__ = ("_width", "_local", "_shards", "_lock")
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> list:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._width
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def total(self) -> list:
+        with self._lock:
+            shards = list(self._shards)
+        result = [0] * self._width
+        for shard in shards:
+            for i, value in enumerate(shard):
+                result[i] += value
+        return result
+
+
+class _CounterChild(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self.shard()[0] += amount
+
+    def value(self) -> float:
+        return self.total()[0]
+
+
+class _HistogramChild(_Sharded):
+    """조각 = [버킷별 개수..., +Inf 개수, 합계]"""
+
+    __slots__ = ("_bounds",)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value: float) -> None:
+        shard = self.shard()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """(누적 버킷 개수, 전체 개수, 합계)"""
+        total = self.total()
+        cumulative, running = [], 0
+        for count in total[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, total[-1]
+
+
+# ══════════════════════════════════════════════
+#  메트릭
+# ══════════════════════════════════════════════
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.value())}"
+            for key, child in self._items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self, *values: str):
+        """함수 실행 시간(초)을 기록하는 데코레이터"""
+        child = self.labels(*values)
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def _samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, child in self._items():
+            cumulative, count, total = child.snapshot()
+            for bound, value in zip(bounds, cumulative):
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {value}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """스크레이프 때 콜백으로 읽는 게이지 (콜백은 숫자 또는 {라벨 튜플: 숫자})"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._read = read
+
+    def _samples(self) -> List[str]:
+        value = self._read()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(float(v))}"
+            for key, v in sorted(value.items())
+        ]
+
+
+# ══════════════════════════════════════════════
+#  레지스트리
+# ══════════════════════════════════════════════
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name: str, documentation: str, read: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+    """같은 이름으로 다시 등록하면 콜백을 교체"""
+    metric = Gauge(name, documentation, read, labelnames)
+    with _registry_lock:
+        _registry[name] = metric
+    return metric
+
+
+def render() -> bytes:
+    """전체 메트릭을 Prometheus 텍스트 형식으로"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ══════════════════════════════════════════════
+#  퍼즐 생성
+# ══════════════════════════════════════════════
+
+GENERATION_SECONDS = histogram(
+    "puzzle_generation_seconds", "Puzzle generation latency", ("mode",)
+)
+GENERATION_ATTEMPTS = histogram(
+    "puzzle_generation_attempts", "Generation attempts per puzzle", ("mode",), ATTEMPT_BUCKETS
+)
+SEARCH_NODES = histogram(
+    "puzzle_search_nodes", "BFS/IDA* states expanded per generated puzzle", ("mode",), NODE_BUCKETS
+)
+GENERATION_FALLBACKS = counter(
+    "puzzle_generation_fallbacks_total",
+    "Puzzles returned with a difficulty warning (nearest difficulty fallback)",
+    ("mode",),
+)
+GENERATION_FAILURES = counter(
+    "puzzle_generation_failures_total", "Generation calls that raised RuntimeError", ("mode",)
+)
+
+
+def observe_generation(mode: str, puzzle: dict) -> None:
+    """생성된 퍼즐 하나의 "search" 항목(시도/노드/시간)과 warning 여부 기록"""
+    search = puzzle.get("search")
+    if search is not None:
+        if "ms" in search:
+            GENERATION_SECONDS.labels(mode).observe(search["ms"] / 1000)
+        GENERATION_ATTEMPTS.labels(mode).observe(search["attempts"])
+        SEARCH_NODES.labels(mode).observe(search["nodes"])
+    if "warning" in puzzle:
+        GENERATION_FALLBACKS.labels(mode).inc()
+
+
+def observe_generation_failure(mode: str) -> None:
+    GENERATION_FAILURES.labels(mode).inc()
+
+
+# ══════════════════════════════════════════════
+#  HTTP
+# ══════════════════════════════════════════════
+
+HTTP_SECONDS = histogram(
+    "http_request_duration_seconds", "Request latency per endpoint", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """
+    엔드포인트별 요청 지연 (순수 ASGI 미들웨어)
+
+    라벨은 실제 경로가 아니라 라우트 템플릿(/api/puzzle/{id}/...)을 써서 종류 수를 고정,
+    매칭되는 라우트가 없으면 "other".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "other"
+            HTTP_SECONDS.labels(scope["method"], path, status).observe(time.perf_counter() - started)
@@ -0,0 +1,193 @@
+"""
+요청 단위 프로파일링 (opt-in)
+
+느린 요청 하나가 BFS/영웅 샘플링/SQLite 중 어디서 시간을 썼는지 보기 위해
+@profiled가 붙은 엔드포인트(와 그 안에서 부르는 모든 함수)를 cProfile로 잰다.
+
+켜는 방법 (환경변수):
+- PROFILE_TOKEN:        관리자 토큰. 요청에 X-Profile-Token: <토큰> 헤더를 붙이면 그 요청을 프로파일링,
+                        /api/debug/profiles 조회에도 같은 헤더가 필요 (없으면 조회 엔드포인트는 404)
+- PROFILE_SAMPLE_RATE:  헤더 없이도 이 비율(0~1)의 요청을 무작위로 프로파일링 (기본 0)
+- PROFILE_BUFFER_SIZE:  보관할 프로파일 수 (기본 20, 오래된 것부터 버림)
+
+둘 다 설정되지 않으면 미들웨어를 등록하지 않고 @profiled도 원래 함수를 그대로 돌려줘서
+추가 비용이 전혀 없다.
+
+퍼즐 생성은 보통 풀의 워커 프로세스에서 일어나므로, create_puzzle 프로파일은 풀이 비어서
+cpu 실행기에서 동기 생성한 경우에만 남는다. 실행기는 요청의 contextvars를 복사해서 돌리므로
+실행기 스레드 안의 @profiled 함수도 요청 표시를 본다.
+"""
+import contextvars
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", "20"))
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# 프로파일 요약에 보여 줄 함수 수
+_SUMMARY_LINES = 40
+
+ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+_HEADER_KEY = PROFILE_HEADER.lower().encode("latin-1")
+
+# 프로파일링 대상 요청이면 {"path", "reason", "id"} (미들웨어가 설정, 엔드포인트가 id를 채움)
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "profile_request", default=None
+)
+
+
+def check_token(value: Optional[str]) -> bool:
+    """관리자 토큰 확인 (토큰이 설정되지 않았으면 항상 False)"""
+    if not PROFILE_TOKEN or not value:
+        return False
+    return hmac.compare_digest(value.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+# ══════════════════════════════════════════════
+#  보관함 (링 버퍼)
+# ══════════════════════════════════════════════
+
+class ProfileStore:
+    """최근 프로파일 N개 (꽉 차면 가장 오래된 것부터 버림)"""
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._entries: deque = deque(maxlen=max(size, 1))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, request: Dict[str, Any], duration_ms: float, profiler: cProfile.Profile) -> int:
+        profiler.create_stats()
+        entry = {
+            "id": next(self._ids),
+            "endpoint": name,
+            "path": request["path"],
+            "reason": request["reason"],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_ms": round(duration_ms, 3),
+            # pstats 파일과 같은 형식 (python -m pstats, snakeviz 등으로 열 수 있음)
+            "data": marshal.dumps(profiler.stats),
+            "profiler": profiler,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return entry["id"]
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        return [
+            {k: v for k, v in entry.items() if k not in ("data", "profiler")}
+            for entry in reversed(entries)
+        ]
+
+    def _find(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry in self._entries:
+                if entry["id"] == profile_id:
+                    return entry
+        return None
+
+    def data(self, profile_id: int) -> Optional[bytes]:
+        entry = self._find(profile_id)
+        return entry["data"] if entry else None
+
+    def summary(self, profile_id: int, sort: str = "cumulative") -> Optional[str]:
+        """누적 시간 상위 함수 표 (pstats 출력)"""
+        entry = self._find(profile_id)
+        if entry is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(entry["profiler"], stream=stream)
+        stats.sort_stats(sort).print_stats(_SUMMARY_LINES)
+        return stream.getvalue()
+
+
+store = ProfileStore()
+
+
+# ══════════════════════════════════════════════
+#  엔드포인트 / 미들웨어
+# ══════════════════════════════════════════════
+
+def profiled(name: str):
+    """프로파일링 대상이 된 요청이면 함수 실행 전체를 cProfile로 잰다 (비활성 시 원래 함수 그대로)"""
+
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = _current.get()
+            if request is None or request["id"] is not None:
+                return func(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                request["id"] = store.add(name, request, duration_ms, profiler)
+        return wrapper
+    return decorator
+
+
+class ProfilingMiddleware:
+    """
+    요청마다 프로파일링 여부를 정함 (ENABLED일 때만 등록)
+
+    관리자 헤더가 맞거나 PROFILE_SAMPLE_RATE에 걸리면 표시해 두고,
+    @profiled 엔드포인트가 남긴 프로파일 id를 X-Profile-Id 응답 헤더로 알려 준다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                if check_token(value.decode("latin-1")):
+                    reason = "header"
+                break
+        if reason is None and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            reason = "sampled"
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = {"path": scope["path"], "reason": reason, "id": None}
+        token = _current.set(request)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and request["id"] is not None:
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.encode("latin-1"), str(request["id"]).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -2,16 +2,32 @@
 슬라이딩 퍼즐 생성 및 최적해 계산 모듈
 
 모드:
-- quick/ranked: 기본 역할(tank, dps, support) 기준
-- hard: 세부 역할(initiator, bruiser, ...) + 기본역할 1칸 혼합
+- quick/ranked: 기본 역할(tank, dps, support) 기준 (3x3, 4x4, 5x5)
+- hard: 세부 역할(initiator, bruiser, ...) + 기본역할 1칸 혼합 (3x3)
 """
 
 import random
+import time
 import uuid
-from collections import deque
-from typing import Tuple, List, Optional, Dict, Any
-
-from heroes import HEROES, get_random_heroes, get_random_heroes_for_hard
+from typing import Tuple, List, Optional, Dict, Any, Callable
+
+from heroes import (
+    HEROES,
+    HERO_ROLE,
+    HERO_SUB_ROLE,
+    SUB_ROLES,
+    get_random_heroes,
+    get_random_heroes_by_counts,
+    get_random_heroes_for_hard,
+)
+from distance_db import (
+    get_table as get_distance_table,
+    canonical_target,
+    decode_state,
+    nearest_distance,
+    sample_state,
+)
+from solver import RoleSolver, grid_adjacency
 
 
 # ══════════════════════════════════════════════
@@ -20,31 +36,54 @@ from heroes import HEROES, get_random_heroes, get_random_heroes_for_hard
 
 BASIC_ROLES = {"tank", "dps", "support"}
 
+# 지원하는 보드 크기 (3x3은 거리 테이블, 4x4/5x5는 IDA*)
+BOARD_SIZES = (3, 4, 5)
+
+# 탐색/생성 누적 카운터 (벤치마크·메트릭용, 프로세스 전체 누적값)
+# - nodes:     BFS/IDA*가 확장한 상태 수
+# - attempts:  생성 루프 시도 횟수 (목표 배치/영웅셋/배치 후보 하나당 1)
+# - fallbacks: 난이도 구간을 못 맞춰 warning과 함께 반환한 횟수
+# - failures:  RuntimeError로 생성에 실패한 횟수
+# 생성 함수는 호출 하나의 attempts/nodes를 퍼즐의 "search" 항목으로도 돌려준다
+# (값은 호출 전후 차이라 한 프로세스에서 동시에 생성하면 서로 섞일 수 있음).
+SEARCH_STATS = {"nodes": 0, "attempts": 0, "fallbacks": 0, "failures": 0}
+
+# 칸 수가 3으로 나누어떨어지지 않을 때 남는 칸을 받는 순서 (영웅 수가 많은 역할부터)
+_EXTRA_CELL_ORDER = ("dps", "support", "tank")
+
+
+def role_counts_for_size(size: int = 3) -> Dict[str, int]:
+    """보드 크기별 목표 배치의 역할별 칸 수 (3x3: 3/3/3, 4x4: 5/6/5, 5x5: 8/9/8)"""
+    cells = size * size
+    counts = {role: cells // 3 for role in ("tank", "dps", "support")}
+    for role in _EXTRA_CELL_ORDER[:cells % 3]:
+        counts[role] += 1
+    return counts
 
-def make_target_roles(layout: str = "random") -> List[str]:
+
+def make_target_roles(layout: str = "random", size: int = 3, rng: random.Random = random) -> List[str]:
     """목표 역할 배열 생성 (기본 모드용)"""
     layout = (layout or "random").lower()
+    counts = role_counts_for_size(size)
+    blocks = [[role] * counts[role] for role in ("tank", "dps", "support")]
 
     if layout == "cols":
-        target = [""] * 9
-        for idx in (0, 3, 6):
-            target[idx] = "tank"
-        for idx in (1, 4, 7):
-            target[idx] = "dps"
-        for idx in (2, 5, 8):
-            target[idx] = "support"
+        # 열 우선으로 tank → dps → support 채우기
+        sequence = blocks[0] + blocks[1] + blocks[2]
+        target = [""] * (size * size)
+        for k, role in enumerate(sequence):
+            target[(k % size) * size + k // size] = role
         return target
 
     if layout == "rows":
-        return ["tank"] * 3 + ["dps"] * 3 + ["support"] * 3
+        return blocks[0] + blocks[1] + blocks[2]
 
     if layout == "shuffle_rows":
-        rows = [["tank"] * 3, ["dps"] * 3, ["support"] * 3]
-        random.shuffle(rows)
-        return rows[0] + rows[1] + rows[2]
+        rng.shuffle(blocks)
+        return blocks[0] + blocks[1] + blocks[2]
 
-    target = ["tank"] * 3 + ["dps"] * 3 + ["support"] * 3
-    random.shuffle(target)
+    target = blocks[0] + blocks[1] + blocks[2]
+    rng.shuffle(target)
     return target
 
 
@@ -56,70 +95,94 @@ def get_empty_index(state: Tuple[Optional[str], ...]) -> int:
     return -1
 
 
-def get_adjacent_indices(index: int) -> List[int]:
-    """3x3 그리드에서 해당 인덱스와 인접한(상하좌우) 인덱스들 반환"""
-    row, col = index // 3, index % 3
+def get_adjacent_indices(index: int, size: int = 3) -> List[int]:
+    """size x size 그리드에서 해당 인덱스와 인접한(상하좌우) 인덱스들 반환"""
+    row, col = index // size, index % size
     adjacent = []
     if row > 0:
-        adjacent.append(index - 3)
-    if row < 2:
-        adjacent.append(index + 3)
+        adjacent.append(index - size)
+    if row < size - 1:
+        adjacent.append(index + size)
     if col > 0:
         adjacent.append(index - 1)
-    if col < 2:
+    if col < size - 1:
         adjacent.append(index + 1)
     return adjacent
 
-def _manhattan_distance_to_goal(
-    state: Tuple[Optional[str], ...],
-    goal_state: Tuple[Optional[str], ...],
-) -> int:
-    """타일 기준 맨해튼 거리 합 (난이도/품질 체크용, 하드모드에서만 사용)"""
-    goal_pos: Dict[str, int] = {
-        tile: idx for idx, tile in enumerate(goal_state) if tile is not None
-    }
-    dist = 0
-    for idx, tile in enumerate(state):
-        if tile is None:
-            continue
-        gidx = goal_pos.get(tile)
-        if gidx is None:
-            continue
-        dist += abs((idx // 3) - (gidx // 3)) + abs((idx % 3) - (gidx % 3))
-    return dist
 
-
-def _get_abstract_neighbors(
-    state: Tuple[Optional[str], ...],
-) -> List[Tuple[Optional[str], ...]]:
-    """추상 상태에서 빈 칸과 인접 타일을 스왑 (기본/하드 공용)"""
-    empty_idx = -1
-    for i, val in enumerate(state):
-        if val is None:
-            empty_idx = i
-            break
-    if empty_idx == -1:
-        return []
-
-    neighbors = []
-    for adj_idx in get_adjacent_indices(empty_idx):
-        state_list = list(state)
-        state_list[empty_idx], state_list[adj_idx] = state_list[adj_idx], state_list[empty_idx]
-        neighbors.append(tuple(state_list))
-    return neighbors
+def board_size_of(state: List[Optional[str]]) -> int:
+    """상태 길이로 보드 크기 추정 (정사각형이 아니면 ValueError)"""
+    size = int(round(len(state) ** 0.5))
+    if size * size != len(state):
+        raise ValueError("board must be square")
+    return size
 
 
-def _abstract_state_is_solved(
-    abstract_state: Tuple[Optional[str], ...],
-    target_roles: List[str],
-) -> bool:
-    """추상 상태 정답 판별 (기본/하드 공용)"""
-    for i, val in enumerate(abstract_state):
-        if val is None:
-            continue
-        if val != target_roles[i]:
-            return False
-    return True
+# ══════════════════════════════════════════════
+#  정수 상태 엔진 (BFS 핫루프용)
+# ══════════════════════════════════════════════
+#
+#  칸 i의 코드를 (bits * i) 위치에 담고, 빈칸 위치를 (bits * 9)부터 4비트에 담는다.
+#  빈칸 코드는 전부 1(all-ones)이라 이웃 생성은 XOR 두 번, 정답 판별은
+#  "빈칸 칸을 뺀 마스크 안에서 목표와 같은지" 비교 한 번이면 된다.
+
+class _PackedBoard:
+    """칸당 bits비트 정수 상태의 이동/판별 테이블"""
+
+    __slots__ = ("bits", "mask", "blank", "pos_shift", "cells_mask", "moves", "clear")
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.blank = self.mask
+        self.pos_shift = bits * 9
+        self.cells_mask = (1 << self.pos_shift) - 1
+        # moves[빈칸] = ((이동할 칸, 그 칸 시프트, 빈칸 시프트), ...)
+        self.moves = tuple(
+            tuple((adj, adj * bits, empty * bits) for adj in get_adjacent_indices(empty))
+            for empty in range(9)
+        )
+        # clear[빈칸] = 빈칸 칸만 0인 마스크
+        self.clear = tuple(
+            self.cells_mask & ~(self.mask << (empty * bits))
+            for empty in range(9)
+        )
+
+    def pack(self, codes: List[Optional[int]]) -> int:
+        """칸별 코드(None=빈칸) → 정수 상태"""
+        state = 0
+        empty = 0
+        for i, code in enumerate(codes):
+            if code is None:
+                code = self.blank
+                empty = i
+            state |= code << (self.bits * i)
+        return state | (empty << self.pos_shift)
+
+    def unpack(self, state: int) -> List[Optional[int]]:
+        codes: List[Optional[int]] = []
+        for i in range(9):
+            code = (state >> (self.bits * i)) & self.mask
+            codes.append(None if code == self.blank else code)
+        return codes
+
+    def neighbors(self, state: int) -> List[int]:
+        pos_shift = self.pos_shift
+        cells = state & self.cells_mask
+        result = []
+        for adj, adj_shift, empty_shift in self.moves[state >> pos_shift]:
+            x = ((cells >> adj_shift) & self.mask) ^ self.blank
+            result.append((cells ^ (x << adj_shift) ^ (x << empty_shift)) | (adj << pos_shift))
+        return result
+
+
+# 기본 모드: 역할 2비트 (tank=0, dps=1, support=2, 빈칸=3)
+ROLE_CODES = {"tank": 0, "dps": 1, "support": 2}
+_ROLE_BOARD = _PackedBoard(2)
+
+# 하드 모드: 세부역할 4비트 (SUB_ROLES 순서, 빈칸=15)
+SUB_ROLE_CODES = {sub_role: i for i, sub_role in enumerate(SUB_ROLES)}
+_SUB_BOARD = _PackedBoard(4)
 
 
 # ══════════════════════════════════════════════
@@ -131,7 +194,7 @@ def _hero_state_to_role_state(
 ) -> Tuple[Optional[str], ...]:
     """영웅 ID → 역할 기반 상태"""
     return tuple(
-        HEROES[h]["role"] if h is not None else None
+        HERO_ROLE[h] if h is not None else None
         for h in state
     )
 
@@ -141,7 +204,7 @@ def is_solved(state: Tuple[Optional[str], ...], target_roles: List[str]) -> bool
     for i, hero in enumerate(state):
         if hero is None:
             continue
-        if HEROES[hero]["role"] != target_roles[i]:
+        if HERO_ROLE[hero] != target_roles[i]:
             return False
     return True
 
@@ -164,27 +227,100 @@ def calculate_optimal_moves(
     target_roles: List[str],
     depth_limit: int = 50,
 ) -> Optional[int]:
-    """역할 기반 BFS 최적해 (기본 모드)"""
+    """
+    역할 기반 최적해 (기본 모드)
+
+    3x3 (3, 3, 2) 배치는 사전 계산된 거리 테이블(distance_db)에서 바로 조회하고,
+    테이블 형태가 아닌 상태만 정수 상태 BFS로 계산한다.
+    4x4/5x5 보드는 IDA*(solver.RoleSolver)로 계산한다.
+    """
     role_state = _hero_state_to_role_state(tuple(initial_state))
 
-    if _abstract_state_is_solved(role_state, target_roles):
-        return 0
+    if len(role_state) != 9:
+        return _solve_large(role_state, target_roles, depth_limit).distance
 
-    queue = deque([(role_state, 0)])
-    visited = {role_state}
+    found, optimal = get_distance_table().lookup(role_state, target_roles)
+    if found:
+        if optimal is None or optimal > depth_limit:
+            return None
+        return optimal
 
-    while queue:
-        state, moves = queue.popleft()
-        if moves >= depth_limit:
-            continue
-        for new_state in _get_abstract_neighbors(state):
-            if new_state in visited:
-                continue
-            if _abstract_state_is_solved(new_state, target_roles):
-                return moves + 1
-            visited.add(new_state)
-            queue.append((new_state, moves + 1))
+    if role_state.count(None) != 1:
+        return None
+    if any(role not in ROLE_CODES for role in target_roles):
+        return None
+
+    start = _ROLE_BOARD.pack([ROLE_CODES[r] if r is not None else None for r in role_state])
+    target = _ROLE_BOARD.pack([ROLE_CODES[r] for r in target_roles])
+    return _packed_bfs_distance(start, target, depth_limit)
 
+
+# 큰 보드 IDA* 노드 예산 (요청 하나가 무한정 붙잡히지 않도록)
+LARGE_BOARD_NODE_LIMIT = 200_000
+
+
+def _solve_large(
+    role_state: Tuple[Optional[str], ...],
+    target_roles: List[str],
+    depth_limit: int,
+    node_limit: int = LARGE_BOARD_NODE_LIMIT,
+):
+    """4x4/5x5 역할 상태 IDA* (solver.SolveResult 반환)"""
+    size = board_size_of(list(role_state))
+    solver = RoleSolver(size, [ROLE_CODES[r] for r in target_roles])
+    result = solver.solve(
+        [ROLE_CODES[r] if r is not None else None for r in role_state],
+        depth_limit=depth_limit,
+        node_limit=node_limit,
+    )
+    SEARCH_STATS["nodes"] += result.nodes
+    return result
+
+
+def _packed_bfs_distance(start: int, target: int, depth_limit: int) -> Optional[int]:
+    """
+    정수 상태 BFS (기본 모드 fallback)
+
+    target은 모든 칸이 목표 역할인 정수 상태. 빈칸 칸을 뺀 마스크로 비교해서 정답 판별.
+    """
+    board = _ROLE_BOARD
+    pos_shift = board.pos_shift
+    cells_mask = board.cells_mask
+    mask = board.mask
+    blank = board.blank
+    moves = board.moves
+    clear = board.clear
+    target &= cells_mask
+
+    if ((start ^ target) & clear[start >> pos_shift]) == 0:
+        return 0
+
+    frontier = [start]
+    visited = {start}
+    depth = 0
+    # 확장 수는 층 단위로 세서 루프 안에서는 카운터를 건드리지 않음
+    expanded = 0
+
+    while frontier and depth < depth_limit:
+        depth += 1
+        expanded += len(frontier)
+        next_frontier = []
+        for state in frontier:
+            cells = state & cells_mask
+            for adj, adj_shift, empty_shift in moves[state >> pos_shift]:
+                x = ((cells >> adj_shift) & mask) ^ blank
+                new_cells = cells ^ (x << adj_shift) ^ (x << empty_shift)
+                new_state = new_cells | (adj << pos_shift)
+                if new_state in visited:
+                    continue
+                if ((new_cells ^ target) & clear[adj]) == 0:
+                    SEARCH_STATS["nodes"] += expanded
+                    return depth
+                visited.add(new_state)
+                next_frontier.append(new_state)
+        frontier = next_frontier
+
+    SEARCH_STATS["nodes"] += expanded
     return None
 
 
@@ -192,26 +328,193 @@ def calculate_optimal_moves(
 #  하드 모드: 세부역할(sub_role) + 기본역할 혼합
 # ══════════════════════════════════════════════
 
-def _hero_state_to_mixed_state(
+def _hero_state_to_label_state(
     state: Tuple[Optional[str], ...],
-    target_roles: List[str],
 ) -> Tuple[Optional[str], ...]:
     """
-    영웅 ID → 혼합 상태 변환 (하드 모드 BFS용)
+    영웅 ID → 세부역할 라벨 상태 (하드 모드 탐색용)
 
-    target_roles 각 칸이 기본역할인지 세부역할인지에 따라:
-    - 기본역할 칸(tank/dps/support): 영웅의 role로 변환
-    - 세부역할 칸(initiator 등): 영웅의 sub_role로 변환
+    칸의 목표가 기본역할이든 세부역할이든 타일(영웅)의 라벨은 sub_role로 고정하고,
+    정답 판별에서 칸 종류에 맞게 비교한다. (라벨을 칸 기준으로 바꾸면 타일이
+    기본역할 칸을 드나들 때 라벨이 달라져야 해서 스왑만으로는 표현이 안 됨)
     """
-    result = []
-    for i, hero in enumerate(state):
-        if hero is None:
-            result.append(None)
-        elif target_roles[i] in BASIC_ROLES:
-            result.append(HEROES[hero]["role"])
+    return tuple(
+        HERO_SUB_ROLE[h] if h is not None else None
+        for h in state
+    )
+
+
+def _label_fits(label: str, target: str) -> bool:
+    """세부역할 라벨이 목표 칸에 맞는지 (기본역할 칸은 상위 역할로 비교)"""
+    if target in BASIC_ROLES:
+        return SUB_ROLES[label]["parent_role"] == target
+    return label == target
+
+
+def _hard_goal_states(
+    labels: List[str],
+    target_roles: List[str],
+) -> List[Tuple[Optional[str], ...]]:
+    """
+    라벨 8개로 만들 수 있는 모든 정답 상태
+
+    같은 세부역할 영웅이 둘이거나 기본역할 칸 영웅이 다른 세부역할 칸에도 맞을 수
+    있어서, 빈칸 위치와 라벨 배치가 다른 정답이 여러 개일 수 있다.
+    """
+    remaining: Dict[str, int] = {}
+    for label in labels:
+        remaining[label] = remaining.get(label, 0) + 1
+    order = sorted(remaining)
+
+    goals = []
+    assignment: List[Optional[str]] = [None] * 9
+
+    def assign(cell: int, blank: int) -> None:
+        if cell == 9:
+            goals.append(tuple(assignment))
+            return
+        if cell == blank:
+            assign(cell + 1, blank)
+            return
+        for label in order:
+            if remaining[label] and _label_fits(label, target_roles[cell]):
+                remaining[label] -= 1
+                assignment[cell] = label
+                assign(cell + 1, blank)
+                remaining[label] += 1
+        assignment[cell] = None
+
+    for blank in range(9):
+        assign(0, blank)
+    return goals
+
+
+def _permutation_parity(tiles: List[str], rank: Dict[str, int]) -> int:
+    """빈칸 제외 타일 순서의 역전(inversion) 수 홀짝"""
+    inversions = 0
+    for i in range(len(tiles)):
+        ri = rank[tiles[i]]
+        for j in range(i + 1, len(tiles)):
+            if ri > rank[tiles[j]]:
+                inversions += 1
+    return inversions & 1
+
+
+def _is_solvable_hard(
+    label_state: Tuple[Optional[str], ...],
+    goals: List[Tuple[Optional[str], ...]],
+) -> bool:
+    """
+    홀짝(parity) 기반 풀이 가능 판별
+
+    3x3(홀수 폭)에서는 빈칸 이동이 타일 순서의 역전 수 홀짝을 바꾸지 않으므로,
+    라벨이 모두 다르면 정답 상태 중 하나와 홀짝이 같아야만 풀 수 있다.
+    같은 라벨이 둘 이상이면 두 타일을 바꿔 홀짝을 맞출 수 있어 항상 풀 수 있다.
+    """
+    tiles = [label for label in label_state if label is not None]
+    if len(set(tiles)) < len(tiles):
+        return True
+
+    rank = {label: i for i, label in enumerate(sorted(tiles))}
+    parity = _permutation_parity(tiles, rank)
+    return any(
+        _permutation_parity([label for label in goal if label is not None], rank) == parity
+        for goal in goals
+    )
+
+
+def _pack_labels(label_state: Tuple[Optional[str], ...]) -> int:
+    """세부역할 라벨 상태 → 4비트 정수 상태"""
+    return _SUB_BOARD.pack([
+        SUB_ROLE_CODES[label] if label is not None else None
+        for label in label_state
+    ])
+
+
+def _bidirectional_distance(
+    start: int,
+    goals: List[int],
+    depth_limit: int,
+) -> Optional[int]:
+    """양방향 BFS 최단거리 (depth_limit를 넘으면 None)"""
+    found = _bidirectional_search(start, goals, depth_limit)
+    return found[0] if found is not None else None
+
+
+def _bidirectional_search(
+    start: int,
+    goals: List[int],
+    depth_limit: int,
+) -> Optional[Tuple[int, Dict[int, int], Dict[int, int], int]]:
+    """
+    양방향 BFS (정방향: 시작 상태, 역방향: 모든 정답 상태, 4비트 정수 상태)
+
+    항상 작은 쪽 프런티어를 한 층씩 확장하고, 확장 중 반대편 방문 상태를 만나면
+    그 층에서의 최소 합이 최단거리다. depth_limit를 넘으면 None.
+
+    Returns:
+        (최단거리, 정방향 깊이 맵, 역방향 깊이 맵, 만난 상태) - 경로 복원은 _bidirectional_path
+    """
+    board = _SUB_BOARD
+    pos_shift = board.pos_shift
+    cells_mask = board.cells_mask
+    mask = board.mask
+    blank = board.blank
+    moves = board.moves
+
+    forward = {start: 0}
+    backward = {goal: 0 for goal in goals}
+    if start in backward:
+        return 0, forward, backward, start
+
+    forward_front = [start]
+    backward_front = list(backward)
+    forward_depth = backward_depth = 0
+    expanded = 0
+
+    while forward_front and backward_front and forward_depth + backward_depth < depth_limit:
+        if len(forward_front) <= len(backward_front):
+            front, own, other = forward_front, forward, backward
+            forward_depth += 1
+            depth = forward_depth
+        else:
+            front, own, other = backward_front, backward, forward
+            backward_depth += 1
+            depth = backward_depth
+
+        expanded += len(front)
+        next_front = []
+        best = None
+        meet = 0
+        for state in front:
+            cells = state & cells_mask
+            for adj, adj_shift, empty_shift in moves[state >> pos_shift]:
+                x = ((cells >> adj_shift) & mask) ^ blank
+                new_state = (cells ^ (x << adj_shift) ^ (x << empty_shift)) | (adj << pos_shift)
+                if new_state in own:
+                    continue
+                own[new_state] = depth
+                other_depth = other.get(new_state)
+                if other_depth is not None:
+                    total = depth + other_depth
+                    if best is None or total < best:
+                        best = total
+                        meet = new_state
+                next_front.append(new_state)
+
+        if best is not None:
+            SEARCH_STATS["nodes"] += expanded
+            if best > depth_limit:
+                return None
+            return best, forward, backward, meet
+
+        if front is forward_front:
+            forward_front = next_front
         else:
-            result.append(HEROES[hero]["sub_role"])
-    return tuple(result)
+            backward_front = next_front
+
+    SEARCH_STATS["nodes"] += expanded
+    return None
 
 
 def is_solved_hard(state: Tuple[Optional[str], ...], target_roles: List[str]) -> bool:
@@ -226,10 +529,10 @@ def is_solved_hard(state: Tuple[Optional[str], ...], target_roles: List[str]) ->
             continue
         target = target_roles[i]
         if target in BASIC_ROLES:
-            if HEROES[hero]["role"] != target:
+            if HERO_ROLE[hero] != target:
                 return False
         else:
-            if HEROES[hero]["sub_role"] != target:
+            if HERO_SUB_ROLE[hero] != target:
                 return False
     return True
 
@@ -239,36 +542,141 @@ def calculate_optimal_moves_hard(
     target_roles: List[str],
     depth_limit: int = 50,
 ) -> Optional[int]:
-    """세부역할 기반 BFS 최적해 (하드 모드)"""
-    abstract_state = _hero_state_to_mixed_state(
-        tuple(initial_state), target_roles
+    """세부역할 기반 정확한 최적해 (하드 모드, 양방향 BFS)"""
+    label_state = _hero_state_to_label_state(tuple(initial_state))
+    labels = [label for label in label_state if label is not None]
+
+    goals = _hard_goal_states(labels, target_roles)
+    if not goals or not _is_solvable_hard(label_state, goals):
+        return None
+
+    return _bidirectional_distance(
+        _pack_labels(label_state), [_pack_labels(goal) for goal in goals], depth_limit
     )
 
-    if _abstract_state_is_solved(abstract_state, target_roles):
-        return 0
 
-    queue = deque([(abstract_state, 0)])
-    visited = {abstract_state}
+# ══════════════════════════════════════════════
+#  최단 경로 (힌트/풀이)
+# ══════════════════════════════════════════════
+#
+#  경로는 빈칸이 차례로 이동하는 칸 인덱스 목록 (solver.SolveResult.path와 같은 형식)
+
+def _descend_path(
+    state: List[Optional[str]],
+    distance,
+) -> Optional[List[int]]:
+    """이웃 중 최단거리가 1 줄어드는 칸을 따라 내려가며 경로 구성 (distance: 상태 → 거리 또는 None)"""
+    dist = distance(state)
+    if dist is None:
+        return None
+
+    size = board_size_of(state)
+    empty = state.index(None)
+    path: List[int] = []
+    while dist > 0:
+        for adj in get_adjacent_indices(empty, size):
+            state[empty], state[adj] = state[adj], None
+            next_dist = distance(state)
+            if next_dist == dist - 1:
+                break
+            state[adj], state[empty] = state[empty], None
+        else:
+            return None
+        path.append(adj)
+        empty, dist = adj, next_dist
+    return path
 
-    while queue:
-        state, moves = queue.popleft()
-        if moves >= depth_limit:
-            continue
-        for new_state in _get_abstract_neighbors(state):
-            if new_state in visited:
-                continue
-            if _abstract_state_is_solved(new_state, target_roles):
-                return moves + 1
-            visited.add(new_state)
-            queue.append((new_state, moves + 1))
 
-    return None
+def solve_optimal_path(
+    initial_state: List[Optional[str]],
+    target_roles: List[str],
+    depth_limit: int = 50,
+) -> Optional[List[int]]:
+    """
+    기본 모드 최단 경로 (못 찾으면 None)
+
+    3x3은 거리 테이블로 한 수씩 내려가서 이동당 조회 4번 이하,
+    4x4/5x5는 IDA*가 찾은 경로 (노드 예산을 넘으면 None).
+    """
+    state = list(initial_state)
+    if len(state) != 9:
+        role_state = _hero_state_to_role_state(tuple(state))
+        result = _solve_large(role_state, target_roles, depth_limit)
+        return result.path if result.distance is not None else None
+
+    return _descend_path(state, lambda s: calculate_optimal_moves(s, target_roles, depth_limit))
+
+
+def _bidirectional_path(
+    forward: Dict[int, int],
+    backward: Dict[int, int],
+    meet: int,
+) -> List[int]:
+    """양방향 BFS 깊이 맵에서 경로 복원 (부모 포인터 없이 깊이가 1 작은 이웃을 따라감)"""
+    board = _SUB_BOARD
+    pos_shift = board.pos_shift
+
+    head: List[int] = []
+    state = meet
+    while forward[state] > 0:
+        depth = forward[state]
+        head.append(state >> pos_shift)
+        state = next(n for n in board.neighbors(state) if forward.get(n) == depth - 1)
+    head.reverse()
+
+    tail: List[int] = []
+    state = meet
+    while backward[state] > 0:
+        depth = backward[state]
+        state = next(n for n in board.neighbors(state) if backward.get(n) == depth - 1)
+        tail.append(state >> pos_shift)
+    return head + tail
+
+
+def solve_optimal_path_hard(
+    initial_state: List[Optional[str]],
+    target_roles: List[str],
+    depth_limit: int = 50,
+) -> Optional[List[int]]:
+    """하드 모드 최단 경로 (양방향 BFS + 경로 복원, 풀 수 없으면 None)"""
+    label_state = _hero_state_to_label_state(tuple(initial_state))
+    labels = [label for label in label_state if label is not None]
+
+    goals = _hard_goal_states(labels, target_roles)
+    if not goals or not _is_solvable_hard(label_state, goals):
+        return None
+
+    found = _bidirectional_search(
+        _pack_labels(label_state), [_pack_labels(goal) for goal in goals], depth_limit
+    )
+    if found is None:
+        return None
+    _, forward, backward, meet = found
+    return _bidirectional_path(forward, backward, meet)
 
 
 # ══════════════════════════════════════════════
 #  퍼즐 생성: 기본 모드
 # ══════════════════════════════════════════════
 
+def _assign_heroes(
+    role_layout: List[Optional[str]],
+    selected_heroes: List[str],
+    rng: random.Random = random,
+) -> List[Optional[str]]:
+    """역할 배열의 각 칸에 같은 역할의 영웅을 무작위로 배치"""
+    by_role: Dict[str, List[str]] = {}
+    for hero in selected_heroes:
+        by_role.setdefault(HERO_ROLE[hero], []).append(hero)
+    for heroes in by_role.values():
+        rng.shuffle(heroes)
+
+    return [
+        by_role[role].pop() if role is not None else None
+        for role in role_layout
+    ]
+
+
 def generate_puzzle(
     *,
     min_optimal: int = 5,
@@ -276,64 +684,209 @@ def generate_puzzle(
     layout: str = "rows",
     max_attempts: int = 500,
     depth_limit: int = 50,
+    size: int = 3,
+    time_budget: float = 2.0,
+    rng: random.Random = random,
+    cancelled: Optional[Callable[[], bool]] = None,
 ) -> Dict[str, Any]:
-    """기본 모드 퍼즐 생성"""
-    target_roles = make_target_roles(layout)
-
-    best_state = None
-    best_optimal = -1
-    best_heroes = None
+    """
+    기본 모드 퍼즐 생성 (거리 버킷 샘플링)
 
-    for _ in range(max_attempts):
-        selected_heroes = get_random_heroes(8)
+    거리 테이블에서 목표 배치별로 최단거리가 [min_optimal, max_optimal]인 역할 상태를
+    균등하게 한 번에 뽑고, get_random_heroes로 고른 영웅을 역할에 맞게 배치한다.
+    뽑은 목표 배치에서 구간이 불가능하면 목표 배치만 다시 뽑고(max_attempts회),
+    어떤 배치로도 불가능한 구간일 때만 가장 가까운 난이도로 warning과 함께 반환.
 
-        initial_state: List[Optional[str]] = selected_heroes.copy()
-        initial_state.append(None)
-        random.shuffle(initial_state)
+    size가 4, 5면 _generate_puzzle_large (IDA*, time_budget초 안에서 최선)로 생성.
 
-        if is_solved(tuple(initial_state), target_roles):
-            continue
+    rng: 난수 생성기 (기본은 random 모듈). 시드를 고정한 random.Random을 넘기면 3x3은
+    같은 퍼즐이 재현된다 (큰 보드는 time_budget 때문에 기계 속도에 따라 달라질 수 있음).
 
-        optimal = calculate_optimal_moves(initial_state, target_roles, depth_limit=depth_limit)
-        if optimal is None:
+    cancelled: 큰 보드에서 시도마다 확인하는 중단 콜백. True가 되면 time_budget을 다 쓴 것처럼
+    지금까지의 최선을 반환 (여러 프로세스에서 추측 생성할 때 먼저 끝난 쪽이 나머지를 멈춤).
+    3x3은 시도 하나가 수 μs라 확인하지 않는다.
+    """
+    if size not in BOARD_SIZES:
+        raise ValueError(f"size must be one of {BOARD_SIZES}")
+    if size != 3:
+        return _generate_puzzle_large(
+            size=size,
+            min_optimal=min_optimal,
+            max_optimal=max_optimal,
+            layout=layout,
+            max_attempts=max_attempts,
+            depth_limit=depth_limit,
+            time_budget=time_budget,
+            rng=rng,
+            cancelled=cancelled,
+        )
+
+    # 이미 정답인 상태(0수)는 제외
+    lo = max(min_optimal, 1)
+    hi = depth_limit if max_optimal is None else min(max_optimal, depth_limit)
+
+    table = get_distance_table()
+    # 어떤 목표 배치로도 불가능한 구간이면 재시도 없이 가장 가까운 난이도로 대체
+    feasible = lo <= min(hi, table.max_distance)
+
+    best = None  # (거리, 목표 배치, 영웅, 목표 인덱스, 순열)
+    sampled = None
+    nodes_before = SEARCH_STATS["nodes"]
+    attempts = 0
+
+    # 목표 배치마다 가능한 최대 거리가 달라서, 구간이 불가능한 배치를 뽑았을 때만 다시 뽑음
+    for _ in range(max(1, max_attempts)):
+        attempts += 1
+        target_roles = make_target_roles(layout, rng=rng)
+        selected_heroes = get_random_heroes(8, rng)
+
+        role_counts: Dict[str, int] = {}
+        for hero in selected_heroes:
+            role = HERO_ROLE[hero]
+            role_counts[role] = role_counts.get(role, 0) + 1
+        reduced_role = min(role_counts, key=role_counts.get)
+
+        target_idx, perm = canonical_target(target_roles, reduced_role)
+        if feasible and table.target_max(target_idx) < lo:
             continue
 
-        heroes_info = {h: HEROES[h] for h in selected_heroes}
-
-        if optimal > best_optimal:
-            best_optimal = optimal
-            best_state = initial_state.copy()
-            best_heroes = heroes_info
+        sampled = sample_state(target_idx, lo, hi, rng)
+        if sampled is not None:
+            break
 
-        if optimal < min_optimal:
-            continue
-        if max_optimal is not None and optimal > max_optimal:
-            continue
+        nearest = nearest_distance(target_idx, lo, hi)
+        if nearest is not None and (best is None or abs(nearest - lo) < abs(best[0] - lo)):
+            best = (nearest, target_roles, selected_heroes, target_idx, perm)
+        if not feasible:
+            break
 
-        empty_idx = initial_state.index(None)
+    SEARCH_STATS["attempts"] += attempts
+    warning = None
+    if sampled is None:
+        if best is None:
+            SEARCH_STATS["failures"] += 1
+            raise RuntimeError("Failed to generate puzzle")
+        SEARCH_STATS["fallbacks"] += 1
+        nearest, target_roles, selected_heroes, target_idx, perm = best
+        sampled = sample_state(target_idx, nearest, nearest, rng)
+        warning = f"Could not meet difficulty [{min_optimal}, {max_optimal}]. Returned {nearest}."
+
+    state_idx, optimal = sampled
+    initial_state = _assign_heroes(decode_state(state_idx, perm), selected_heroes, rng)
+    empty_idx = initial_state.index(None)
+
+    puzzle = {
+        "puzzle_id": str(uuid.uuid4()),
+        "initial_state": initial_state,
+        "target_roles": target_roles,
+        "empty_index": empty_idx,
+        "heroes": {h: HEROES[h] for h in selected_heroes},
+        "optimal_moves": optimal,
+        "size": 3,
+        "search": {"attempts": attempts, "nodes": SEARCH_STATS["nodes"] - nodes_before},
+    }
+    if warning is not None:
+        puzzle["warning"] = warning
+    return puzzle
+
+
+def _random_walk(
+    role_layout: List[Optional[str]],
+    size: int,
+    steps: int,
+    rng: random.Random = random,
+) -> List[Optional[str]]:
+    """정답 상태에서 빈칸을 steps번 무작위 이동 (직전 칸으로 되돌아가는 이동 제외)"""
+    adjacency = grid_adjacency(size)
+    state = list(role_layout)
+    empty_idx = state.index(None)
+    prev_idx = -1
+    for _ in range(steps):
+        candidates = [a for a in adjacency[empty_idx] if a != prev_idx]
+        next_idx = rng.choice(candidates)
+        state[empty_idx], state[next_idx] = state[next_idx], None
+        prev_idx, empty_idx = empty_idx, next_idx
+    return state
+
+
+def _generate_puzzle_large(
+    *,
+    size: int,
+    min_optimal: int,
+    max_optimal: int,
+    layout: str,
+    max_attempts: int,
+    depth_limit: int,
+    time_budget: float,
+    rng: random.Random,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    4x4/5x5 퍼즐 생성 (무작위 역방향 이동 + IDA* 검증)
 
-        return {
-            "puzzle_id": str(uuid.uuid4()),
-            "initial_state": initial_state,
-            "target_roles": target_roles,
-            "empty_index": empty_idx,
-            "heroes": heroes_info,
-            "optimal_moves": optimal,
-        }
+    이동 수를 [min_optimal, max_optimal]에서 뽑아 정답에서 섞으면 최단거리는 항상
+    max_optimal 이하라서, IDA*가 "구간보다 깊다"를 증명하느라 큰 트리를 다 도는
+    경우가 없다. (같은 역할 타일끼리 상쇄되어 최단거리는 이동 수보다 짧아지기 쉬움)
+    time_budget초 안에 구간을 못 맞추면 가장 가까운(쉬운) 상태를 warning과 함께 반환.
+    """
+    hi = min(max_optimal, depth_limit)
+    lo = max(min_optimal, 1)
+    deadline = time.monotonic() + time_budget
+
+    best = None  # (최적해, 역할 상태, 목표 배치, 영웅)
+    target_counts = role_counts_for_size(size)
+    nodes_before = SEARCH_STATS["nodes"]
+    attempts = 0
+
+    for _ in range(max(1, max_attempts)):
+        attempts += 1
+        target_roles = make_target_roles(layout, size, rng)
+
+        # 한 역할만 1명 적게 → 그 역할 칸 중 하나가 빈칸 자리
+        reduced_role = rng.choice(list(target_counts))
+        hero_counts = dict(target_counts)
+        hero_counts[reduced_role] -= 1
+        selected_heroes = get_random_heroes_by_counts(hero_counts, rng)
+
+        solved = list(target_roles)
+        blank_cells = [i for i, role in enumerate(solved) if role == reduced_role]
+        solved[rng.choice(blank_cells)] = None
+
+        role_state = _random_walk(solved, size, rng.randint(lo, hi), rng)
+        result = _solve_large(tuple(role_state), target_roles, depth_limit=hi)
+
+        optimal = result.distance
+        if optimal is not None and optimal >= lo:
+            best = (optimal, role_state, target_roles, selected_heroes)
+            break
+        if optimal is not None and optimal > 0 and (best is None or optimal > best[0]):
+            best = (optimal, role_state, target_roles, selected_heroes)
 
-    if best_state is not None and best_optimal >= 0:
-        empty_idx = best_state.index(None)
-        return {
-            "puzzle_id": str(uuid.uuid4()),
-            "initial_state": best_state,
-            "target_roles": target_roles,
-            "empty_index": empty_idx,
-            "heroes": best_heroes,
-            "optimal_moves": best_optimal,
-            "warning": f"Could not meet difficulty [{min_optimal}, {max_optimal}]. Returned {best_optimal}.",
-        }
+        if time.monotonic() >= deadline or (cancelled is not None and cancelled()):
+            break
 
-    raise RuntimeError("Failed to generate puzzle")
+    SEARCH_STATS["attempts"] += attempts
+    if best is None:
+        SEARCH_STATS["failures"] += 1
+        raise RuntimeError("Failed to generate puzzle")
+
+    optimal, role_state, target_roles, selected_heroes = best
+    initial_state = _assign_heroes(role_state, selected_heroes, rng)
+
+    puzzle = {
+        "puzzle_id": str(uuid.uuid4()),
+        "initial_state": initial_state,
+        "target_roles": target_roles,
+        "empty_index": initial_state.index(None),
+        "heroes": {h: HEROES[h] for h in selected_heroes},
+        "optimal_moves": optimal,
+        "size": size,
+        "search": {"attempts": attempts, "nodes": SEARCH_STATS["nodes"] - nodes_before},
+    }
+    if optimal < lo:
+        SEARCH_STATS["fallbacks"] += 1
+        puzzle["warning"] = f"Could not meet difficulty [{min_optimal}, {max_optimal}]. Returned {optimal}."
+    return puzzle
 
 
 # ══════════════════════════════════════════════
@@ -347,18 +900,22 @@ def generate_puzzle_hard(
     shuffle_moves: int = 200,
     max_attempts: int = 5,
     depth_limit: int = 50,
+    rng: random.Random = random,
+    cancelled: Optional[Callable[[], bool]] = None,
 ) -> Dict[str, Any]:
     """
-    하드 모드 퍼즐 생성 (역방향 셔플, BFS 생략)
-
-    목표 난이도(=optimal_moves)를 [min_optimal, max_optimal]에서 랜덤으로 뽑고,
-    '정답 상태'에서 그만큼만 역방향 셔플하여:
-
-    1) 항상 풀 수 있는 퍼즐 100% 보장
-    2) BFS/최적해 계산 생략 → 즉시 응답
-    3) 왕복 방지 + 상태 재방문 최소화로 체감 난이도가 목표치에 가깝게 유지
-
-    ※ shuffle_moves/depth_limit는 하위 호환(기존 호출부)용으로 남겨둡니다.
+    하드 모드 퍼즐 생성 (무작위 배치 + 정확한 최적해)
+
+    영웅 배치를 무작위 순열로 섞고, 홀짝 검사로 풀 수 없는 배치는 타일 두 개를
+    바꿔 풀 수 있게 만든 뒤, 양방향 BFS로 정확한 최적해를 계산해서
+    [min_optimal, max_optimal]에 들어오는 배치를 반환한다.
+    구간을 끝내 못 맞추면 구간보다 쉬운 배치 중 가장 어려운 것과 구간보다 어려운 배치 하나
+    (시도 중에는 max_optimal까지만 탐색하므로 마지막에 depth_limit까지 한 번 더 탐색) 중
+    구간에 더 가까운 것을 warning과 함께 반환한다.
+
+    ※ shuffle_moves는 하위 호환(기존 호출부)용으로 남겨둡니다.
+    rng를 넘기면 generate_puzzle과 같이 재현 가능 (하드 모드는 시간 제한이 없어 항상 같은 결과).
+    cancelled는 generate_puzzle과 같음 (배치 시도마다 확인).
     """
     if min_optimal < 0:
         raise ValueError("min_optimal must be >= 0")
@@ -366,85 +923,95 @@ def generate_puzzle_hard(
         raise ValueError("max_optimal must be >= min_optimal")
 
     # 3x3 퍼즐 최단해 최대는 31수(참고)라 너무 큰 값은 자연스럽게 캡
-    max_optimal = min(max_optimal, 31)
+    max_optimal = min(max_optimal, 31, depth_limit)
 
-    # 한 영웅셋에서 목표 난이도에 맞는 상태를 찾기 위한 내부 재시도 횟수
-    inner_tries = max(10, min(40, shuffle_moves // 5)) if shuffle_moves > 0 else 20
+    # 한 영웅셋에서 목표 난이도에 맞는 배치를 찾기 위한 내부 재시도 횟수
+    inner_tries = 20
+
+    best = None  # (최적해, 배치, 목표, 영웅)
+    above = None  # 구간보다 어려운 배치 (라벨 상태, 정답 상태, 배치, 목표, 영웅)
+    nodes_before = SEARCH_STATS["nodes"]
+    attempts = 0
 
     for _ in range(max_attempts):
-        hard_data = get_random_heroes_for_hard()
+        if cancelled is not None and cancelled():
+            break
+        hard_data = get_random_heroes_for_hard(rng)
 
         selected_heroes = hard_data["heroes"]
         target_roles = hard_data["target_sub_roles"]
-        solved_state = hard_data["solved_state"]
 
-        goal = tuple(solved_state)
+        labels = [HERO_SUB_ROLE[h] for h in selected_heroes]
+        goals = _hard_goal_states(labels, target_roles)
+        packed_goals = [_pack_labels(goal) for goal in goals]
 
         for _ in range(inner_tries):
-            target_moves = random.randint(min_optimal, max_optimal)
-
-            # ── 역방향 셔플: 정답에서 빈칸을 target_moves번 랜덤 이동 ──
-            state = list(solved_state)
-            empty_idx = state.index(None)
-            prev_idx = -1  # 직전 위치(왕복 방지)
-
-            # 같은 상태 재방문을 최대한 피해서 '의도치 않게 쉬워지는' 경우를 줄임
-            seen = {tuple(state)}
-
-            for _step in range(target_moves):
-                adj = get_adjacent_indices(empty_idx)
-
-                # 1차: 직전 위치로 왕복하는 move는 최대한 배제
-                candidates = [a for a in adj if a != prev_idx]
-                if not candidates:
-                    candidates = adj[:]
-
-                random.shuffle(candidates)
-
-                moved = False
-                for next_idx in candidates:
-                    # try move
-                    state[empty_idx], state[next_idx] = state[next_idx], state[empty_idx]
-                    t = tuple(state)
-                    if t not in seen:
-                        seen.add(t)
-                        prev_idx, empty_idx = empty_idx, next_idx
-                        moved = True
-                        break
-                    # revert
-                    state[empty_idx], state[next_idx] = state[next_idx], state[empty_idx]
-
-                if not moved:
-                    # 모든 후보가 재방문이면 어쩔 수 없이 진행(확률적으로 드묾)
-                    next_idx = random.choice(adj)
-                    state[empty_idx], state[next_idx] = state[next_idx], state[empty_idx]
-                    prev_idx, empty_idx = empty_idx, next_idx
-                    seen.add(tuple(state))
-
-            initial_state = state
-
-            # 이미 정답이면 스킵 (드물지만 방어)
-            if is_solved_hard(tuple(initial_state), target_roles):
+            if cancelled is not None and cancelled():
+                break
+            attempts += 1
+            initial_state: List[Optional[str]] = selected_heroes.copy()
+            initial_state.append(None)
+            rng.shuffle(initial_state)
+
+            label_state = _hero_state_to_label_state(tuple(initial_state))
+            if not _is_solvable_hard(label_state, goals):
+                # 타일 두 개를 바꾸면 홀짝이 뒤집혀 풀 수 있는 배치가 됨
+                i, j = [idx for idx, h in enumerate(initial_state) if h is not None][:2]
+                initial_state[i], initial_state[j] = initial_state[j], initial_state[i]
+                label_state = _hero_state_to_label_state(tuple(initial_state))
+
+            # max_optimal보다 깊은 배치는 탐색을 끝까지 하지 않고 버림
+            optimal = _bidirectional_distance(_pack_labels(label_state), packed_goals, max_optimal)
+            if optimal is None:
+                if above is None:
+                    above = (label_state, packed_goals, initial_state, target_roles, selected_heroes)
                 continue
-
-            # 난이도 품질 체크: 맨해튼 하한이 너무 낮으면 상쇄(backtracking)가 많았던 것
-            manhattan_lb = _manhattan_distance_to_goal(tuple(initial_state), goal)
-            if manhattan_lb < max(2, target_moves - 4):
+            if optimal == 0:
                 continue
 
-            heroes_info = {h: HEROES[h] for h in selected_heroes}
-            empty_idx = initial_state.index(None)
+            if optimal < min_optimal:
+                if best is None or optimal > best[0]:
+                    best = (optimal, initial_state, target_roles, selected_heroes)
+                continue
 
+            SEARCH_STATS["attempts"] += attempts
             return {
                 "puzzle_id": str(uuid.uuid4()),
                 "initial_state": initial_state,
                 "target_roles": target_roles,
-                "empty_index": empty_idx,
-                "heroes": heroes_info,
-                "optimal_moves": target_moves,  # BFS 생략 → '목표 난이도'를 optimal로 사용
+                "empty_index": initial_state.index(None),
+                "heroes": {h: HEROES[h] for h in selected_heroes},
+                "optimal_moves": optimal,
                 "mode": "hard",
+                "size": 3,
+                "search": {"attempts": attempts, "nodes": SEARCH_STATS["nodes"] - nodes_before},
             }
 
+    SEARCH_STATS["attempts"] += attempts
+    # 구간보다 쉬운 것이 바로 아래(1수 차이)가 아니면 구간 위 배치의 실제 최적해를 구해서 비교
+    if above is not None and (best is None or min_optimal - best[0] > 1):
+        label_state, packed_goals, initial_state, target_roles, selected_heroes = above
+        optimal = _bidirectional_distance(_pack_labels(label_state), packed_goals, depth_limit)
+        if optimal is not None and (best is None or optimal - max_optimal < min_optimal - best[0]):
+            best = (optimal, initial_state, target_roles, selected_heroes)
+
+    if best is not None:
+        SEARCH_STATS["fallbacks"] += 1
+        optimal, initial_state, target_roles, selected_heroes = best
+        return {
+            "puzzle_id": str(uuid.uuid4()),
+            "initial_state": initial_state,
+            "target_roles": target_roles,
+            "empty_index": initial_state.index(None),
+            "heroes": {h: HEROES[h] for h in selected_heroes},
+            "optimal_moves": optimal,
+            "mode": "hard",
+            "size": 3,
+            "search": {"attempts": attempts, "nodes": SEARCH_STATS["nodes"] - nodes_before},
+            "warning": f"Could not meet difficulty [{min_optimal}, {max_optimal}]. Returned {optimal}.",
+        }
+
+    SEARCH_STATS["failures"] += 1
     raise RuntimeError("Failed to generate hard puzzle")
 
 
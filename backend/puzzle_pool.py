@@ -0,0 +1,489 @@
+"""
+모드별 퍼즐 사전 생성 풀
+
+요청 스레드에서 퍼즐을 만들지 않도록, 백그라운드 스레드가 모드(quick/ranked/hard,
+큰 보드는 quick_4x4 등)별 큐를 워터마크까지 채워 둔다. 생성 자체는 별도 프로세스(ProcessPoolExecutor)에서
+돌려서 요청 핸들러와 GIL을 다투지 않는다.
+
+- pop(mode): 준비된 퍼즐을 O(1)로 꺼냄, 비어 있으면 동기 생성(fallback).
+  비동기 엔드포인트는 try_pop(막히지 않음)과 generate(생성, CPU 실행기에서)로 나눠 부른다.
+  구간이 좁아 시도가 여러 번 필요한 모드(PUZZLE_SPECULATIVE_MODES)는 배치 워커마다 독립적으로
+  생성을 돌려서 먼저 구간을 맞춘 결과를 쓰고 나머지는 중단시킨다 (추측 병렬 생성).
+  모두 구간을 못 맞추면 그중 가장 가까운 난이도(warning)를 반환.
+- pop_many(mode, n): 배치 요청용. 풀에 있는 만큼 꺼내고 나머지는 배치 전용 프로세스 풀에서
+  모든 코어에 나눠 병렬 생성 (보충 워커와 따로 두어 배치가 단건 요청의 보충을 막지 않음)
+- stats(): 적중률, 보충 속도, 빈 풀 fallback 횟수
+- 생성된 퍼즐마다 "search"(시도/노드/생성 시간)를 metrics에 기록
+
+설정 (환경변수):
+- PUZZLE_POOL_WATERMARK: 모드별로 채워 둘 퍼즐 수 (기본 16, 0이면 풀 비활성)
+- PUZZLE_POOL_WORKERS:   생성 프로세스 수 (기본 1, 0이면 백그라운드 스레드에서 생성)
+- PUZZLE_POOL_BATCH:     작업 하나가 만드는 퍼즐 수 (기본 4)
+- PUZZLE_BATCH_WORKERS:  배치 생성 프로세스 수 (기본 CPU 코어 수, 0이면 요청 스레드에서 생성)
+- PUZZLE_BATCH_MAX:      배치 요청 하나의 최대 퍼즐 수 (기본 500)
+- PUZZLE_SPECULATIVE_MODES: 추측 병렬 생성을 쓸 모드 (쉼표 구분, 기본 ranked_4x4,ranked_5x5,
+                            빈 값이면 끔). 배치 워커가 2개 이상일 때만 동작.
+                            3x3 모드(hard 포함)는 생성이 몇 ms라 프로세스 간 전달 비용이 더 커서 기본에서 뺌
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, CancelledError, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+from puzzle import generate_puzzle, generate_puzzle_hard
+
+logger = logging.getLogger(__name__)
+
+POOL_WATERMARK = int(os.environ.get("PUZZLE_POOL_WATERMARK", "16"))
+POOL_WORKERS = int(os.environ.get("PUZZLE_POOL_WORKERS", "1"))
+POOL_BATCH = int(os.environ.get("PUZZLE_POOL_BATCH", "4"))
+BATCH_WORKERS = int(os.environ.get("PUZZLE_BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_MAX = int(os.environ.get("PUZZLE_BATCH_MAX", "500"))
+
+SPECULATIVE_MODES = tuple(
+    m.strip()
+    for m in os.environ.get("PUZZLE_SPECULATIVE_MODES", "ranked_4x4,ranked_5x5").split(",")
+    if m.strip()
+)
+
+# 배치 작업 수 = 워커 수 × 이 값 (생성 시간이 제각각이라 조금 잘게 나눠야 코어가 고르게 일함)
+_BATCH_SPLIT = 2
+
+# 추측 생성 중단 신호 슬롯 수 (요청마다 하나씩 돌려 씀, 동시에 진행 중인 추측 생성 수보다 커야 함).
+# 슬롯에는 마지막으로 끝난 요청의 세대 번호가 들어가고, 워커는 자기 세대 이상이면 중단한다.
+# 슬롯을 0으로 되돌리지 않으므로 같은 슬롯을 다시 써도 이전 요청의 남은 워커가 되살아나지 않음
+_CANCEL_SLOTS = 256
+
+
+# ══════════════════════════════════════════════
+#  모드별 생성 파라미터
+# ══════════════════════════════════════════════
+
+PUZZLE_MODES: Dict[str, Dict[str, Any]] = {
+    "quick": {"min_optimal": 5, "max_optimal": 18, "layout": "random"},
+    "ranked": {"min_optimal": 20, "max_optimal": 25, "layout": "random"},
+    "hard": {"min_optimal": 20, "max_optimal": 30, "shuffle_moves": 200},
+    # 큰 보드 (하드 모드는 3x3 전용)
+    "quick_4x4": {"min_optimal": 8, "max_optimal": 18, "layout": "random", "size": 4},
+    "ranked_4x4": {"min_optimal": 20, "max_optimal": 26, "layout": "random", "size": 4},
+    "quick_5x5": {"min_optimal": 10, "max_optimal": 20, "layout": "random", "size": 5},
+    "ranked_5x5": {"min_optimal": 20, "max_optimal": 26, "layout": "random", "size": 5},
+}
+
+
+# 요청에서 받는 기본 모드 이름 (보드 크기와 합쳐서 PUZZLE_MODES 키가 됨)
+BASE_MODES = ("quick", "ranked", "hard")
+
+
+def puzzle_mode_key(mode: str, size: int = 3) -> str:
+    """(기본 모드, 보드 크기) → PUZZLE_MODES 키 (3x3은 모드 이름 그대로), 없는 조합이면 ValueError"""
+    if mode not in BASE_MODES:
+        raise ValueError(f"unknown puzzle mode {mode!r}")
+    key = mode if size == 3 else f"{mode}_{size}x{size}"
+    if key not in PUZZLE_MODES:
+        raise ValueError(f"mode {mode!r} does not support size {size}")
+    return key
+
+
+def generate_for_mode(mode: str, cancelled: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """모드(PUZZLE_MODES 키)에 맞는 파라미터로 퍼즐 1개 생성 (없는 키면 ValueError), 생성 시간은 "search"의 ms"""
+    params = PUZZLE_MODES.get(mode)
+    if params is None:
+        raise ValueError(f"unknown puzzle mode {mode!r}")
+    started = time.perf_counter()
+    if mode == "hard":
+        puzzle = generate_puzzle_hard(**params, cancelled=cancelled)
+    else:
+        puzzle = generate_puzzle(**params, cancelled=cancelled)
+    puzzle["search"]["ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return puzzle
+
+
+def generate_batch(mode: str, count: int) -> List[Dict[str, Any]]:
+    """워커 프로세스에서 실행: 퍼즐 count개 생성"""
+    return [generate_for_mode(mode) for _ in range(count)]
+
+
+# 배치 워커 프로세스의 중단 신호 배열 (_init_batch_worker가 설정)
+_cancel_flags = None
+
+
+def _init_batch_worker(flags) -> None:
+    global _cancel_flags
+    _cancel_flags = flags
+
+
+def generate_speculative(mode: str, slot: int, generation: int) -> Dict[str, Any]:
+    """워커 프로세스에서 실행: 퍼즐 1개 생성, slot이 이 세대까지 끝났다고 표시되면 그때까지의 최선으로 반환"""
+    flags = _cancel_flags
+    return generate_for_mode(mode, cancelled=lambda: flags[slot] >= generation)
+
+
+def _band_gap(mode: str, puzzle: Dict[str, Any]) -> int:
+    """최적해가 모드의 난이도 구간에서 벗어난 정도 (구간 안이면 0)"""
+    params = PUZZLE_MODES[mode]
+    optimal = puzzle["optimal_moves"]
+    return max(params["min_optimal"] - optimal, optimal - params["max_optimal"], 0)
+
+
+# ══════════════════════════════════════════════
+#  풀
+# ══════════════════════════════════════════════
+
+class PuzzlePool:
+    """모드별 사전 생성 퍼즐 큐 + 백그라운드 보충 워커"""
+
+    def __init__(
+        self,
+        modes=tuple(PUZZLE_MODES),
+        watermark: int = POOL_WATERMARK,
+        workers: int = POOL_WORKERS,
+        batch: int = POOL_BATCH,
+        generate: Callable[[str], Dict[str, Any]] = generate_for_mode,
+        batch_workers: int = BATCH_WORKERS,
+        speculative_modes=SPECULATIVE_MODES,
+    ):
+        self.watermark = max(watermark, 0)
+        self.workers = max(workers, 0)
+        self.batch = max(batch, 1)
+        self.batch_workers = max(batch_workers, 0)
+        self._generate = generate
+        # 추측 병렬 생성은 워커가 2개 이상이고 기본 생성 함수를 쓸 때만
+        self.speculative_modes = (
+            frozenset(speculative_modes)
+            if self.batch_workers > 1 and generate is generate_for_mode
+            else frozenset()
+        )
+
+        self._queues: Dict[str, deque] = {mode: deque() for mode in modes}
+        self._pending: Dict[str, int] = {mode: 0 for mode in modes}
+        self._in_flight = 0
+        self._counters: Dict[str, Dict[str, int]] = {
+            mode: {
+                "hits": 0, "fallbacks": 0, "refilled": 0, "errors": 0,
+                "batch_hits": 0, "batch_generated": 0, "speculative": 0,
+            }
+            for mode in modes
+        }
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._batch_executor: Optional[ProcessPoolExecutor] = None
+        self._batch_lock = threading.Lock()
+        self._cancel_flags = None
+        self._cancel_generations = itertools.count(1)
+        self._started_at: Optional[float] = None
+
+    # ── 수명 주기 ──
+
+    @property
+    def enabled(self) -> bool:
+        return self.watermark > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        if self.workers > 0:
+            # 서버 스레드가 이미 떠 있는 상태에서 fork하지 않도록 spawn 사용
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        if self.speculative_modes:
+            # 첫 추측 생성이 프로세스 기동(모듈 import, 거리 테이블 mmap)을 기다리지 않도록 미리 띄움
+            executor = self._batch_pool()
+            for _ in range(self.batch_workers):
+                executor.submit(generate_batch, "quick", 1)
+        self._started_at = time.monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="puzzle-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._batch_lock:
+            if self._batch_executor is not None:
+                self._batch_executor.shutdown(wait=False, cancel_futures=True)
+                self._batch_executor = None
+
+    # ── 요청 경로 ──
+
+    def pop(self, mode: str) -> Dict[str, Any]:
+        """준비된 퍼즐 1개 반환 (비어 있으면 동기 생성)"""
+        puzzle = self.try_pop(mode)
+        if puzzle is None:
+            puzzle = self.generate(mode)
+        return puzzle
+
+    def try_pop(self, mode: str) -> Optional[Dict[str, Any]]:
+        """준비된 퍼즐 1개 (비어 있으면 fallback으로 세고 None, 막히지 않음)"""
+        queue = self._queues.get(mode)
+        if queue is None:
+            return None
+        try:
+            puzzle = queue.popleft()
+        except IndexError:
+            with self._lock:
+                self._counters[mode]["fallbacks"] += 1
+            self._wake.set()
+            return None
+
+        with self._lock:
+            self._counters[mode]["hits"] += 1
+        self._wake.set()
+        return puzzle
+
+    def generate(self, mode: str) -> Dict[str, Any]:
+        """풀을 거치지 않고 지금 생성 (try_pop이 None일 때의 fallback)"""
+        try:
+            if mode in self.speculative_modes:
+                puzzle = self._generate_speculative(mode)
+            else:
+                puzzle = self._generate(mode)
+        except RuntimeError:
+            metrics.observe_generation_failure(mode)
+            raise
+        metrics.observe_generation(mode, puzzle)
+        return puzzle
+
+    def pop_many(self, mode: str, count: int) -> List[Dict[str, Any]]:
+        """퍼즐 count개 반환 (풀에 있는 만큼 먼저 꺼내고, 나머지는 병렬 생성)"""
+        puzzles: List[Dict[str, Any]] = []
+        queue = self._queues.get(mode)
+        if queue is not None:
+            while len(puzzles) < count:
+                try:
+                    puzzles.append(queue.popleft())
+                except IndexError:
+                    break
+            missing = count - len(puzzles)
+            with self._lock:
+                self._counters[mode]["batch_hits"] += len(puzzles)
+                self._counters[mode]["batch_generated"] += missing
+            self._wake.set()
+
+        if len(puzzles) < count:
+            puzzles.extend(self._generate_parallel(mode, count - len(puzzles)))
+        return puzzles
+
+    # ── 배치 병렬 생성 ──
+
+    def _batch_pool(self) -> Optional[ProcessPoolExecutor]:
+        """배치 전용 프로세스 풀 (처음 쓸 때 만듦, batch_workers가 0이면 None)"""
+        if self.batch_workers == 0:
+            return None
+        with self._batch_lock:
+            if self._batch_executor is None:
+                context = multiprocessing.get_context("spawn")
+                if self._cancel_flags is None:
+                    self._cancel_flags = context.RawArray("q", _CANCEL_SLOTS)
+                self._batch_executor = ProcessPoolExecutor(
+                    max_workers=self.batch_workers,
+                    mp_context=context,
+                    initializer=_init_batch_worker,
+                    initargs=(self._cancel_flags,),
+                )
+            return self._batch_executor
+
+    def _discard_batch_pool(self, executor: ProcessPoolExecutor) -> None:
+        """죽은 워커 풀은 버리고 다음 요청에서 새로 만듦"""
+        with self._batch_lock:
+            if self._batch_executor is executor:
+                self._batch_executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _generate_parallel(self, mode: str, count: int) -> List[Dict[str, Any]]:
+        executor = self._batch_pool()
+        if executor is None:
+            try:
+                puzzles = self._generate_local(mode, count)
+            except RuntimeError:
+                metrics.observe_generation_failure(mode)
+                raise
+        else:
+            chunk = -(-count // (self.batch_workers * _BATCH_SPLIT))
+            futures = [
+                executor.submit(generate_batch, mode, min(chunk, count - start))
+                for start in range(0, count, chunk)
+            ]
+            puzzles = []
+            try:
+                for future in futures:
+                    puzzles.extend(future.result())
+            except RuntimeError as e:
+                for future in futures:
+                    future.cancel()
+                if isinstance(e, BrokenExecutor):
+                    self._discard_batch_pool(executor)
+                else:
+                    metrics.observe_generation_failure(mode)
+                raise
+
+        for puzzle in puzzles:
+            metrics.observe_generation(mode, puzzle)
+        return puzzles
+
+    def _generate_speculative(self, mode: str) -> Dict[str, Any]:
+        """
+        배치 워커마다 같은 모드 생성을 독립적으로 돌려서 먼저 구간을 맞춘 퍼즐 반환
+
+        먼저 끝난 쪽이 중단 신호를 켜면 나머지 워커는 다음 시도 전에 멈추고 최선을 돌려준다
+        (그 결과는 버림). 모두 구간을 못 맞추면 구간에 가장 가까운 것을 반환.
+        """
+        executor = self._batch_pool()
+        generation = next(self._cancel_generations)
+        slot = generation % _CANCEL_SLOTS
+        flags = self._cancel_flags
+        with self._lock:
+            self._counters[mode]["speculative"] += 1
+
+        futures = [
+            executor.submit(generate_speculative, mode, slot, generation)
+            for _ in range(self.batch_workers)
+        ]
+        best: Optional[Dict[str, Any]] = None
+        error: Optional[Exception] = None
+        try:
+            for future in as_completed(futures):
+                try:
+                    puzzle = future.result()
+                except RuntimeError as e:
+                    error = e
+                    continue
+                if "warning" not in puzzle:
+                    return puzzle
+                if best is None or _band_gap(mode, puzzle) < _band_gap(mode, best):
+                    best = puzzle
+        finally:
+            # 같은 슬롯의 더 늦은 세대가 먼저 끝났으면 그 값을 유지 (값은 줄지 않음)
+            with self._lock:
+                if flags[slot] < generation:
+                    flags[slot] = generation
+            for future in futures:
+                future.cancel()
+
+        if best is not None:
+            return best
+        if isinstance(error, BrokenExecutor):
+            self._discard_batch_pool(executor)
+            return self._generate(mode)
+        raise error
+
+    # ── 백그라운드 보충 ──
+
+    def _most_needed(self) -> Optional[str]:
+        """채워진 비율(대기 중 작업 포함)이 가장 낮은 모드"""
+        best_mode, best_fill = None, self.watermark
+        for mode, queue in self._queues.items():
+            fill = len(queue) + self._pending[mode]
+            if fill < best_fill:
+                best_mode, best_fill = mode, fill
+        return best_mode
+
+    def _run(self) -> None:
+        limit = max(self.workers, 1)
+        while not self._stopped.is_set():
+            self._wake.clear()
+
+            mode = None
+            with self._lock:
+                if self._in_flight < limit:
+                    mode = self._most_needed()
+                if mode is not None:
+                    queue = self._queues[mode]
+                    count = min(self.batch, self.watermark - len(queue) - self._pending[mode])
+                    self._pending[mode] += count
+                    self._in_flight += 1
+
+            if mode is None:
+                self._wake.wait(timeout=1.0)
+                continue
+
+            if self._executor is None:
+                # 스레드 모드: 이 스레드에서 바로 생성
+                self._finish(mode, count, lambda: self._generate_local(mode, count))
+                continue
+
+            try:
+                future = self._executor.submit(generate_batch, mode, count)
+            except RuntimeError:
+                # 종료 중
+                self._finish(mode, count, list)
+                break
+            future.add_done_callback(
+                lambda f, mode=mode, count=count: self._finish(mode, count, f.result)
+            )
+
+    def _generate_local(self, mode: str, count: int) -> List[Dict[str, Any]]:
+        return [self._generate(mode) for _ in range(count)]
+
+    def _finish(self, mode: str, count: int, produce: Callable[[], List[Dict[str, Any]]]) -> None:
+        puzzles: List[Dict[str, Any]] = []
+        try:
+            puzzles = produce()
+        except CancelledError:
+            pass
+        except Exception as e:
+            logger.exception("puzzle pool refill failed (mode=%s)", mode)
+            with self._lock:
+                self._counters[mode]["errors"] += 1
+            # 워커 프로세스가 죽은 경우(BrokenExecutor)는 생성 실패가 아님
+            if isinstance(e, RuntimeError) and not isinstance(e, BrokenExecutor):
+                metrics.observe_generation_failure(mode)
+
+        for puzzle in puzzles:
+            metrics.observe_generation(mode, puzzle)
+
+        with self._lock:
+            self._queues[mode].extend(puzzles)
+            self._pending[mode] -= count
+            self._in_flight -= 1
+            self._counters[mode]["refilled"] += len(puzzles)
+        self._wake.set()
+
+    # ── 메트릭 ──
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        modes = {}
+        with self._lock:
+            for mode, queue in self._queues.items():
+                c = self._counters[mode]
+                served = c["hits"] + c["fallbacks"]
+                modes[mode] = {
+                    "size": len(queue),
+                    "pending": self._pending[mode],
+                    "hits": c["hits"],
+                    "fallbacks": c["fallbacks"],
+                    "hit_rate": round(c["hits"] / served, 4) if served else None,
+                    "refilled": c["refilled"],
+                    "refill_per_sec": round(c["refilled"] / uptime, 3) if uptime else 0.0,
+                    "errors": c["errors"],
+                    "batch_hits": c["batch_hits"],
+                    "batch_generated": c["batch_generated"],
+                    "speculative": c["speculative"],
+                }
+        return {
+            "enabled": self.enabled,
+            "watermark": self.watermark,
+            "workers": self.workers,
+            "batch_workers": self.batch_workers,
+            "speculative_modes": sorted(self.speculative_modes),
+            "uptime_sec": round(uptime, 1),
+            "modes": modes,
+        }
@@ -0,0 +1,159 @@
+"""
+이동 기록 재생 검증
+
+클라이언트가 보낸 이동 기록(빈칸 이동 방향 문자열)을 저장해 둔 초기 상태에 그대로
+재생해서 정말 풀었는지, 몇 수 만에 풀었는지를 서버에서 확인한다.
+
+인코딩: 빈칸이 움직이는 방향 한 글자씩
+    U: 위, D: 아래, L: 왼쪽, R: 오른쪽    예) "RDLU..."
+
+정답 판별은 매 이동마다 보드 전체를 보지 않고, "목표에 맞지 않는 칸 수"를
+이동한 타일 하나(떠난 칸, 들어간 칸)만큼만 갱신해서 이동당 O(1)로 처리한다.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from heroes import HERO_ROLE, HERO_SUB_ROLE
+
+BASIC_ROLES = {"tank", "dps", "support"}
+
+# 이동 기록 최대 길이 (요청 본문 크기 제한 겸 재생 비용 상한)
+MAX_SEQUENCE_LENGTH = 2000
+
+# 사람이 낼 수 있는 최소 이동 간격 (이보다 빠른 기록은 거부)
+MIN_MS_PER_MOVE = 50
+
+
+class ReplayError(ValueError):
+    """잘못된 이동 기록"""
+
+
+class ReplayResult(NamedTuple):
+    moves: int
+    final_state: List[Optional[str]]
+
+
+def _fits(hero: str, target: str) -> bool:
+    """영웅이 목표 칸에 맞는지 (기본역할 칸은 role, 세부역할 칸은 sub_role 비교)"""
+    if target in BASIC_ROLES:
+        return HERO_ROLE[hero] == target
+    return HERO_SUB_ROLE[hero] == target
+
+
+def _direction_offsets(size: int) -> Dict[str, int]:
+    return {"U": -size, "D": size, "L": -1, "R": 1}
+
+
+def replay_moves(
+    initial_state: List[Optional[str]],
+    target_roles: List[str],
+    sequence: str,
+) -> ReplayResult:
+    """
+    이동 기록을 재생해서 정답에 도달하는지 확인
+
+    - 보드 밖으로 나가는 이동이 있으면 ReplayError
+    - 정답에 도달한 뒤에도 이동이 남아 있으면 ReplayError (게임은 정답 순간 끝남)
+    - 끝까지 재생해도 정답이 아니면 ReplayError
+
+    Returns:
+        ReplayResult(이동 수, 최종 상태)
+    """
+    if len(sequence) > MAX_SEQUENCE_LENGTH:
+        raise ReplayError("move sequence too long")
+
+    size = int(round(len(initial_state) ** 0.5))
+    offsets = _direction_offsets(size)
+    board = list(initial_state)
+    empty = board.index(None)
+
+    # 퍼즐에 나온 영웅별로 칸마다 맞는지 미리 계산 (재생 중에는 표 조회만)
+    fits = {
+        hero: [_fits(hero, target) for target in target_roles]
+        for hero in board
+        if hero is not None
+    }
+    mismatches = sum(
+        1 for i, hero in enumerate(board) if hero is not None and not fits[hero][i]
+    )
+    if mismatches == 0:
+        raise ReplayError("puzzle already solved")
+
+    for step, direction in enumerate(sequence, start=1):
+        offset = offsets.get(direction)
+        if offset is None:
+            raise ReplayError(f"invalid direction {direction!r}")
+
+        target_idx = empty + offset
+        if not 0 <= target_idx < len(board):
+            raise ReplayError(f"move {step} leaves the board")
+        if offset in (-1, 1) and target_idx // size != empty // size:
+            raise ReplayError(f"move {step} leaves the board")
+
+        # 타일이 target_idx → empty로 이동
+        hero = board[target_idx]
+        hero_fits = fits[hero]
+        mismatches += (not hero_fits[empty]) - (not hero_fits[target_idx])
+        board[empty], board[target_idx] = hero, None
+        empty = target_idx
+
+        if mismatches == 0:
+            if step != len(sequence):
+                raise ReplayError("moves continue after the puzzle was solved")
+            return ReplayResult(step, board)
+
+    raise ReplayError("move sequence does not solve the puzzle")
+
+
+def apply_moves(initial_state: List[Optional[str]], sequence: str) -> List[Optional[str]]:
+    """
+    이동 기록을 정답 판별 없이 적용한 보드 (힌트용: 풀이 도중의 현재 상태)
+
+    방향이 잘못됐거나 보드 밖으로 나가면 ReplayError
+    """
+    if len(sequence) > MAX_SEQUENCE_LENGTH:
+        raise ReplayError("move sequence too long")
+
+    size = int(round(len(initial_state) ** 0.5))
+    offsets = _direction_offsets(size)
+    board = list(initial_state)
+    empty = board.index(None)
+
+    for step, direction in enumerate(sequence, start=1):
+        offset = offsets.get(direction)
+        if offset is None:
+            raise ReplayError(f"invalid direction {direction!r}")
+        target_idx = empty + offset
+        if not 0 <= target_idx < len(board):
+            raise ReplayError(f"move {step} leaves the board")
+        if offset in (-1, 1) and target_idx // size != empty // size:
+            raise ReplayError(f"move {step} leaves the board")
+        board[empty], board[target_idx] = board[target_idx], None
+        empty = target_idx
+    return board
+
+
+def direction_of(empty: int, tile: int, size: int) -> str:
+    """빈칸이 empty → tile로 갈 때의 방향 문자"""
+    diff = tile - empty
+    if diff == -size:
+        return "U"
+    if diff == size:
+        return "D"
+    return "L" if diff == -1 else "R"
+
+
+def encode_path(empty: int, path: List[int], size: int) -> str:
+    """빈칸 이동 칸 목록(solver 경로) → 이동 기록 문자열"""
+    directions = []
+    for tile in path:
+        directions.append(direction_of(empty, tile, size))
+        empty = tile
+    return "".join(directions)
+
+
+def check_time(time_ms: int, moves: int) -> None:
+    """0 이하이거나 이동 수에 비해 말이 안 되게 짧은 기록 거부"""
+    if time_ms <= 0:
+        raise ReplayError("time must be positive")
+    if time_ms < moves * MIN_MS_PER_MOVE:
+        raise ReplayError("time is too short for the number of moves")
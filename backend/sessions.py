@@ -0,0 +1,171 @@
+"""
+진행 중인 퍼즐 세션 저장소
+
+퍼즐을 만들 때 저장하고, 결과 제출/랭킹 등록 때 꺼내 쓴다. 풀다 만 퍼즐이나
+랭킹 등록을 안 하는 퍼즐도 쌓이기만 하지 않도록:
+
+- TTL: 마지막 접근 후 SESSION_TTL초가 지나면 만료 (접근할 때마다 연장)
+- LRU: 최대 SESSION_MAX_ENTRIES개, 넘으면 가장 오래 안 쓴 세션부터 제거
+- claim(): 조회와 동시에 랭킹 등록 완료로 표시 (랭킹 중복 등록 방지, 한 세션은 한 번만 claim 가능).
+  세션 자체는 TTL/LRU로 사라질 때까지 남아서 등록 후에도 풀이 조회가 된다.
+
+TTL이 접근 시각 기준이라 LRU 순서와 만료 순서가 같다. 그래서 만료 정리는 앞에서부터
+만료된 것만 꺼내면 되고(상각 O(1)), 전체를 훑지 않는다.
+
+세션 하나는 __slots__ 객체에 영웅/목표 칸을 정수 코드 bytes로 담는다 (문자열 리스트 대비 수 배 작음).
+힌트 경로(hint_path)는 힌트/풀이를 처음 요청할 때만 만들고, 세션마다 경로 하나만 들고 있다.
+
+설정 (환경변수):
+- SESSION_TTL:         세션 유지 시간 초 (기본 3600)
+- SESSION_MAX_ENTRIES: 최대 세션 수 (기본 100000)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from heroes import HERO_CODE, HERO_IDS, ROLE_CODE, ROLE_IDS
+
+SESSION_TTL = float(os.environ.get("SESSION_TTL", "3600"))
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", "100000"))
+
+# 빈칸 코드 (영웅 코드는 0부터, 255 미만)
+_BLANK = 255
+
+
+def encode_state(state: List[Optional[str]]) -> bytes:
+    """영웅 배치 → 칸별 영웅 코드 bytes (빈칸 255)"""
+    return bytes(_BLANK if h is None else HERO_CODE[h] for h in state)
+
+
+class PuzzleSession:
+    """퍼즐 세션 하나 (검증에 필요한 정보 + 진행 상태)"""
+
+    __slots__ = (
+        "state", "targets", "optimal_moves", "mode", "expires",
+        "finished", "assisted", "claimed", "hint_path",
+    )
+
+    def __init__(self, puzzle: Dict[str, Any], mode: str, expires: float):
+        self.state = encode_state(puzzle["initial_state"])
+        self.targets = bytes(ROLE_CODE[r] for r in puzzle["target_roles"])
+        self.optimal_moves = puzzle["optimal_moves"]
+        self.mode = mode
+        self.expires = expires
+        # 검증된 풀이를 제출했는지 (풀이 조회 조건)
+        self.finished = False
+        # 힌트/풀이를 봤는지 (랭킹 등록 불가)
+        self.assisted = False
+        # 랭킹 등록에 쓰였는지 (claim)
+        self.claimed = False
+        # 마지막으로 푼 최단 경로 (시작 상태 bytes, 시작 빈칸 위치, 빈칸이 갈 칸 bytes)
+        self.hint_path: Optional[Tuple[bytes, int, bytes]] = None
+
+    @property
+    def initial_state(self) -> List[Optional[str]]:
+        return [None if c == _BLANK else HERO_IDS[c] for c in self.state]
+
+    @property
+    def target_roles(self) -> List[str]:
+        return [ROLE_IDS[c] for c in self.targets]
+
+    @property
+    def empty_index(self) -> int:
+        return self.state.index(_BLANK)
+
+
+class SessionStore:
+    """TTL + LRU 세션 저장소 (스레드 안전)"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[str, PuzzleSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"created": 0, "claimed": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _purge_expired(self, now: float) -> None:
+        """앞(가장 오래 안 쓴 쪽)에서부터 만료된 세션 제거 (락 안에서 호출)"""
+        entries = self._entries
+        while entries:
+            puzzle_id, session = next(iter(entries.items()))
+            if session.expires > now:
+                break
+            del entries[puzzle_id]
+            self._counters["expired"] += 1
+
+    def put(self, puzzle_id: str, puzzle: Dict[str, Any], mode: str) -> PuzzleSession:
+        """세션 저장 (용량을 넘으면 LRU 제거)"""
+        now = time.monotonic()
+        session = PuzzleSession(puzzle, mode, now + self.ttl)
+        with self._lock:
+            self._purge_expired(now)
+            self._entries[puzzle_id] = session
+            self._entries.move_to_end(puzzle_id)
+            self._counters["created"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evicted"] += 1
+        return session
+
+    def put_many(self, puzzles: List[Dict[str, Any]], mode: str) -> None:
+        """퍼즐 여러 개를 puzzle_id로 한 번에 저장 (락 한 번, 배치 요청용)"""
+        now = time.monotonic()
+        expires = now + self.ttl
+        created = [(p["puzzle_id"], PuzzleSession(p, mode, expires)) for p in puzzles]
+        with self._lock:
+            self._purge_expired(now)
+            entries = self._entries
+            for puzzle_id, session in created:
+                entries[puzzle_id] = session
+                entries.move_to_end(puzzle_id)
+            self._counters["created"] += len(created)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._counters["evicted"] += 1
+
+    def get(self, puzzle_id: str) -> Optional[PuzzleSession]:
+        """세션 조회 (없거나 만료면 None, 있으면 만료 시각 연장)"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._entries.get(puzzle_id)
+            if session is None:
+                return None
+            if session.expires <= now:
+                del self._entries[puzzle_id]
+                self._counters["expired"] += 1
+                return None
+            session.expires = now + self.ttl
+            self._entries.move_to_end(puzzle_id)
+            return session
+
+    def claim(self, puzzle_id: str) -> Optional[PuzzleSession]:
+        """세션을 랭킹 등록용으로 한 번만 꺼냄 (동시에 호출해도 한 쪽만 받음, 이미 claim됐으면 None)"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._entries.get(puzzle_id)
+            if session is None:
+                return None
+            if session.expires <= now:
+                del self._entries[puzzle_id]
+                self._counters["expired"] += 1
+                return None
+            if session.claimed:
+                return None
+            session.claimed = True
+            self._counters["claimed"] += 1
+            return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_sec": self.ttl,
+                **self._counters,
+            }
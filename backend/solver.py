@@ -0,0 +1,284 @@
+"""
+큰 보드(4x4, 5x5)용 역할 퍼즐 IDA* 솔버
+
+3x3은 상태 공간이 작아서 거리 테이블/BFS로 충분하지만, 15·24타일 보드는
+BFS로 못 푼다. 역할이 같은 타일은 서로 구분하지 않으므로(정답이 여러 개),
+타일 하나하나의 맨해튼 거리 대신 "역할별 행/열 분포"로 하한을 잡는다.
+
+휴리스틱 (walking-distance 계열, additive):
+- 세로 이동은 어떤 역할 타일 하나를 인접 행으로 옮기고, 가로 이동은 인접 열로 옮긴다.
+- 역할별 행 분포를 목표 행 분포로 옮기는 최소 비용(1차원 earth mover's distance)은
+  세로 이동만으로 줄어들고, 한 번에 최대 1씩 줄어든다. 열도 마찬가지.
+- 따라서 Σ역할 (행 EMD + 열 EMD)는 세로/가로 이동을 나눠 센 additive 하한이다.
+- 2명 적은 역할(빈칸 자리를 가진 역할)은 목표 칸 하나를 비워 두는 부분 매칭으로 계산.
+
+같은 상태로 가는 경로가 매우 많아서(같은 역할끼리 자리 교환) 반복마다
+전치 테이블(transposition table)로 이미 더 짧게 도달한 상태를 잘라낸다.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+BLANK = 3
+
+
+class SolveResult(NamedTuple):
+    distance: Optional[int]   # 최단 이동 수 (예산 초과/한도 초과면 None)
+    path: List[int]           # 빈칸이 차례로 이동하는 칸 인덱스
+    nodes: int                # 확장한 노드 수
+    complete: bool            # False면 node_limit에 걸려 중단됨
+
+
+def grid_adjacency(size: int) -> List[List[int]]:
+    """size x size 그리드의 상하좌우 인접 칸"""
+    adjacency = []
+    for index in range(size * size):
+        row, col = divmod(index, size)
+        adj = []
+        if row > 0:
+            adj.append(index - size)
+        if row < size - 1:
+            adj.append(index + size)
+        if col > 0:
+            adj.append(index - 1)
+        if col < size - 1:
+            adj.append(index + 1)
+        adjacency.append(adj)
+    return adjacency
+
+
+def _emd(counts: Sequence[int], goal: Sequence[int]) -> int:
+    """같은 총량의 1차원 분포 간 최소 이동 비용"""
+    cost = 0
+    carry = 0
+    for i in range(len(counts) - 1):
+        carry += counts[i] - goal[i]
+        cost += carry if carry >= 0 else -carry
+    return cost
+
+
+def _emd_partial(counts: Sequence[int], goal: Sequence[int]) -> int:
+    """타일이 목표보다 1개 적을 때: 목표 칸 하나를 비우는 모든 경우 중 최소 비용"""
+    n = len(counts)
+    prefix = []
+    carry = 0
+    for i in range(n - 1):
+        carry += counts[i] - goal[i]
+        prefix.append(carry)
+
+    best = None
+    for drop in range(n):
+        if goal[drop] == 0:
+            continue
+        # drop 행(열)의 목표를 1 줄이면 drop 이후 누적 차이가 1씩 커짐
+        cost = 0
+        for i, p in enumerate(prefix):
+            if i >= drop:
+                p += 1
+            cost += p if p >= 0 else -p
+        if best is None or cost < best:
+            best = cost
+    return best if best is not None else 0
+
+
+class RoleSolver:
+    """목표 배치 하나에 대한 IDA* 솔버 (역할 코드: tank=0, dps=1, support=2)"""
+
+    def __init__(self, size: int, target_codes: Sequence[int]):
+        if len(target_codes) != size * size:
+            raise ValueError("target size mismatch")
+        self.size = size
+        self.cells = size * size
+        self.target = list(target_codes)
+        self.adjacency = grid_adjacency(size)
+        self.row_of = [i // size for i in range(self.cells)]
+        self.col_of = [i % size for i in range(self.cells)]
+
+        self.goal_rows = [[0] * size for _ in range(3)]
+        self.goal_cols = [[0] * size for _ in range(3)]
+        for i, code in enumerate(self.target):
+            self.goal_rows[code][self.row_of[i]] += 1
+            self.goal_cols[code][self.col_of[i]] += 1
+
+    # ── 휴리스틱 ──
+
+    def _axis_cost(self, counts: List[int], goal: List[int], reduced: bool) -> int:
+        return _emd_partial(counts, goal) if reduced else _emd(counts, goal)
+
+    def heuristic(self, codes: Sequence[Optional[int]]) -> int:
+        """역할별 행/열 EMD 합 (단독 계산용)"""
+        rows, cols, reduced = self._distributions(codes)
+        return sum(
+            self._axis_cost(rows[r], self.goal_rows[r], r == reduced)
+            + self._axis_cost(cols[r], self.goal_cols[r], r == reduced)
+            for r in range(3)
+        )
+
+    def _distributions(self, codes: Sequence[Optional[int]]):
+        rows = [[0] * self.size for _ in range(3)]
+        cols = [[0] * self.size for _ in range(3)]
+        totals = [0, 0, 0]
+        for i, code in enumerate(codes):
+            if code is None or code == BLANK:
+                continue
+            rows[code][self.row_of[i]] += 1
+            cols[code][self.col_of[i]] += 1
+            totals[code] += 1
+
+        goal_totals = [sum(g) for g in self.goal_rows]
+        reduced = None
+        for r in range(3):
+            diff = goal_totals[r] - totals[r]
+            if diff == 1 and reduced is None:
+                reduced = r
+            elif diff != 0:
+                raise ValueError("tile counts do not match target layout")
+        if reduced is None:
+            raise ValueError("tile counts do not match target layout")
+        return rows, cols, reduced
+
+    # ── 탐색 ──
+
+    def _cost_table(self, goal: List[int], reduced: bool, base: int) -> Dict[int, int]:
+        """분포를 base진수 정수로 묶은 키 → 축 비용 (탐색 중 채워지는 메모)"""
+        size = self.size
+
+        class _Memo(dict):
+            def __missing__(memo, key):
+                counts = []
+                k = key
+                for _ in range(size):
+                    k, c = divmod(k, base)
+                    counts.append(c)
+                cost = _emd_partial(counts, goal) if reduced else _emd(counts, goal)
+                memo[key] = cost
+                return cost
+
+        return _Memo()
+
+    def solve(
+        self,
+        start_codes: Sequence[Optional[int]],
+        depth_limit: int = 80,
+        node_limit: int = 2_000_000,
+    ) -> SolveResult:
+        """IDA* 최단해 (start_codes: 칸별 역할 코드, 빈칸은 None 또는 BLANK)"""
+        board = [BLANK if c is None else c for c in start_codes]
+        if len(board) != self.cells or board.count(BLANK) != 1:
+            raise ValueError("board must have exactly one blank")
+
+        rows, cols, reduced = self._distributions(board)
+        target = self.target
+        adjacency = self.adjacency
+        size = self.size
+
+        # 역할별 행/열 분포를 정수 키로 관리: 타일 하나가 a행 → b행이면 key += base^b - base^a
+        base = self.cells + 1
+        weight = [base ** i for i in range(size)]
+        row_cost = [self._cost_table(self.goal_rows[r], r == reduced, base) for r in range(3)]
+        col_cost = [self._cost_table(self.goal_cols[r], r == reduced, base) for r in range(3)]
+        row_key = [sum(c * w for c, w in zip(rows[r], weight)) for r in range(3)]
+        col_key = [sum(c * w for c, w in zip(cols[r], weight)) for r in range(3)]
+
+        # 이동 테이블: moves[빈칸] = ((타일 칸, 세로 이동 여부, 키 변화량, 2*타일 칸, 2*빈칸), ...)
+        moves = []
+        for empty in range(self.cells):
+            options = []
+            for adj in adjacency[empty]:
+                vertical = adj // size != empty // size
+                if vertical:
+                    delta = weight[empty // size] - weight[adj // size]
+                else:
+                    delta = weight[empty % size] - weight[adj % size]
+                options.append((adj, vertical, delta, 2 * adj, 2 * empty))
+            moves.append(tuple(options))
+
+        mismatches = sum(
+            1 for i, code in enumerate(board) if code != BLANK and code != target[i]
+        )
+        if mismatches == 0:
+            return SolveResult(0, [], 0, True)
+
+        packed = 0
+        for i, code in enumerate(board):
+            packed |= code << (2 * i)
+
+        h = sum(row_cost[r][row_key[r]] + col_cost[r][col_key[r]] for r in range(3))
+        path: List[int] = []
+        nodes = 0
+        seen: Dict[int, int] = {}
+        over = 1 << 30
+
+        def search(g: int, bound: int, empty: int, prev: int) -> int:
+            """bound 안에서 해를 찾으면 -1, 아니면 다음 bound 후보(f 최소값)"""
+            nonlocal nodes, h, mismatches, packed
+            f = g + h
+            if f > bound:
+                return f
+            if mismatches == 0:
+                return -1
+            if nodes >= node_limit:
+                return over
+
+            best_g = seen.get(packed)
+            if best_g is not None and best_g <= g:
+                return over
+            seen[packed] = g
+            nodes += 1
+
+            minimum = over
+            for adj, vertical, delta, adj_shift, empty_shift in moves[empty]:
+                if adj == prev:
+                    continue
+                code = board[adj]
+
+                # 타일(code)을 adj → empty로 이동
+                old_h = h
+                old_mismatch = mismatches
+                if vertical:
+                    old_cost = row_cost[code][row_key[code]]
+                    row_key[code] += delta
+                    h += row_cost[code][row_key[code]] - old_cost
+                else:
+                    old_cost = col_cost[code][col_key[code]]
+                    col_key[code] += delta
+                    h += col_cost[code][col_key[code]] - old_cost
+                mismatches += (code != target[empty]) - (code != target[adj])
+                x = code ^ BLANK
+                packed ^= (x << adj_shift) ^ (x << empty_shift)
+                board[empty] = code
+                board[adj] = BLANK
+                path.append(adj)
+
+                t = search(g + 1, bound, adj, empty)
+                if t == -1:
+                    return -1
+
+                # 되돌리기
+                path.pop()
+                board[empty] = BLANK
+                board[adj] = code
+                packed ^= (x << adj_shift) ^ (x << empty_shift)
+                mismatches = old_mismatch
+                h = old_h
+                if vertical:
+                    row_key[code] -= delta
+                else:
+                    col_key[code] -= delta
+
+                if t < minimum:
+                    minimum = t
+            return minimum
+
+        bound = h
+        blank = board.index(BLANK)
+        while bound <= depth_limit:
+            seen.clear()
+            t = search(0, bound, blank, -1)
+            if t == -1:
+                return SolveResult(len(path), list(path), nodes, True)
+            if nodes >= node_limit:
+                return SolveResult(None, [], nodes, False)
+            if t >= over:
+                break
+            bound = t
+
+        return SolveResult(None, [], nodes, True)
@@ -69,6 +69,7 @@ const App: React.FC = () => {
   const [puzzleTiles, setPuzzleTiles] = useState<(string | null)[]>([]);
   const [emptyIndex, setEmptyIndex] = useState<number>(8);
   const [moves, setMoves] = useState<number>(0);
+  const [moveSequence, setMoveSequence] = useState<string>(''); // 빈칸 이동 방향 기록 (서버 검증용)
   const [puzzleId, setPuzzleId] = useState<string>('');
 
   // 서버에서 받은 영웅 정보
@@ -216,6 +217,7 @@ const App: React.FC = () => {
     resetTimer();
     setGameState('idle');
     setMoves(0);
+    setMoveSequence('');
 
     const puzzle = await api.createPuzzle(mode);
 
@@ -247,6 +249,14 @@ const App: React.FC = () => {
     return (Math.abs(r1 - r2) + Math.abs(c1 - c2)) === 1;
   };
 
+  // 빈칸 이동 방향 (U/D/L/R)
+  const moveDirection = (from: number, to: number): string => {
+    const diff = to - from;
+    if (diff === -3) return 'U';
+    if (diff === 3) return 'D';
+    return diff === -1 ? 'L' : 'R';
+  };
+
   // 타일 이동
   const moveTile = useCallback((index: number): void => {
     if (!isAdjacent(index, emptyIndex)) return;
@@ -261,6 +271,7 @@ const App: React.FC = () => {
     setPuzzleTiles(newTiles);
     setEmptyIndex(index);
     setMoves(prev => prev + 1);
+    setMoveSequence(prev => prev + moveDirection(emptyIndex, index));
 
     if (checkSolved(newTiles, targetRoles, heroesData)) {
       setGameState('completed');
@@ -273,7 +284,7 @@ const App: React.FC = () => {
     let resultData: SubmitResult;
 
     if (gameMode === 'ranked' || gameMode === 'hard') {
-      const response = await api.submitResult(puzzleId, time, moves);
+      const response = await api.submitResult(puzzleId, time, moves, moveSequence);
       resultData = response || generateLocalResult(moves, true);
     } else {
       resultData = generateLocalResult(moves, false);
@@ -289,7 +300,7 @@ const App: React.FC = () => {
         setShowNicknameModal(true);
       }, 2000);
     }
-  }, [gameMode, puzzleId, time, moves]);
+  }, [gameMode, puzzleId, time, moves, moveSequence]);
 
   // 게임 완료 시 결과 처리
   useEffect(() => {
@@ -323,7 +334,7 @@ const App: React.FC = () => {
   // 닉네임 제출
   const submitNickname = async (): Promise<void> => {
     if (!nickname.trim()) return;
-    await api.submitRanking(puzzleId, time, moves, nickname.trim());
+    await api.submitRanking(puzzleId, time, moves, moveSequence, nickname.trim());
     setNickname('');
     setShowNicknameModal(false);
     fetchRankings();
@@ -22,7 +22,12 @@ export const api = {
   },
 
   // 결과 제출
-  async submitResult(puzzleId: string, timeMs: number, moves: number): Promise<SubmitResult | null> {
+  async submitResult(
+      puzzleId: string,
+      timeMs: number,
+      moves: number,
+      moveSequence: string,
+  ): Promise<SubmitResult | null> {
     try {
       const response = await fetch(`${API_BASE}/api/puzzle/submit`, {
         method: 'POST',
@@ -31,6 +36,7 @@ export const api = {
           puzzle_id: puzzleId,
           time_ms: timeMs,
           moves: moves,
+          move_sequence: moveSequence,
         }),
       });
       if (!response.ok) return null;
@@ -46,6 +52,7 @@ export const api = {
       puzzleId: string,
       timeMs: number,
       moves: number,
+      moveSequence: string,
       nickname: string,
   ): Promise<SubmitRankingResponse | null> {
     try {
@@ -56,6 +63,7 @@ export const api = {
           puzzle_id: puzzleId,
           time_ms: timeMs,
           moves: moves,
+          move_sequence: moveSequence,
           nickname: nickname,
         }),
       });